@@ -0,0 +1,191 @@
+"""Redis work queue of micro-batches shared by every live worker.
+
+``process_job`` splits a job into small batches and pushes each one as it is
+sealed. Any number of drainer jobs pull the next batch with an atomic
+``RPOPLPUSH`` from the pending list onto a processing list and take a lease
+on it; completion is tracked per batch in a set. Throughput therefore
+follows however many workers are running, and a slow worker only ever holds
+one small batch. A worker renews its lease while the batch runs
+(``keep_leased``), so only batches whose worker died see their lease expire;
+those are reclaimed once the pending list is empty. Whoever records the last
+completion, or seals a job whose batches are already done, wins the
+``finalized`` flag and enqueues the merge.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from backend.app.redis_client import get_redis_connection
+
+LOGGER = logging.getLogger(__name__)
+
+# A claimed batch is handed to another worker if not completed within this.
+MICRO_BATCH_LEASE_SECONDS = int(os.getenv("MICRO_BATCH_LEASE_SECONDS", "900"))
+# Scheduler keys outlive the job long enough for late drainers to see the result.
+MICRO_BATCH_KEY_TTL_SECONDS = int(os.getenv("MICRO_BATCH_KEY_TTL_SECONDS", str(2 * 24 * 3600)))
+
+
+class MicroBatchQueue:
+    """Pending, processing and completed micro-batches of one job."""
+
+    def __init__(
+        self,
+        job_id: str,
+        *,
+        redis_client=None,
+        lease_seconds: int = MICRO_BATCH_LEASE_SECONDS,
+        key_ttl_seconds: int = MICRO_BATCH_KEY_TTL_SECONDS,
+        worker_id: Optional[str] = None,
+    ):
+        self.job_id = job_id
+        self.lease_seconds = lease_seconds
+        self.key_ttl_seconds = key_ttl_seconds
+        # Pass the claiming queue's ``worker_id`` to renew leases it took.
+        self.worker_id = worker_id or uuid.uuid4().hex
+        self._redis = redis_client
+        base = f"microbatch:{job_id}"
+        self._pending = f"{base}:pending"
+        self._processing = f"{base}:processing"
+        self._payloads = f"{base}:payloads"
+        self._done = f"{base}:done"
+        self._total = f"{base}:total"
+        self._finalized = f"{base}:finalized"
+        self._aborted = f"{base}:aborted"
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_connection()
+        return self._redis
+
+    def _lease_key(self, batch_id: int) -> str:
+        return f"microbatch:{self.job_id}:lease:{batch_id}"
+
+    def _touch(self, *keys: str) -> None:
+        for key in keys:
+            self.redis.expire(key, self.key_ttl_seconds)
+
+    def push(self, batch_id: int, payload: dict) -> None:
+        """Make a sealed batch available to every drainer."""
+
+        self.redis.hset(self._payloads, str(batch_id), json.dumps(payload))
+        self.redis.lpush(self._pending, str(batch_id))
+        self._touch(self._payloads, self._pending)
+
+    def seal(self, total_batches: int) -> bool:
+        """Record the final batch count; ``True`` if the caller should finalize now."""
+
+        self.redis.set(self._total, int(total_batches), ex=self.key_ttl_seconds)
+        return self._claim_finalize()
+
+    def total(self) -> Optional[int]:
+        value = self.redis.get(self._total)
+        return None if value is None else int(value)
+
+    def claim(self) -> Optional[Tuple[int, dict]]:
+        """Take the next batch, or reclaim one whose worker lost its lease."""
+
+        batch = self.redis.rpoplpush(self._pending, self._processing)
+        if batch is not None:
+            self.redis.set(self._lease_key(batch), self.worker_id, ex=self.lease_seconds)
+            self._touch(self._processing)
+        else:
+            batch = self._reclaim()
+            if batch is None:
+                return None
+        payload = self.redis.hget(self._payloads, str(batch))
+        return int(batch), json.loads(payload) if payload else {}
+
+    def _reclaim(self) -> Optional[str]:
+        for batch in self.redis.lrange(self._processing, 0, -1):
+            if self.redis.sismember(self._done, batch):
+                continue
+            # The lease key is gone once it expires; SET NX lets one worker take it over.
+            if self.redis.set(self._lease_key(batch), self.worker_id, nx=True, ex=self.lease_seconds):
+                LOGGER.warning("Reclaiming micro-batch %s of job %s after its lease expired", batch, self.job_id)
+                return batch
+        return None
+
+    def renew(self, batch_id: int) -> bool:
+        """Extend this worker's lease; ``False`` if another worker has taken the batch over."""
+
+        key = self._lease_key(batch_id)
+        holder = self.redis.get(key)
+        if holder is None:
+            # Expired but not reclaimed yet: take it back.
+            return bool(self.redis.set(key, self.worker_id, nx=True, ex=self.lease_seconds))
+        if holder != self.worker_id:
+            return False
+        self.redis.expire(key, self.lease_seconds)
+        return True
+
+    @contextmanager
+    def keep_leased(self, batch_id: int, interval_seconds: Optional[float] = None) -> Iterator[None]:
+        """Renew the lease on ``batch_id`` in the background while the block runs."""
+
+        interval = interval_seconds or self.lease_seconds / 3
+        stop = threading.Event()
+
+        def heartbeat() -> None:
+            while not stop.wait(interval):
+                try:
+                    if not self.renew(batch_id):
+                        LOGGER.warning("Lost the lease on micro-batch %s of job %s", batch_id, self.job_id)
+                        return
+                except Exception as exc:  # noqa: BLE001 - retried on the next beat
+                    LOGGER.warning("Could not renew lease on micro-batch %s of job %s: %s", batch_id, self.job_id, exc)
+
+        thread = threading.Thread(target=heartbeat, name=f"lease-{self.job_id}-{batch_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+
+    def complete(self, batch_id: int) -> bool:
+        """Mark a batch done; ``True`` if this was the last one and the caller should finalize."""
+
+        self.redis.sadd(self._done, str(batch_id))
+        self._touch(self._done)
+        self.redis.lrem(self._processing, 0, str(batch_id))
+        self.redis.delete(self._lease_key(batch_id))
+        return self._claim_finalize()
+
+    def _claim_finalize(self) -> bool:
+        total = self.total()
+        if total is None or self.redis.scard(self._done) < total:
+            return False
+        return bool(self.redis.set(self._finalized, self.worker_id, nx=True, ex=self.key_ttl_seconds))
+
+    def in_flight(self) -> int:
+        """Batches claimed by a worker and not yet completed."""
+
+        return int(self.redis.llen(self._processing))
+
+    def unfinished(self) -> int:
+        """Batches pushed but not yet completed."""
+
+        return max(0, int(self.redis.hlen(self._payloads)) - int(self.redis.scard(self._done)))
+
+    def abort(self, reason: str) -> None:
+        """Stop every drainer of this job, e.g. after a batch failed the job."""
+
+        self.redis.set(self._aborted, reason, ex=self.key_ttl_seconds)
+
+    def aborted(self) -> bool:
+        return bool(self.redis.exists(self._aborted))
+
+    def stats(self) -> dict:
+        return {
+            "total": self.total(),
+            "pending": int(self.redis.llen(self._pending)),
+            "processing": int(self.redis.llen(self._processing)),
+            "done": int(self.redis.scard(self._done)),
+        }
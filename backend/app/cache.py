@@ -0,0 +1,183 @@
+"""Two-tier caching helpers: an in-process LRU backed by a shared Redis tier."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from backend.app.redis_client import get_redis_connection
+
+LOGGER = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else float(ttl_seconds)
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class TwoTierCache:
+    """JSON-value cache with a local LRU tier in front of a shared Redis tier.
+
+    Reads check the local tier first, then Redis (promoting hits into the local
+    tier). Writes go to both tiers. Redis failures are logged and the Redis tier
+    is skipped for ``redis_retry_seconds`` so an outage never slows callers down
+    by more than one connection timeout.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        max_entries: int = 1024,
+        ttl_seconds: float = 86400.0,
+        redis_client=None,
+        use_redis: bool = True,
+        redis_retry_seconds: float = 30.0,
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = float(ttl_seconds)
+        self.local = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.use_redis = use_redis
+        self.redis_retry_seconds = redis_retry_seconds
+        self._redis = redis_client
+        self._redis_disabled_until = 0.0
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            "local_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "redis_errors": 0,
+        }
+
+    def redis_key(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return f"cache:{self.namespace}:{digest}"
+
+    def _incr(self, name: str) -> None:
+        with self._stats_lock:
+            self._counters[name] += 1
+
+    def _redis_client(self):
+        if not self.use_redis:
+            return None
+        if time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._redis is None:
+            self._redis = get_redis_connection()
+        return self._redis
+
+    def _redis_failed(self, action: str, exc: Exception) -> None:
+        self._incr("redis_errors")
+        self._redis_disabled_until = time.monotonic() + self.redis_retry_seconds
+        LOGGER.warning(
+            "Redis %s failed for cache '%s'; using local tier only for %ss: %s",
+            action,
+            self.namespace,
+            self.redis_retry_seconds,
+            exc,
+        )
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for ``key`` or ``None`` on a miss."""
+
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._incr("local_hits")
+            return value
+
+        client = self._redis_client()
+        if client is not None:
+            try:
+                raw = client.get(self.redis_key(key))
+            except Exception as exc:
+                self._redis_failed("read", exc)
+                raw = None
+            if raw is not None:
+                try:
+                    value = json.loads(raw)
+                except (TypeError, ValueError):
+                    value = _MISSING
+                if value is not _MISSING:
+                    self.local.set(key, value)
+                    self._incr("redis_hits")
+                    return value
+
+        self._incr("misses")
+        return None
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a JSON-serialisable ``value`` in both tiers."""
+
+        ttl = self.ttl_seconds if ttl_seconds is None else float(ttl_seconds)
+        self.local.set(key, value, ttl)
+        self._incr("sets")
+
+        client = self._redis_client()
+        if client is None:
+            return
+        try:
+            client.set(self.redis_key(key), json.dumps(value), ex=max(1, int(ttl)))
+        except Exception as exc:
+            self._redis_failed("write", exc)
+
+    def clear_local(self) -> None:
+        self.local.clear()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            counters = dict(self._counters)
+        lookups = counters["local_hits"] + counters["redis_hits"] + counters["misses"]
+        hits = counters["local_hits"] + counters["redis_hits"]
+        counters["evictions"] = self.local.evictions
+        counters["local_size"] = len(self.local)
+        counters["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return counters
@@ -0,0 +1,159 @@
+"""Per-provider circuit breakers for outbound Serper and LLM calls.
+
+After ``CIRCUIT_FAILURE_THRESHOLD`` consecutive failures (connection errors,
+timeouts, 5xx) a provider's breaker opens and calls fail fast with
+``ProviderUnavailable`` instead of walking every row through its retry
+ladder. After ``CIRCUIT_RESET_SECONDS`` the breaker goes half-open and lets
+one probe request through: success closes it, failure re-opens it.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+CIRCUIT_BREAKERS_ENABLED = os.getenv("CIRCUIT_BREAKERS_ENABLED", "1") != "0"
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailable(Exception):
+    """Raised instead of calling a provider whose breaker is open."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} is unavailable (circuit open); retry in {retry_after:.1f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = CIRCUIT_RESET_SECONDS,
+        enabled: bool = CIRCUIT_BREAKERS_ENABLED,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.enabled = enabled
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._counters = {"opened": 0, "rejected": 0, "probes": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _retry_after_locked(self) -> float:
+        if self._state == OPEN:
+            return max(0.0, self._opened_at + self.reset_seconds - time.monotonic())
+        # Half-open with the probe still running: check back shortly.
+        return min(1.0, self.reset_seconds)
+
+    def allow(self) -> bool:
+        """Return whether a call may proceed, claiming the probe slot when half-open."""
+
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._counters["probes"] += 1
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def check(self) -> None:
+        """Raise ``ProviderUnavailable`` unless a call may proceed."""
+
+        if not self.allow():
+            raise ProviderUnavailable(self.name, self.retry_after())
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return self._retry_after_locked()
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                LOGGER.info("Circuit for %s closed after a successful probe", self.name)
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._counters["opened"] += 1
+                    LOGGER.warning(
+                        "Circuit for %s opened after %d consecutive failures", self.name, self._failures
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot claimed by a call that was never sent."""
+
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self._state, "consecutive_failures": self._failures, **self._counters}
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(provider)
+        if breaker is None:
+            breaker = _BREAKERS[provider] = CircuitBreaker(provider)
+        return breaker
+
+
+def breaker_stats() -> Dict[str, dict]:
+    with _BREAKERS_LOCK:
+        breakers = list(_BREAKERS.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
+
+
+def record_outcome(provider: str, ok: bool) -> None:
+    breaker = get_breaker(provider)
+    if ok:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+
+
+def is_outage_status(status_code: Optional[int]) -> bool:
+    """5xx responses count against the breaker; 4xx (including 429) do not."""
+
+    return status_code is not None and status_code >= 500
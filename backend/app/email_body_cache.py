@@ -0,0 +1,75 @@
+"""Content-addressed cache for generated and cleaned email bodies.
+
+Rows whose research resolves to the same payload (company-only research for
+several contacts, or a re-run of the same list with the same offer) would
+otherwise repeat the generation and cleaning calls with byte-identical
+inputs. The key is a hash of the normalized research JSON, the job's
+compiled prompt prefix (service components and rules), the models and
+temperature, and the cleaning mode.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Optional
+
+from backend.app.cache import TwoTierCache
+from backend.app.email_cleaning import CLEANING_MODEL
+from backend.app.gpt_helpers import GENERATION_TEMPERATURE, GROQ_SIF_MODEL, PromptPlan
+
+EMAIL_BODY_CACHE_ENABLED = os.getenv("EMAIL_BODY_CACHE_ENABLED", "1") != "0"
+
+_CACHE = TwoTierCache(
+    "email_body",
+    max_entries=int(os.getenv("EMAIL_BODY_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.getenv("EMAIL_BODY_CACHE_TTL_SECONDS", str(7 * 86400))),
+    use_redis=os.getenv("EMAIL_BODY_CACHE_REDIS", "1") != "0",
+)
+
+
+def cache_enabled(meta: Optional[dict]) -> bool:
+    """Jobs opt out with ``meta["email_body_cache"] = False``."""
+
+    if not EMAIL_BODY_CACHE_ENABLED:
+        return False
+    return (meta or {}).get("email_body_cache", True) is not False
+
+
+def email_body_key(research_components: str, prompt_plan: PromptPlan, cleaning_mode: str) -> Optional[str]:
+    """Return the cache key, or ``None`` when the research is not a JSON object."""
+
+    try:
+        research = json.loads(research_components or "")
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(research, dict):
+        return None
+    material = json.dumps(
+        {
+            "research": research,
+            "prompt": prompt_plan.static_prefix,
+            "model": GROQ_SIF_MODEL,
+            "temperature": GENERATION_TEMPERATURE,
+            "cleaning_model": CLEANING_MODEL,
+            "cleaning_mode": cleaning_mode,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def get_email_body(key: str) -> Optional[str]:
+    value = _CACHE.get(key)
+    return value if isinstance(value, str) else None
+
+
+def set_email_body(key: str, email_body: str) -> None:
+    _CACHE.set(key, email_body)
+
+
+def email_body_cache_stats() -> dict:
+    return _CACHE.stats()
@@ -3,12 +3,21 @@ Email cleaning pipeline using LLM to post-process generated emails.
 Removes first names, em dashes, hyphens, and improves readability.
 """
 
+import json
+import logging
 import os
+import re
 import requests
-from typing import Optional
+from typing import List, Optional, Tuple
+
+from backend.app.circuit_breaker import ProviderUnavailable
+from backend.app.llm_client import post_chat_completion
+from backend.app.tokens import estimate_tokens
+
+LOGGER = logging.getLogger(__name__)
 
 # Groq API configuration for cleaning
-GROQ_ENDPOINT = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_ENDPOINT = os.getenv("GROQ_ENDPOINT", "https://api.groq.com/openai/v1/chat/completions")
 CLEANING_MODEL = "llama-3.1-8b-instant"
 
 
@@ -64,11 +73,14 @@ Return ONLY the cleaned email text, nothing else."""
             "max_completion_tokens": 2000,
         }
 
-        response = requests.post(
+        response = post_chat_completion(
             GROQ_ENDPOINT,
             headers=headers,
-            json=json_payload,
+            payload=json_payload,
+            model=CLEANING_MODEL,
+            tokens=estimate_tokens(cleaning_prompt) + estimate_tokens(email_body),
             timeout=30,
+            stage="cleaning",
         )
 
         if response.status_code != 200:
@@ -89,6 +101,8 @@ Return ONLY the cleaned email text, nothing else."""
 
         return cleaned_content.strip()
 
+    except ProviderUnavailable:
+        raise
     except requests.exceptions.Timeout:
         print("Email cleaning request timed out, returning original")
         return email_body
@@ -100,13 +114,83 @@ Return ONLY the cleaned email text, nothing else."""
         return email_body
 
 
-def quick_clean_email_body(email_body: str) -> str:
+# Job-level cleaning modes: "llm" cleans every row with the model, "rules"
+# only runs the local rule engine, and "hybrid" runs the rules and escalates
+# to the model only when the quality check fails.
+CLEANING_MODES = ("llm", "rules", "hybrid")
+DEFAULT_CLEANING_MODE = os.getenv("EMAIL_CLEANING_MODE", "hybrid")
+
+# Sentences longer than this are treated as a readability failure.
+MAX_SENTENCE_WORDS = 45
+
+# Dash punctuation only: em dashes, spaced en dashes and spaced or doubled
+# hyphens. Hyphenated words ("follow-up", "Jean-Luc") are left alone.
+_NUMERIC_RANGE = re.compile(r"(?<=\d)\s*[\u2013\u2014]\s*(?=\d)")
+_DASH_PUNCTUATION = re.compile(r"\s*\u2014\s*|\s+\u2013\s+|\s*-{2,}\s*|\s+-\s+")
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_INNER_WHITESPACE = re.compile(r"\s+")
+_SPACE_BEFORE_PUNCT = re.compile(r"\s+([.,!?;:])")
+_REPEATED_COMMA = re.compile(r",\s*,+")
+_COMMA_BEFORE_STOP = re.compile(r",\s*([.!?])")
+_LEADING_PUNCT = re.compile(r"^[\s,;:]+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_LOWER_SENTENCE_START = re.compile(r"(^|[.!?]\s+)([a-z])")
+_DASH_CHARS = re.compile(r"[\u2014\u2013]|\s-\s")
+
+
+def recipient_name_from_research(research_components: str) -> Optional[str]:
+    """Return the prospect's first name from research JSON, if present."""
+
+    try:
+        parsed = json.loads(research_components or "")
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(parsed, dict):
+        return None
+    for section in ("prospect_info", "person"):
+        info = parsed.get(section)
+        if isinstance(info, dict) and isinstance(info.get("name"), str):
+            first = info["name"].strip().split(" ")[0].strip(".,")
+            if len(first) > 1 and first.isalpha():
+                return first
+    return None
+
+
+def _name_patterns(name: str) -> List["re.Pattern"]:
+    escaped = re.escape(name)
+    return [
+        # "Hi Chris," / "Chris," opening a paragraph or sentence.
+        re.compile(rf"(^|(?<=[.!?])\s+)(?:(?:hi|hey|hello|dear)\s+)?{escaped}\s*[,!:]\s*", re.IGNORECASE),
+        # Vocative mid-sentence: "..., Chris, ..." or "..., Chris."
+        re.compile(rf",\s*{escaped}(?=\s*[,.!?])", re.IGNORECASE),
+    ]
+
+
+def _clean_paragraph(paragraph: str, name_patterns: List["re.Pattern"]) -> str:
+    text = _INNER_WHITESPACE.sub(" ", paragraph).strip()
+    for pattern in name_patterns:
+        text = pattern.sub(lambda m: m.group(1) if m.re.groups else "", text)
+    text = _NUMERIC_RANGE.sub(" to ", text)
+    text = _DASH_PUNCTUATION.sub(", ", text)
+    text = _SPACE_BEFORE_PUNCT.sub(r"\1", text)
+    text = _REPEATED_COMMA.sub(",", text)
+    text = _COMMA_BEFORE_STOP.sub(r"\1", text)
+    text = _LEADING_PUNCT.sub("", text)
+    text = _INNER_WHITESPACE.sub(" ", text).strip()
+    return _LOWER_SENTENCE_START.sub(lambda m: m.group(1) + m.group(2).upper(), text)
+
+
+def quick_clean_email_body(email_body: str, recipient_name: Optional[str] = None) -> str:
     """
     Faster rule-based cleaning without LLM call.
-    Use this as a fallback or for faster processing.
+
+    Removes ``recipient_name`` where it is used to address the reader,
+    turns dash punctuation into commas and numeric ranges into "to", and
+    tidies whitespace and punctuation while keeping paragraph breaks.
 
     Args:
         email_body: The raw email body text to clean
+        recipient_name: The prospect's first name, e.g. from research
 
     Returns:
         Cleaned email body text
@@ -114,24 +198,50 @@ def quick_clean_email_body(email_body: str) -> str:
     if not email_body or not email_body.strip():
         return email_body
 
-    cleaned = email_body
-
-    # Replace em dashes with regular dashes or spaces
-    cleaned = cleaned.replace('—', ' - ')
-    cleaned = cleaned.replace('–', ' - ')  # en dash
-
-    # Remove common first name patterns at start of sentences
-    # This is a simple regex-based approach
-    import re
+    name_patterns = _name_patterns(recipient_name) if recipient_name else []
+    paragraphs = [
+        _clean_paragraph(paragraph, name_patterns)
+        for paragraph in _PARAGRAPH_SPLIT.split(email_body.replace("\r\n", "\n"))
+    ]
+    return "\n\n".join(paragraph for paragraph in paragraphs if paragraph)
 
-    # Pattern: name followed by comma at start of line or after period
-    # Example: "Chris, I saw..." -> "I saw..."
-    cleaned = re.sub(r'(?:^|\. )([A-Z][a-z]+),\s+', r'\1', cleaned)
 
-    # Clean up multiple spaces
-    cleaned = re.sub(r'\s+', ' ', cleaned)
+def email_quality_issues(email_body: str, recipient_name: Optional[str] = None) -> List[str]:
+    """Return the reasons a cleaned email still needs the LLM cleaner (empty if fine)."""
 
-    # Clean up spacing around punctuation
-    cleaned = re.sub(r'\s+([.,!?])', r'\1', cleaned)
-
-    return cleaned.strip()
+    if not email_body or not email_body.strip():
+        return ["empty"]
+    issues = []
+    if _DASH_CHARS.search(email_body):
+        issues.append("dash")
+    if recipient_name and re.search(rf"\b{re.escape(recipient_name)}\b", email_body, re.IGNORECASE):
+        issues.append("recipient_name")
+    for paragraph in _PARAGRAPH_SPLIT.split(email_body):
+        if any(len(sentence.split()) > MAX_SENTENCE_WORDS for sentence in _SENTENCE_END.split(paragraph)):
+            issues.append("long_sentence")
+            break
+    return issues
+
+
+def clean_email_body_for_mode(
+    email_body: str,
+    mode: str = DEFAULT_CLEANING_MODE,
+    recipient_name: Optional[str] = None,
+) -> Tuple[str, bool]:
+    """Clean ``email_body`` according to the job's cleaning ``mode``.
+
+    Returns ``(cleaned, escalated)`` where ``escalated`` is True when the LLM
+    cleaner was called.
+    """
+    if mode == "llm":
+        return clean_email_body(email_body), True
+
+    cleaned = quick_clean_email_body(email_body, recipient_name)
+    if mode == "rules":
+        return cleaned, False
+
+    issues = email_quality_issues(cleaned, recipient_name)
+    if not issues:
+        return cleaned, False
+    LOGGER.debug("Local email cleaning failed quality check (%s); escalating to LLM", ", ".join(issues))
+    return clean_email_body(cleaned), True
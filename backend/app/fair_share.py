@@ -0,0 +1,207 @@
+"""Fair-share dispatch of micro-batches across users.
+
+Jobs on the micro-batch scheduler register here, and drainers ask
+``next_batch()`` for work from any job instead of serving a single one.
+Users with registered jobs sit on a Redis ring walked with deficit
+round-robin: each visit tops the user's deficit up by their plan's quantum
+and every batch handed out costs one unit, so a user keeps being served
+while their deficit lasts and then the ring moves on. A free user's 50-row
+job is interleaved with a pro user's 20,000-row upload instead of waiting
+behind it.
+
+A user already holding ``FAIR_SHARE_MAX_INFLIGHT_PER_USER`` batches is
+passed over while anyone else has work; when nobody else does, the cap is
+lifted so idle workers still drain the big job. In-flight counts are read
+from each job's processing list, so a crashed worker does not leak them.
+The ring is updated without a global lock: concurrent drainers can skew the
+order slightly, but batch claims themselves stay atomic.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+from backend.app.batch_scheduler import MICRO_BATCH_KEY_TTL_SECONDS, MicroBatchQueue
+from backend.app.redis_client import get_redis_connection
+
+LOGGER = logging.getLogger(__name__)
+
+FAIR_SHARE_ENABLED = os.getenv("FAIR_SHARE_ENABLED", "1") != "0"
+FAIR_SHARE_MAX_INFLIGHT_PER_USER = int(os.getenv("FAIR_SHARE_MAX_INFLIGHT_PER_USER", "4"))
+
+# Batches per ring visit; paid plans get proportionally more of a busy cluster.
+PLAN_QUANTA = {"free": 1.0, "starter": 2.0, "growth": 3.0, "pro": 4.0}
+
+_RING = "fairshare:ring"
+_MEMBERS = "fairshare:members"
+_DEFICIT = "fairshare:deficit"
+_QUANTUM = "fairshare:quantum"
+
+
+def plan_quantum(plan_type: Optional[str]) -> float:
+    """Quantum for a ``profiles.plan_type`` (annual and monthly variants share one)."""
+
+    base = str(plan_type or "free").replace("_annual", "").replace("_monthly", "")
+    return PLAN_QUANTA.get(base, PLAN_QUANTA["free"])
+
+
+@dataclass(frozen=True)
+class FairShareClaim:
+    """One micro-batch handed to a drainer, with what it needs to process it."""
+
+    job_id: str
+    user_id: str
+    batch_id: int
+    payload: dict
+    context: dict
+    # Lease holder of the claim, for renewing the lease while the batch runs.
+    worker_id: str = ""
+
+
+class FairShareScheduler:
+    """Deficit round-robin over users with registered micro-batch jobs."""
+
+    def __init__(
+        self,
+        *,
+        redis_client=None,
+        max_inflight_per_user: int = FAIR_SHARE_MAX_INFLIGHT_PER_USER,
+        key_ttl_seconds: int = MICRO_BATCH_KEY_TTL_SECONDS,
+    ):
+        self.max_inflight_per_user = max(1, max_inflight_per_user)
+        self.key_ttl_seconds = key_ttl_seconds
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_connection()
+        return self._redis
+
+    def _batches(self, job_id: str) -> MicroBatchQueue:
+        return MicroBatchQueue(job_id, redis_client=self.redis)
+
+    @staticmethod
+    def _jobs_key(user_id: str) -> str:
+        return f"fairshare:user:{user_id}:jobs"
+
+    @staticmethod
+    def _context_key(job_id: str) -> str:
+        return f"fairshare:job:{job_id}"
+
+    def register(self, job_id: str, user_id: str, quantum: float, context: dict) -> None:
+        """Make a job's batches available to fair-share drainers.
+
+        ``context`` holds the JSON-serialisable arguments its batches are
+        processed with (meta, total rows, final headers).
+        """
+
+        self.redis.set(
+            self._context_key(job_id), json.dumps({**context, "user_id": user_id}), ex=self.key_ttl_seconds
+        )
+        self.redis.rpush(self._jobs_key(user_id), job_id)
+        self.redis.hset(_QUANTUM, user_id, quantum)
+        self._join_ring(user_id)
+
+    def _join_ring(self, user_id: str) -> None:
+        # The ring is walked from the tail, so the head is the end of the current round.
+        if self.redis.sadd(_MEMBERS, user_id):
+            self.redis.lpush(_RING, user_id)
+
+    def job_context(self, job_id: str) -> Optional[dict]:
+        raw = self.redis.get(self._context_key(job_id))
+        return json.loads(raw) if raw else None
+
+    def users(self) -> List[str]:
+        return list(self.redis.lrange(_RING, 0, -1))
+
+    def in_flight(self, user_id: str) -> int:
+        return sum(self._batches(job_id).in_flight() for job_id in self.redis.lrange(self._jobs_key(user_id), 0, -1))
+
+    def _deficit(self, user_id: str) -> float:
+        return float(self.redis.hget(_DEFICIT, user_id) or 0.0)
+
+    def _rotate(self) -> Optional[str]:
+        """Move to the next user on the ring and grant them their quantum."""
+
+        # RPOPLPUSH on one list rotates it; the current user is always the tail.
+        self.redis.rpoplpush(_RING, _RING)
+        user_id = self.redis.lindex(_RING, -1)
+        if user_id is not None:
+            self.redis.hincrbyfloat(_DEFICIT, user_id, float(self.redis.hget(_QUANTUM, user_id) or 1.0))
+        return user_id
+
+    def next_batch(self) -> Optional[FairShareClaim]:
+        """Claim the next batch in fair-share order, or ``None`` if nothing is claimable."""
+
+        ring_size = len(self.users())
+        capped: List[str] = []
+        # The current user is served while their deficit lasts; every other
+        # user is visited at most once, and quanta >= 1 mean a visit can serve.
+        for _ in range(2 * ring_size + 1):
+            user_id = self.redis.lindex(_RING, -1)
+            if user_id is None:
+                return None
+            if self._deficit(user_id) < 1.0:
+                user_id = self._rotate()
+                if user_id is None:
+                    return None
+            if self.in_flight(user_id) >= self.max_inflight_per_user:
+                if user_id not in capped:
+                    capped.append(user_id)
+                self.redis.hset(_DEFICIT, user_id, 0)
+                continue
+            claim = self._claim_for_user(user_id)
+            if claim is None:
+                # Classic DRR: a user with nothing queued forfeits their deficit.
+                self.redis.hset(_DEFICIT, user_id, 0)
+                continue
+            self.redis.hincrbyfloat(_DEFICIT, user_id, -1.0)
+            return claim
+
+        # Nobody under their cap has work: let capped users use the idle capacity.
+        for user_id in capped:
+            claim = self._claim_for_user(user_id)
+            if claim is not None:
+                return claim
+        return None
+
+    def _claim_for_user(self, user_id: str) -> Optional[FairShareClaim]:
+        for job_id in self.redis.lrange(self._jobs_key(user_id), 0, -1):
+            batches = self._batches(job_id)
+            if batches.aborted():
+                self.retire(job_id, user_id)
+                continue
+            claimed = batches.claim()
+            if claimed is not None:
+                batch_id, payload = claimed
+                return FairShareClaim(
+                    job_id, user_id, batch_id, payload, self.job_context(job_id) or {}, batches.worker_id
+                )
+            if batches.total() is not None and batches.unfinished() == 0:
+                self.retire(job_id, user_id)
+        return None
+
+    def retire(self, job_id: str, user_id: str) -> None:
+        """Forget a finished or aborted job, and its user once they have none left."""
+
+        self.redis.lrem(self._jobs_key(user_id), 0, job_id)
+        self.redis.delete(self._context_key(job_id))
+        if self.redis.llen(self._jobs_key(user_id)):
+            return
+        self.redis.srem(_MEMBERS, user_id)
+        self.redis.lrem(_RING, 0, user_id)
+        self.redis.hdel(_DEFICIT, user_id)
+        # A job registered while the user was being removed puts them back.
+        if self.redis.llen(self._jobs_key(user_id)):
+            self._join_ring(user_id)
+
+    def stats(self) -> dict:
+        return {
+            user_id: {"deficit": self._deficit(user_id), "in_flight": self.in_flight(user_id)}
+            for user_id in self.users()
+        }
@@ -1,41 +1,43 @@
 import json
 import logging
 import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 
 import requests
 
+from backend.app.circuit_breaker import ProviderUnavailable
+from backend.app.json_repair import repair_json
+from backend.app.llm_client import post_chat_completion
+from backend.app.tokens import estimate_tokens
+
 
 LOGGER = logging.getLogger(__name__)
 
-GROQ_CHAT_ENDPOINT = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_CHAT_ENDPOINT = os.getenv("GROQ_ENDPOINT", "https://api.groq.com/openai/v1/chat/completions")
 GROQ_SIF_MODEL = "openai/gpt-oss-120b"
+GENERATION_TEMPERATURE = 0.7
+# Reasoning plus a ~150 word body; used only for rate-limit token budgeting.
+GENERATION_COMPLETION_TOKEN_ESTIMATE = 1000
+# Batched entries shorter than this are treated as invalid and regenerated singly.
+BATCH_EMAIL_MIN_WORDS = 25
 
-def generate_full_email_body(research_components: str, service_context: str) -> str:
-    """Generate a full email body using Groq with structured research."""
-
-    if not research_components or not research_components.strip():
-        return "Email body unavailable: missing research."
+@dataclass(frozen=True)
+class PromptPlan:
+    """Generation prompt pieces compiled once per job from the service context.
 
-    cleaned_research = research_components.strip()
-    if cleaned_research.lower().startswith("research unavailable"):
-        return "Email body unavailable: research unavailable."
+    ``static_prefix`` holds everything that is identical for every row of a
+    job (service components, rules, formatting), so it forms a stable prefix
+    for providers that cache prompt prefixes. Rows only append their research.
+    """
 
-    try:
-        parsed_research = json.loads(cleaned_research)
-    except json.JSONDecodeError:
-        LOGGER.warning("Research JSON could not be parsed: %s", cleaned_research)
-        return "Email body unavailable: invalid research JSON."
+    static_prefix: str
 
-    if not isinstance(parsed_research, dict):
-        LOGGER.warning("Research payload is not a JSON object: %s", cleaned_research)
-        return "Email body unavailable: invalid research JSON."
+    def build_user_prompt(self, parsed_research: dict) -> str:
+        return f"{self.static_prefix}RESEARCH COMPONENTS:\n{json.dumps(parsed_research, indent=2)}"
 
-    groq_key = os.getenv("GROQ_API_KEY")
-    if not groq_key:
-        LOGGER.warning("GROQ_API_KEY not configured; skipping email generation")
-        return "Email body unavailable: missing Groq API key."
 
-    # Parse service context as JSON
+def _parse_service_components(service_context: str) -> dict:
     service_components = {}
     if service_context and service_context.strip():
         try:
@@ -59,6 +61,13 @@ def generate_full_email_body(research_components: str, service_context: str) ->
                 "key_differentiator": "",
                 "cta": "",
             }
+    return service_components
+
+
+def compile_prompt_plan(service_context: str) -> PromptPlan:
+    """Build the job-level ``PromptPlan`` for ``service_context``."""
+
+    service_components = _parse_service_components(service_context)
 
     include_fallback = service_components.get("include_fallback")
     fallback_enabled = include_fallback is True
@@ -103,51 +112,218 @@ def generate_full_email_body(research_components: str, service_context: str) ->
         third_paragraph += " plus forward request if they're not the right contact"
     formatting_lines.append(f"{third_paragraph}\n\n")
 
-    user_prompt = (
+    static_prefix = (
         "Write a cold email body based on these components. DO NOT include greetings, footers, or signatures.\n\n"
-        f"RESEARCH COMPONENTS:\n{json.dumps(parsed_research, indent=2)}\n\n"
         f"SERVICE COMPONENTS:\n{json.dumps(service_components, indent=2)}\n\n"
         "CRITICAL RULES:\n"
         + "".join(critical_rules)
         + "- FORMATTING: Break the email into 3 clear paragraphs separated by blank lines:\n"
         + "".join(formatting_lines)
-        + "Write ONLY the email body (no \"Hi\", no \"Best\", no signature)."
+        + "Write ONLY the email body (no \"Hi\", no \"Best\", no signature).\n\n"
     )
+    return PromptPlan(static_prefix=static_prefix)
+
+
+def _parse_research_for_generation(research_components: str) -> Tuple[Optional[dict], Optional[str]]:
+    """Return ``(parsed_research, None)`` or ``(None, fallback_body)`` when it cannot be used."""
+
+    if not research_components or not research_components.strip():
+        return None, "Email body unavailable: missing research."
+
+    cleaned_research = research_components.strip()
+    if cleaned_research.lower().startswith("research unavailable"):
+        return None, "Email body unavailable: research unavailable."
 
     try:
-        response = requests.post(
-            GROQ_CHAT_ENDPOINT,
-            headers={
-                "Authorization": f"Bearer {groq_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": GROQ_SIF_MODEL,
-                "messages": [
-                    {"role": "user", "content": user_prompt},
-                ],
-                "temperature": 0.7,
-                "max_completion_tokens": 11200,
-            },
-            timeout=30,
-        )
-        response.raise_for_status()
-        payload = response.json()
-        if not isinstance(payload, dict):
-            raise ValueError("Groq response was not a JSON object")
-        choices = payload.get("choices") or []
-        if not choices:
-            raise ValueError("Groq response missing choices")
-        first_choice = choices[0] or {}
-        if not isinstance(first_choice, dict):
-            raise ValueError("Groq response choices malformed")
-        message = first_choice.get("message") or {}
-        if not isinstance(message, dict):
-            raise ValueError("Groq response message malformed")
-        content = (message.get("content") or "").strip()
-        if not content:
-            raise ValueError("Groq response missing message content")
-        return content
+        parsed_research = json.loads(cleaned_research)
+    except json.JSONDecodeError:
+        LOGGER.warning("Research JSON could not be parsed: %s", cleaned_research)
+        return None, "Email body unavailable: invalid research JSON."
+
+    if not isinstance(parsed_research, dict):
+        LOGGER.warning("Research payload is not a JSON object: %s", cleaned_research)
+        return None, "Email body unavailable: invalid research JSON."
+    return parsed_research, None
+
+
+def _post_generation_request(groq_key: str, user_prompt: str, completion_tokens: int, **extra_payload):
+    return post_chat_completion(
+        GROQ_CHAT_ENDPOINT,
+        headers={
+            "Authorization": f"Bearer {groq_key}",
+            "Content-Type": "application/json",
+        },
+        payload={
+            "model": GROQ_SIF_MODEL,
+            "messages": [
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": GENERATION_TEMPERATURE,
+            "max_completion_tokens": 11200,
+            **extra_payload,
+        },
+        model=GROQ_SIF_MODEL,
+        tokens=estimate_tokens(user_prompt) + completion_tokens,
+        timeout=30,
+        hedge=True,
+        stage="generation",
+    )
+
+
+def _response_content(response) -> str:
+    """Validate a chat completion response and return its message content."""
+
+    response.raise_for_status()
+    payload = response.json()
+    if not isinstance(payload, dict):
+        raise ValueError("Groq response was not a JSON object")
+    choices = payload.get("choices") or []
+    if not choices:
+        raise ValueError("Groq response missing choices")
+    first_choice = choices[0] or {}
+    if not isinstance(first_choice, dict):
+        raise ValueError("Groq response choices malformed")
+    message = first_choice.get("message") or {}
+    if not isinstance(message, dict):
+        raise ValueError("Groq response message malformed")
+    content = (message.get("content") or "").strip()
+    if not content:
+        raise ValueError("Groq response missing message content")
+    return content
+
+
+def generate_full_email_body(
+    research_components: str,
+    service_context: str,
+    prompt_plan: Optional[PromptPlan] = None,
+) -> str:
+    """Generate a full email body using Groq with structured research.
+
+    Pass the job's ``prompt_plan`` to skip recompiling it from
+    ``service_context`` for every row.
+    """
+
+    parsed_research, fallback = _parse_research_for_generation(research_components)
+    if parsed_research is None:
+        return fallback
+
+    groq_key = os.getenv("GROQ_API_KEY")
+    if not groq_key:
+        LOGGER.warning("GROQ_API_KEY not configured; skipping email generation")
+        return "Email body unavailable: missing Groq API key."
+
+    if prompt_plan is None:
+        prompt_plan = compile_prompt_plan(service_context)
+    user_prompt = prompt_plan.build_user_prompt(parsed_research)
+
+    try:
+        response = _post_generation_request(groq_key, user_prompt, GENERATION_COMPLETION_TOKEN_ESTIMATE)
+        return _response_content(response)
+    except ProviderUnavailable:
+        raise
     except Exception as exc:
         LOGGER.exception("Groq email generation request failed: %s", exc)
         return "Email body unavailable: failed to generate email body."
+
+
+def _build_batch_generation_prompt(prompt_plan: PromptPlan, items: List[Tuple[str, dict]]) -> str:
+    sections = "".join(
+        f"PROSPECT {row_id}\nRESEARCH COMPONENTS:\n{json.dumps(research, indent=2)}\n\n"
+        for row_id, research in items
+    )
+    return (
+        f"{prompt_plan.static_prefix}"
+        "Write one separate email body for EACH prospect below, following the rules above and using "
+        "only that prospect's research.\n\n"
+        f"{sections}"
+        "Return ONLY a JSON object in this structure, with exactly one entry per prospect:\n"
+        '{"emails": [{"id": "PROSPECT id exactly as given", "email_body": "The email body with '
+        'paragraphs separated by blank lines"}]}'
+    )
+
+
+def _parse_batch_emails(content: str, row_ids: List[str]) -> Dict[str, str]:
+    """Validate a batched generation response, returning email bodies by row id.
+
+    Entries that are missing, unknown, duplicated, empty or implausibly short
+    are left out so the caller can generate them one at a time.
+    """
+
+    payload = repair_json(content)
+    if isinstance(payload, dict):
+        payload = next((value for value in payload.values() if isinstance(value, list)), None)
+    if not isinstance(payload, list):
+        return {}
+
+    wanted = set(row_ids)
+    bodies: Dict[str, str] = {}
+    for element in payload:
+        if not isinstance(element, dict):
+            continue
+        row_id = str(element.get("id") or "").strip()
+        body = element.get("email_body")
+        if row_id not in wanted or row_id in bodies or not isinstance(body, str):
+            continue
+        body = body.strip()
+        if len(body.split()) < BATCH_EMAIL_MIN_WORDS:
+            continue
+        bodies[row_id] = body
+    return bodies
+
+
+def generate_email_bodies_batch(
+    items: List[Tuple[str, str]],
+    service_context: str,
+    prompt_plan: Optional[PromptPlan] = None,
+    fallback: bool = True,
+) -> Dict[str, str]:
+    """Generate email bodies for several rows with one completion.
+
+    ``items`` pairs a row id with that row's research string. The model
+    returns a JSON array keyed by row id; each entry is validated and rows
+    whose entry is missing or invalid fall back to ``generate_full_email_body``.
+    Returns a body (or the usual unavailable text) for every row id. With
+    ``fallback=False`` those rows are left out instead, so each caller can
+    regenerate its own row.
+    """
+
+    if prompt_plan is None:
+        prompt_plan = compile_prompt_plan(service_context)
+
+    results: Dict[str, str] = {}
+    parsed_items: List[Tuple[str, dict]] = []
+    for row_id, research_components in items:
+        parsed_research, fallback_body = _parse_research_for_generation(research_components)
+        if parsed_research is None:
+            results[row_id] = fallback_body
+        else:
+            parsed_items.append((row_id, parsed_research))
+
+    groq_key = os.getenv("GROQ_API_KEY")
+    if len(parsed_items) > 1 and groq_key:
+        user_prompt = _build_batch_generation_prompt(prompt_plan, parsed_items)
+        try:
+            response = _post_generation_request(
+                groq_key,
+                user_prompt,
+                GENERATION_COMPLETION_TOKEN_ESTIMATE * len(parsed_items),
+                response_format={"type": "json_object"},
+            )
+            results.update(_parse_batch_emails(_response_content(response), [row_id for row_id, _ in parsed_items]))
+        except ProviderUnavailable:
+            raise
+        except Exception as exc:
+            LOGGER.exception("Batched email generation failed for %d rows: %s", len(parsed_items), exc)
+        LOGGER.info(
+            "Batched email generation returned %d/%d valid bodies",
+            sum(1 for row_id, _ in parsed_items if row_id in results),
+            len(parsed_items),
+        )
+
+    if not fallback:
+        return results
+    research_by_id = dict(items)
+    for row_id, _ in parsed_items:
+        if row_id not in results:
+            results[row_id] = generate_full_email_body(research_by_id[row_id], service_context, prompt_plan)
+    return results
@@ -0,0 +1,151 @@
+"""Thread-safe per-job counters reported in a job's ``timing_json``.
+
+Counters from a job's chunks or micro-batches are summed into Redis running
+totals (``JobTotals``) as each one finishes. ``finalize_job`` reads them once,
+instead of every batch rewriting a per-batch entry into ``timing_json``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Dict, Mapping, Tuple
+
+from backend.app.redis_client import get_redis_connection
+
+LOGGER = logging.getLogger(__name__)
+
+JOB_TOTALS_TTL_SECONDS = int(os.getenv("JOB_TOTALS_TTL_SECONDS", str(2 * 24 * 3600)))
+
+# Derived ratios added to summaries: name -> (numerator counter, denominator counter).
+RATE_METRICS: Dict[str, Tuple[str, str]] = {
+    "prospect_store_hit_rate": ("prospect_store_hits", "prospect_store_lookups"),
+    "cleaning_escalation_rate": ("cleaning_escalations", "cleaning_rows"),
+    "email_body_cache_hit_rate": ("email_body_cache_hits", "email_body_cache_lookups"),
+}
+
+# Queue depth maxima and averages do not add up across batches, so only these are totalled.
+_ADDITIVE_STAGE_FIELDS = ("processed", "errors", "busy_seconds", "blocked_seconds")
+
+
+class JobStats:
+    """Counters incremented from row worker threads."""
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._counts.get(name, 0)
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+def merge_counts(*counts: Mapping[str, int]) -> Dict[str, int]:
+    """Sum several counter dictionaries (e.g. one per chunk)."""
+
+    merged: Dict[str, int] = {}
+    for entry in counts:
+        for name, value in (entry or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[name] = merged.get(name, 0) + value
+    return merged
+
+
+def summarize_counts(counts: Mapping[str, int]) -> Dict[str, float]:
+    """Return ``counts`` plus the derived ratios from ``RATE_METRICS``."""
+
+    summary: Dict[str, float] = dict(counts)
+    for rate_name, (numerator, denominator) in RATE_METRICS.items():
+        total = counts.get(denominator, 0)
+        if total:
+            summary[rate_name] = round(counts.get(numerator, 0) / total, 4)
+    return summary
+
+
+class JobTotals:
+    """Running totals of a job's counters, summed across workers in Redis hashes.
+
+    Each ``section`` (e.g. "rows", "stages") is one hash of additive counters.
+    Totals are reporting only: Redis errors are logged and swallowed.
+    """
+
+    def __init__(self, job_id: str, *, redis_client=None, ttl_seconds: int = JOB_TOTALS_TTL_SECONDS):
+        self.job_id = job_id
+        self.ttl_seconds = ttl_seconds
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_connection()
+        return self._redis
+
+    def _key(self, section: str) -> str:
+        return f"jobstats:{self.job_id}:{section}"
+
+    def add(self, section: str, counts: Mapping[str, float]) -> None:
+        numeric = {
+            name: value
+            for name, value in (counts or {}).items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and value
+        }
+        if not numeric:
+            return
+        key = self._key(section)
+        try:
+            for name, value in numeric.items():
+                self.redis.hincrbyfloat(key, name, value)
+            self.redis.expire(key, self.ttl_seconds)
+        except Exception as exc:  # noqa: BLE001 - never fail a batch over reporting
+            LOGGER.warning("Could not add %s totals for job %s: %s", section, self.job_id, exc)
+
+    def load(self, section: str) -> Dict[str, float]:
+        try:
+            raw = self.redis.hgetall(self._key(section)) or {}
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.warning("Could not load %s totals for job %s: %s", section, self.job_id, exc)
+            return {}
+        totals: Dict[str, float] = {}
+        for name, value in raw.items():
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                continue
+            totals[name] = int(number) if number.is_integer() else round(number, 3)
+        return totals
+
+    def clear(self, *sections: str) -> None:
+        try:
+            for section in sections:
+                self.redis.delete(self._key(section))
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.warning("Could not clear totals for job %s: %s", self.job_id, exc)
+
+
+def flatten_stage_metrics(stage_metrics: Mapping[str, Mapping[str, float]]) -> Dict[str, float]:
+    """``{"research": {"processed": 3}}`` -> ``{"research.processed": 3}``, additive fields only."""
+
+    return {
+        f"{stage}.{name}": value
+        for stage, metrics in (stage_metrics or {}).items()
+        for name, value in (metrics or {}).items()
+        if name in _ADDITIVE_STAGE_FIELDS
+    }
+
+
+def unflatten_stage_metrics(totals: Mapping[str, float]) -> Dict[str, Dict[str, float]]:
+    stages: Dict[str, Dict[str, float]] = {}
+    for field, value in totals.items():
+        stage, _, name = field.partition(".")
+        stages.setdefault(stage, {})[name] = value
+    return stages
+
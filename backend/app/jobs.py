@@ -3,23 +3,65 @@ import csv
 import json
 import time
 import math
-from typing import Optional, List, Dict, Tuple
-import pandas as pd
+import functools
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, List, Dict, Tuple
 import traceback
 import tempfile
 import shutil
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
-from backend.app.gpt_helpers import generate_full_email_body
-from backend.app.research import perform_research
-from backend.app.email_cleaning import clean_email_body
+from backend.app.gpt_helpers import (
+    PromptPlan,
+    compile_prompt_plan,
+    generate_email_bodies_batch,
+    generate_full_email_body,
+)
+from backend.app.research import (
+    PROVIDER_CALLS_PER_PROSPECT,
+    extraction_stats,
+    negative_research_result,
+    perform_research,
+    perform_research_batch,
+    serper_cache_stats,
+)
+from backend.app.email_cleaning import (
+    CLEANING_MODES,
+    DEFAULT_CLEANING_MODE,
+    clean_email_body_for_mode,
+    recipient_name_from_research,
+)
+from backend.app import email_body_cache, row_deadline
+from backend.app.batch_scheduler import MicroBatchQueue
+from backend.app.fair_share import FAIR_SHARE_ENABLED, FairShareScheduler, plan_quantum
+from backend.app.circuit_breaker import ProviderUnavailable, breaker_stats
+from backend.app.job_stats import (
+    JobStats,
+    JobTotals,
+    flatten_stage_metrics,
+    summarize_counts,
+    unflatten_stage_metrics,
+)
+from backend.app.llm_client import hedge_stats
+from backend.app.llm_router import get_router
+from backend.app.micro_batch import MicroBatcher
+from backend.app.prospect_store import get_prospect_store
+from backend.app.query_planner import plan_queries
+from backend.app.result_writer import (
+    csv_columns,
+    iter_csv_rows,
+    resolve_result_columns,
+    write_result_xlsx,
+)
+from backend.app.row_checkpoint import RowJournal
+from backend.app.row_pipeline import Stage, StagedPipeline
 from backend.app.supabase_client import supabase
 from datetime import datetime, timedelta
 import redis
 import rq
 import requests
 from redis.exceptions import LockError
-from rq import get_current_job
+from rq import Retry, get_current_job
 from supabase import StorageException
 from openpyxl import load_workbook
 
@@ -54,9 +96,204 @@ RAW_CHUNK_BUCKET = "inputs"
 # Parallel processing configuration
 PARALLEL_ROWS_PER_WORKER = int(os.getenv('PARALLEL_ROWS_PER_WORKER', '20'))
 
+# Staged row pipeline: "staged" gives research, generation and cleaning their
+# own pools with bounded queues between them; "threaded" runs each row end to
+# end on one thread. Jobs can override with meta["row_pipeline"].
+ROW_PIPELINE_MODE = os.getenv('ROW_PIPELINE_MODE', 'staged')
+RESEARCH_STAGE_WORKERS = int(os.getenv('RESEARCH_STAGE_WORKERS', str(PARALLEL_ROWS_PER_WORKER)))
+GENERATION_STAGE_WORKERS = int(os.getenv('GENERATION_STAGE_WORKERS', str(PARALLEL_ROWS_PER_WORKER)))
+CLEANING_STAGE_WORKERS = int(os.getenv('CLEANING_STAGE_WORKERS', str(max(2, PARALLEL_ROWS_PER_WORKER // 4))))
+ROW_STAGE_QUEUE_SIZE = int(os.getenv('ROW_STAGE_QUEUE_SIZE', str(PARALLEL_ROWS_PER_WORKER * 2)))
+# Rows per batched generation completion (1 = one request per row); per job via meta.
+GENERATION_BATCH_SIZE = int(os.getenv('GENERATION_BATCH_SIZE', '1'))
+# How long a row waits for others to fill its generation batch.
+GENERATION_BATCH_WAIT_SECONDS = float(os.getenv('GENERATION_BATCH_WAIT_SECONDS', '0.5'))
+# How long a row waits for an open provider circuit before failing as usual.
+CIRCUIT_MAX_PAUSE_SECONDS = float(os.getenv('CIRCUIT_MAX_PAUSE_SECONDS', '900'))
+# Extra attempts for a failed subjob before the job fails; rows finished by an
+# earlier attempt are journaled and skipped.
+SUBJOB_MAX_RETRIES = int(os.getenv('SUBJOB_MAX_RETRIES', '2'))
+
+# "chunks" splits a job into WORKER_COUNT chunks fixed at dispatch time;
+# "micro_batch" pushes small batches to a Redis work queue drained by every
+# live worker. Jobs can override with meta["scheduler"].
+JOB_SCHEDULER = os.getenv('JOB_SCHEDULER', 'chunks')
+MICRO_BATCH_ROWS = int(os.getenv('MICRO_BATCH_ROWS', '25'))
+# Drainer jobs enqueued per job; drainers that find nothing left exit at once.
+MICRO_BATCH_MAX_DRAINERS = int(os.getenv('MICRO_BATCH_MAX_DRAINERS', '32'))
+# How long an idle drainer waits for batches still being split or held elsewhere.
+MICRO_BATCH_IDLE_SECONDS = float(os.getenv('MICRO_BATCH_IDLE_SECONDS', '60'))
+MICRO_BATCH_POLL_SECONDS = float(os.getenv('MICRO_BATCH_POLL_SECONDS', '1'))
+
 GENERATED_OUTPUT_COLUMNS = ("email_body", "sif_personalized_line")
 
 
+def _llm_metrics() -> dict:
+    """Worker-wide hedging, provider health, circuit and research extraction counters."""
+
+    return {
+        "hedging": hedge_stats(),
+        "providers": get_router().stats(),
+        "circuits": breaker_stats(),
+        "extraction": extraction_stats(),
+    }
+
+
+def _research_batch_size(meta: Optional[dict]) -> int:
+    """Resolve how many prospects share one Groq extraction request for a job."""
+    meta = _ensure_dict(meta)
+    value = meta.get("research_batch_size") or os.getenv("RESEARCH_BATCH_SIZE", "1")
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _row_deadline_seconds(meta: Optional[dict]) -> float:
+    """Resolve the per-row time budget for a job (``meta["row_deadline_seconds"]``)."""
+    meta = _ensure_dict(meta)
+    try:
+        return float(meta.get("row_deadline_seconds") or row_deadline.ROW_DEADLINE_SECONDS)
+    except (TypeError, ValueError):
+        return row_deadline.ROW_DEADLINE_SECONDS
+
+
+def _generation_batch_size(meta: Optional[dict]) -> int:
+    """Resolve how many rows share one generation completion (``meta["generation_batch_size"]``)."""
+    meta = _ensure_dict(meta)
+    try:
+        return max(1, int(meta.get("generation_batch_size") or GENERATION_BATCH_SIZE))
+    except (TypeError, ValueError):
+        return max(1, GENERATION_BATCH_SIZE)
+
+
+def _new_generation_batcher(
+    meta: Optional[dict],
+    prompt_plan: Optional[PromptPlan],
+    stats: Optional[JobStats] = None,
+) -> Optional[MicroBatcher]:
+    """Return a per-chunk batcher coalescing generation calls, or ``None`` when batching is off."""
+    batch_size = _generation_batch_size(meta)
+    if batch_size <= 1:
+        return None
+    service_context = _ensure_dict(meta).get("service", "{}")
+
+    def generate_batch(research_items: List[str]) -> List[Optional[str]]:
+        if stats:
+            stats.incr("generation_batches")
+            stats.incr("generation_batched_rows", len(research_items))
+        # Rows without a valid body come back as None and are regenerated by
+        # their own row worker, under that row's deadline.
+        bodies = generate_email_bodies_batch(
+            [(str(index), research) for index, research in enumerate(research_items)],
+            service_context,
+            prompt_plan,
+            fallback=False,
+        )
+        return [bodies.get(str(index)) for index in range(len(research_items))]
+
+    return MicroBatcher(generate_batch, batch_size, GENERATION_BATCH_WAIT_SECONDS)
+
+
+def _cleaning_mode(meta: Optional[dict]) -> str:
+    """Resolve the job's email cleaning mode ("llm", "rules" or "hybrid")."""
+    meta = _ensure_dict(meta)
+    mode = str(meta.get("cleaning_mode") or DEFAULT_CLEANING_MODE).strip().lower()
+    return mode if mode in CLEANING_MODES else "hybrid"
+
+
+def _negative_research(email_value: str, stats: Optional[JobStats] = None) -> Optional[str]:
+    """Return the cached fallback for a prospect known to yield no research, counting savings."""
+    cached = negative_research_result(email_value)
+    if cached is not None and stats:
+        stats.incr("negative_cache_hits")
+        stats.incr("provider_calls_saved", PROVIDER_CALLS_PER_PROSPECT)
+    return cached
+
+
+def _research_with_store(email_value: str, stats: Optional[JobStats] = None) -> str:
+    """Return stored research for a repeat prospect, otherwise research and store it."""
+    store = get_prospect_store()
+    if store is not None and email_value:
+        if stats:
+            stats.incr("prospect_store_lookups")
+        stored = store.get(email_value)
+        if stored:
+            if stats:
+                stats.incr("prospect_store_hits")
+            return stored
+
+    cached = _negative_research(email_value, stats)
+    if cached is not None:
+        return cached
+
+    if stats:
+        stats.incr("query_plan_calls_saved", plan_queries(email_value).provider_calls_saved)
+    research_components = perform_research(email_value)
+    if store is not None:
+        store.put(email_value, research_components)
+    return research_components
+
+
+def _prefetch_research_batched(
+    rows: List[dict],
+    email_header: Optional[str],
+    batch_size: int,
+    job_id: str,
+    chunk_id: int,
+    stats: Optional[JobStats] = None,
+) -> Dict[str, str]:
+    """Research all emails in ``rows`` up front using batched Groq extraction."""
+    if not email_header:
+        return {}
+    emails = list(dict.fromkeys(
+        str(row.get(email_header) or "") for row in rows if row.get(email_header)
+    ))
+    research_by_email: Dict[str, str] = {}
+
+    store = get_prospect_store()
+    if store is not None:
+        for email in emails:
+            if stats:
+                stats.incr("prospect_store_lookups")
+            stored = store.get(email)
+            if stored:
+                if stats:
+                    stats.incr("prospect_store_hits")
+                research_by_email[email] = stored
+        emails = [email for email in emails if email not in research_by_email]
+    for email in emails:
+        cached = _negative_research(email, stats)
+        if cached is not None:
+            research_by_email[email] = cached
+    emails = [email for email in emails if email not in research_by_email]
+    if not emails:
+        return research_by_email
+    if stats:
+        for email in emails:
+            stats.incr("query_plan_calls_saved", plan_queries(email).provider_calls_saved)
+
+    batches = [emails[i:i + batch_size] for i in range(0, len(emails), batch_size)]
+    print(
+        f"[Worker] Job {job_id} | Chunk {chunk_id} | Batched research: {len(emails)} emails in {len(batches)} batches of up to {batch_size}"
+    )
+    with ThreadPoolExecutor(max_workers=min(len(batches), PARALLEL_ROWS_PER_WORKER)) as executor:
+        futures = {
+            executor.submit(perform_research_batch, batch, batch_size): batch for batch in batches
+        }
+        for future in as_completed(futures):
+            try:
+                batch_results = future.result()
+                research_by_email.update(batch_results)
+                if store is not None:
+                    for email, research_components in batch_results.items():
+                        store.put(email, research_components)
+            except Exception as exc:
+                # Rows without prefetched research fall back to per-row research
+                print(f"[Worker] Job {job_id} | Chunk {chunk_id} | Batched research failed: {exc}")
+    return research_by_email
+
+
 def _ensure_dict(value):
     if not value:
         return {}
@@ -197,19 +434,62 @@ def _chunk_raw_local_path(job_id: str, chunk_id: int) -> str:
     return os.path.join(local_dir, f"chunk_{chunk_id}.csv")
 
 
-def _persist_chunk_rows(job_id: str, chunk_id: int, headers: List[str], rows: List[Dict[str, str]], user_id: str) -> str:
-    headers = list(headers or [])
-    local_path = _chunk_raw_local_path(job_id, chunk_id)
-    with open(local_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        for row in rows:
-            normalized = {}
-            for header in headers:
-                value = row.get(header, "")
-                normalized[header] = "" if value is None else value
-            writer.writerow(normalized)
+class _StreamingChunker:
+    """Write incoming rows straight into raw chunk CSVs on local disk.
 
+    Each chunk file is sealed once it holds ``chunk_size`` rows and handed to
+    ``on_sealed(chunk_id, local_path)``, so at most one chunk's file handle
+    (and no rows) is held in memory while the input is read.
+    """
+
+    def __init__(self, job_id: str, headers: List[str], chunk_size: int, on_sealed):
+        self.job_id = job_id
+        self.headers = list(headers or [])
+        self.chunk_size = max(1, chunk_size)
+        self.on_sealed = on_sealed
+        self.chunk_count = 0
+        self._file = None
+        self._writer = None
+        self._rows_in_chunk = 0
+
+    def add(self, row: Dict[str, str]) -> None:
+        if self._writer is None:
+            self.chunk_count += 1
+            self._file = open(
+                _chunk_raw_local_path(self.job_id, self.chunk_count), "w", newline="", encoding="utf-8"
+            )
+            self._writer = csv.DictWriter(self._file, fieldnames=self.headers)
+            self._writer.writeheader()
+        normalized = {}
+        for header in self.headers:
+            value = row.get(header, "")
+            normalized[header] = "" if value is None else value
+        self._writer.writerow(normalized)
+        self._rows_in_chunk += 1
+        if self._rows_in_chunk >= self.chunk_size:
+            self._seal()
+
+    def _seal(self) -> None:
+        self._file.close()
+        self._file = None
+        self._writer = None
+        self._rows_in_chunk = 0
+        self.on_sealed(self.chunk_count, _chunk_raw_local_path(self.job_id, self.chunk_count))
+
+    def close(self) -> int:
+        """Seal the final partial chunk and return the number of chunks written."""
+        if self._writer is not None:
+            self._seal()
+        return self.chunk_count
+
+    def abort(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+
+def _upload_chunk_file(job_id: str, chunk_id: int, local_path: str, user_id: str) -> str:
     storage_path = f"{user_id}/{job_id}/raw_chunks/chunk_{chunk_id}.csv"
     with open(local_path, "rb") as f:
         _upload_to_storage(
@@ -351,30 +631,12 @@ def _finalize_empty_job(
     timings: dict,
     job_start: float,
 ):
-    columns: List[str] = []
-    seen = set()
-
-    for header in list(final_headers or []):
-        if not header or header in seen:
-            continue
-        columns.append(header)
-        seen.add(header)
+    columns = resolve_result_columns(final_headers, GENERATED_OUTPUT_COLUMNS)
 
-    for generated in GENERATED_OUTPUT_COLUMNS:
-        if generated not in seen:
-            columns.append(generated)
-            seen.add(generated)
-
-    if not columns:
-        columns = list(GENERATED_OUTPUT_COLUMNS)
-
-    empty_df = pd.DataFrame(columns=columns)
     local_dir = tempfile.mkdtemp()
-    out_csv = os.path.join(local_dir, f"{job_id}_final.csv")
     out_xlsx = os.path.join(local_dir, f"{job_id}_final.xlsx")
     try:
-        empty_df.to_csv(out_csv, index=False)
-        empty_df.to_excel(out_xlsx, index=False, engine="openpyxl")
+        write_result_xlsx(out_xlsx, columns, [])
 
         storage_path = f"{user_id}/{job_id}/result.xlsx"
         with open(out_xlsx, "rb") as f:
@@ -865,6 +1127,7 @@ def _process_small_job_inline(
     final_output_headers: List[str],
     timings: dict,
     job_start: float,
+    prompt_plan: Optional[PromptPlan] = None,
 ):
     """
     Process small jobs (<100 rows) inline without chunking.
@@ -888,63 +1151,49 @@ def _process_small_job_inline(
         
     print(f"[Worker] Job {job_id} | Processing {len(rows)} rows in parallel (inline, no chunks)")
 
-    # Process all rows in parallel
-    results = []
-    with ThreadPoolExecutor(max_workers=PARALLEL_ROWS_PER_WORKER) as executor:
-        futures = {}
-        for i, row in enumerate(rows):
-            future = executor.submit(
-                _process_single_row,
-                i,
-                row,
-                row_headers,
-                email_header,
-                meta,
-                job_id,
-                0,  # chunk_id (not used for inline)
-            )
-            futures[future] = i
+    stats = JobStats()
+    precomputed_research = {}
+    batch_size = _research_batch_size(meta)
+    if batch_size > 1:
+        precomputed_research = _prefetch_research_batched(
+            rows, email_header, batch_size, job_id, 0, stats
+        )
 
-        # Collect results as they complete
-        for future in as_completed(futures):
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as exc:
-                row_idx = futures[future]
-                print(f"[Worker] Job {job_id} | Inline row {row_idx} failed: {exc}")
-                # Add error row
-                error_row = {header: "" for header in row_headers}
-                if email_header:
-                    error_row[email_header] = ""
-                error_row["email_body"] = f"Error: {str(exc)}"
-                error_row["sif_personalized_line"] = ""
-                results.append((row_idx, error_row, str(exc)))
+    # Process all rows in parallel
+    ctx = _RowContext(
+        row_headers,
+        email_header,
+        meta,
+        job_id,
+        0,  # chunk_id (not used for inline)
+        precomputed_research,
+        stats,
+        prompt_plan,
+        generation_batcher=_new_generation_batcher(meta, prompt_plan, stats),
+    )
+    stage_metrics: dict = {}
+    results = list(_iter_processed_rows(rows, ctx, stage_metrics))
 
     # Sort by original row index
     results.sort(key=lambda x: x[0])
 
     timings["inline_processing"] = record_time(f"Inline processing ({total} rows)", inline_start, job_id)
+    timings["row_stats"] = summarize_counts(stats.as_dict())
+    if stage_metrics:
+        timings["stage_metrics"] = stage_metrics
+    timings["llm_metrics"] = _llm_metrics()
 
-    # Write final result
+    # Write final result, expected output headers first
     output_start = time.time()
-    final_df = pd.DataFrame([normalized_row for _, normalized_row, _ in results])
-
-    # Ensure all output headers are present
-    for header in final_output_headers:
-        if header not in final_df.columns:
-            final_df[header] = ""
-
-    # Reorder columns to match expected output
-    ordered_cols = [col for col in final_output_headers if col in final_df.columns]
-    extra_cols = [col for col in final_df.columns if col not in ordered_cols]
-    final_df = final_df[ordered_cols + extra_cols]
+    output_rows = [normalized_row for _, normalized_row, _ in results]
+    columns = resolve_result_columns(
+        final_output_headers, (column for row in output_rows for column in row)
+    )
 
-    # Write to temp files
     local_dir = tempfile.mkdtemp()
     out_xlsx = os.path.join(local_dir, f"{job_id}_final.xlsx")
     try:
-        final_df.to_excel(out_xlsx, index=False, engine="openpyxl")
+        write_result_xlsx(out_xlsx, columns, output_rows)
 
         # Upload final result
         storage_path = f"{user_id}/{job_id}/result.xlsx"
@@ -972,6 +1221,242 @@ def _process_small_job_inline(
         shutil.rmtree(local_dir, ignore_errors=True)
 
 
+@dataclass
+class _RowState:
+    """A row travelling through the research, generation and cleaning stages."""
+
+    row_index: int
+    row: dict
+    email_value: str
+    research_components: str = "Research unavailable: unexpected error."
+    email_body: str = "Email body unavailable: unexpected error."
+    generation_failed: bool = False
+    body_cache_key: Optional[str] = None
+    body_cached: bool = False
+    deadline: Optional[float] = None
+    # When the row last left a stage; time spent queued for the next one is not charged.
+    left_stage_at: Optional[float] = None
+
+
+class _ChunkPause:
+    """Tracks rows of a chunk waiting on an open provider circuit, logging once per pause."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._waiting = 0
+        self._paused_at: Optional[float] = None
+
+    def enter(self, job_id: str, chunk_id: int, exc: ProviderUnavailable) -> None:
+        with self._lock:
+            self._waiting += 1
+            if self._paused_at is None:
+                self._paused_at = time.monotonic()
+                print(f"[Worker] Job {job_id} | Chunk {chunk_id} | Paused: {exc}")
+
+    def leave(self, job_id: str, chunk_id: int, stats: Optional[JobStats]) -> None:
+        with self._lock:
+            self._waiting -= 1
+            if self._waiting or self._paused_at is None:
+                return
+            paused_seconds = time.monotonic() - self._paused_at
+            self._paused_at = None
+        if stats:
+            stats.incr("circuit_pauses")
+            stats.incr("circuit_pause_seconds", int(round(paused_seconds)))
+        print(f"[Worker] Job {job_id} | Chunk {chunk_id} | Resumed after {paused_seconds:.1f}s provider pause")
+
+
+@dataclass(frozen=True)
+class _RowContext:
+    """Per-chunk inputs shared by every row's stage functions."""
+
+    row_headers: List[str]
+    email_header: Optional[str]
+    meta: dict
+    job_id: str
+    chunk_id: int
+    precomputed_research: Dict[str, str]
+    stats: Optional[JobStats] = None
+    prompt_plan: Optional[PromptPlan] = None
+    pause: _ChunkPause = field(default_factory=_ChunkPause)
+    generation_batcher: Optional[MicroBatcher] = None
+
+
+def _call_pausing_on_outage(ctx: _RowContext, fn, *args):
+    """Call ``fn``, holding the row while a provider circuit is open.
+
+    The row waits (with the rest of the chunk's in-flight rows) until the
+    breaker's half-open probe succeeds, then retries. After
+    ``CIRCUIT_MAX_PAUSE_SECONDS`` the ``ProviderUnavailable`` propagates and
+    the stage falls back to its usual unavailable text. Paused time does not
+    count against the row deadline.
+    """
+    paused_at = None
+    try:
+        while True:
+            try:
+                return fn(*args)
+            except ProviderUnavailable as exc:
+                now = time.monotonic()
+                if paused_at is None:
+                    paused_at = now
+                    ctx.pause.enter(ctx.job_id, ctx.chunk_id, exc)
+                remaining = CIRCUIT_MAX_PAUSE_SECONDS - (now - paused_at)
+                if remaining <= 0:
+                    raise
+                wait_seconds = min(max(exc.retry_after, 0.1), remaining)
+                time.sleep(wait_seconds)
+                row_deadline.extend(wait_seconds)
+    finally:
+        if paused_at is not None:
+            ctx.pause.leave(ctx.job_id, ctx.chunk_id, ctx.stats)
+
+
+def _with_row_deadline(stage_fn):
+    """Run a row stage under the row's deadline, starting it on the first stage.
+
+    The budget covers stage execution only: in the staged pipeline, the time
+    a row waits in the queue for the next stage's workers pushes the deadline
+    back instead of using it up.
+    """
+
+    @functools.wraps(stage_fn)
+    def run(ctx: _RowContext, state: _RowState):
+        if state.deadline is None:
+            state.deadline = row_deadline.new_deadline(_row_deadline_seconds(ctx.meta))
+        elif state.left_stage_at is not None:
+            state.deadline += time.monotonic() - state.left_stage_at
+        with row_deadline.scope(state.deadline):
+            try:
+                return stage_fn(ctx, state)
+            finally:
+                # Keep extensions made while the stage was paused.
+                state.deadline = row_deadline.current()
+                state.left_stage_at = time.monotonic()
+
+    return run
+
+
+@_with_row_deadline
+def _research_stage(ctx: _RowContext, state: _RowState) -> _RowState:
+    if ctx.stats:
+        ctx.stats.incr(f"query_plan_{plan_queries(state.email_value).category}")
+    try:
+        precomputed = (
+            ctx.precomputed_research.get(str(state.email_value or "")) if ctx.email_header else None
+        )
+        if precomputed is not None:
+            state.research_components = precomputed
+        else:
+            state.research_components = _call_pausing_on_outage(
+                ctx, _research_with_store, state.email_value, ctx.stats
+            )
+    except Exception as research_exc:
+        error_msg = f"Research error: {research_exc}"
+        print(f"[Worker] Job {ctx.job_id} | Chunk {ctx.chunk_id} | Row {state.row_index + 1} | {error_msg}")
+        state.research_components = f"Research unavailable: {str(research_exc)}"
+    return state
+
+
+@_with_row_deadline
+def _generation_stage(ctx: _RowContext, state: _RowState) -> _RowState:
+    if ctx.prompt_plan is not None and email_body_cache.cache_enabled(ctx.meta):
+        state.body_cache_key = email_body_cache.email_body_key(
+            state.research_components, ctx.prompt_plan, _cleaning_mode(ctx.meta)
+        )
+        if state.body_cache_key:
+            if ctx.stats:
+                ctx.stats.incr("email_body_cache_lookups")
+            cached = email_body_cache.get_email_body(state.body_cache_key)
+            if cached is not None:
+                if ctx.stats:
+                    ctx.stats.incr("email_body_cache_hits")
+                state.email_body = cached
+                state.body_cached = True
+                return state
+    try:
+        service_context = ctx.meta.get("service", "{}")
+        email_body = None
+        if ctx.generation_batcher is not None:
+            email_body = _call_pausing_on_outage(ctx, ctx.generation_batcher.submit, state.research_components)
+            if email_body is None and ctx.stats:
+                ctx.stats.incr("generation_batch_fallbacks")
+        if email_body is None:
+            email_body = _call_pausing_on_outage(
+                ctx,
+                generate_full_email_body,
+                state.research_components,
+                service_context,
+                ctx.prompt_plan,
+            )
+        state.email_body = email_body
+    except Exception as email_exc:
+        error_msg = f"Email generation error: {email_exc}"
+        print(f"[Worker] Job {ctx.job_id} | Chunk {ctx.chunk_id} | Row {state.row_index + 1} | {error_msg}")
+        state.email_body = f"Email unavailable: {str(email_exc)}"
+        state.generation_failed = True
+    return state
+
+
+@_with_row_deadline
+def _cleaning_stage(ctx: _RowContext, state: _RowState) -> Tuple[int, dict, Optional[str]]:
+    if not state.generation_failed and not state.body_cached:
+        try:
+            state.email_body, escalated = _call_pausing_on_outage(
+                ctx,
+                clean_email_body_for_mode,
+                state.email_body,
+                _cleaning_mode(ctx.meta),
+                recipient_name_from_research(state.research_components),
+            )
+            if ctx.stats:
+                ctx.stats.incr("cleaning_rows")
+                if escalated:
+                    ctx.stats.incr("cleaning_escalations")
+            if state.body_cache_key and not state.email_body.lower().startswith("email body unavailable"):
+                email_body_cache.set_email_body(state.body_cache_key, state.email_body)
+        except Exception as email_exc:
+            error_msg = f"Email generation error: {email_exc}"
+            print(f"[Worker] Job {ctx.job_id} | Chunk {ctx.chunk_id} | Row {state.row_index + 1} | {error_msg}")
+            state.email_body = f"Email unavailable: {str(email_exc)}"
+
+    # Build normalized row
+    normalized_row = {}
+    for header in ctx.row_headers:
+        value = state.row.get(header, "")
+        normalized_row[header] = "" if value is None else value
+
+    if ctx.email_header:
+        normalized_row[ctx.email_header] = "" if state.email_value is None else state.email_value
+
+    normalized_row["email_body"] = state.email_body
+
+    # Extract first paragraph for sif_personalized_line
+    paragraphs = state.email_body.split('\n\n')
+    first_paragraph = paragraphs[0].strip() if paragraphs else ""
+    normalized_row["sif_personalized_line"] = first_paragraph
+
+    return (state.row_index, normalized_row, None)
+
+
+def _row_error_result(ctx: _RowContext, row_index: int, row: dict, exc: Exception) -> Tuple[int, dict, str]:
+    # Return error row if anything fails
+    error_msg = f"Row processing error: {exc}"
+    print(f"[Worker] Job {ctx.job_id} | Chunk {ctx.chunk_id} | Row {row_index + 1} | CRITICAL ERROR: {error_msg}")
+    traceback.print_exc()
+
+    # Build error row with empty values
+    error_row = {}
+    for header in ctx.row_headers:
+        error_row[header] = row.get(header, "")
+    if ctx.email_header:
+        error_row[ctx.email_header] = row.get(ctx.email_header, "")
+    error_row["email_body"] = f"Error: {str(exc)}"
+    error_row["sif_personalized_line"] = ""
+
+    return (row_index, error_row, str(exc))
+
+
 def _process_single_row(
     row_index: int,
     row: dict,
@@ -980,78 +1465,160 @@ def _process_single_row(
     meta: dict,
     job_id: str,
     chunk_id: int,
+    precomputed_research: Optional[str] = None,
+    stats: Optional[JobStats] = None,
+    prompt_plan: Optional[PromptPlan] = None,
+    generation_batcher: Optional[MicroBatcher] = None,
 ) -> Tuple[int, dict, Optional[str]]:
     """
-    Process a single row in a thread.
+    Process a single row in a thread, running every stage back to back.
+
+    ``precomputed_research`` (from batched research) skips the per-row research call.
+    ``stats`` collects per-job counters such as prospect store hits.
+    ``prompt_plan`` is the job's compiled generation prompt.
+    ``generation_batcher`` (shared by the chunk's rows) batches generation calls.
+    The row's deadline (``ROW_DEADLINE_SECONDS`` or ``meta["row_deadline_seconds"]``)
+    starts here and caps every provider call in the three stages.
 
     Returns:
         tuple: (row_index, normalized_row_dict, error_message)
     """
+    email_value = row.get(email_header, "") if email_header else ""
+    ctx = _RowContext(
+        row_headers,
+        email_header,
+        meta,
+        job_id,
+        chunk_id,
+        {str(email_value or ""): precomputed_research} if precomputed_research is not None else {},
+        stats,
+        prompt_plan,
+        generation_batcher=generation_batcher,
+    )
     try:
-        email_value = row.get(email_header, "") if email_header else ""
+        state = _RowState(
+            row_index, row, email_value, deadline=row_deadline.new_deadline(_row_deadline_seconds(meta))
+        )
+        state = _research_stage(ctx, state)
+        state = _generation_stage(ctx, state)
+        return _cleaning_stage(ctx, state)
+    except Exception as exc:
+        return _row_error_result(ctx, row_index, row, exc)
 
-        # Perform research
-        research_components = "Research unavailable: unexpected error."
-        try:
-            research_components = perform_research(email_value)
-        except Exception as research_exc:
-            error_msg = f"Research error: {research_exc}"
-            print(f"[Worker] Job {job_id} | Chunk {chunk_id} | Row {row_index + 1} | {error_msg}")
-            research_components = f"Research unavailable: {str(research_exc)}"
-
-        # Generate email body
-        email_body = "Email body unavailable: unexpected error."
-        try:
-            service_context = meta.get("service", "{}")
-            email_body = generate_full_email_body(
-                research_components,
-                service_context,
-            )
-            # Apply cleaning pipeline
-            email_body = clean_email_body(email_body)
-        except Exception as email_exc:
-            error_msg = f"Email generation error: {email_exc}"
-            print(f"[Worker] Job {job_id} | Chunk {chunk_id} | Row {row_index + 1} | {error_msg}")
-            email_body = f"Email unavailable: {str(email_exc)}"
 
-        # Build normalized row
-        normalized_row = {}
-        for header in row_headers:
-            value = row.get(header, "")
-            normalized_row[header] = "" if value is None else value
+def _user_plan_type(user_id: str) -> str:
+    """Plan of the job owner for fair-share weighting; "free" when it cannot be read."""
+    try:
+        res = supabase.table("profiles").select("plan_type").eq("id", user_id).limit(1).execute()
+    except Exception as exc:
+        print(f"[Worker] Could not load plan for user {user_id}: {exc}")
+        return "free"
+    return (res.data[0].get("plan_type") if res.data else None) or "free"
 
-        if email_header:
-            normalized_row[email_header] = "" if email_value is None else email_value
 
-        normalized_row["email_body"] = email_body
+def _job_scheduler(meta: Optional[dict]) -> str:
+    """Resolve whether a job is split into fixed chunks or drained as micro-batches."""
+    meta = _ensure_dict(meta)
+    mode = str(meta.get("scheduler") or JOB_SCHEDULER).strip().lower()
+    return mode if mode in ("chunks", "micro_batch") else "chunks"
 
-        # Extract first paragraph for sif_personalized_line
-        paragraphs = email_body.split('\n\n')
-        first_paragraph = paragraphs[0].strip() if paragraphs else ""
-        normalized_row["sif_personalized_line"] = first_paragraph
 
-        return (row_index, normalized_row, None)
+def _micro_batch_rows(meta: Optional[dict]) -> int:
+    """Resolve the rows per micro-batch for a job (``meta["micro_batch_rows"]``)."""
+    meta = _ensure_dict(meta)
+    try:
+        return max(1, int(meta.get("micro_batch_rows") or MICRO_BATCH_ROWS))
+    except (TypeError, ValueError):
+        return max(1, MICRO_BATCH_ROWS)
 
-    except Exception as exc:
-        # Return error row if anything fails
-        error_msg = f"Row processing error: {exc}"
-        print(f"[Worker] Job {job_id} | Chunk {chunk_id} | Row {row_index + 1} | CRITICAL ERROR: {error_msg}")
-        traceback.print_exc()
 
-        # Build error row with empty values
-        error_row = {}
-        for header in row_headers:
-            error_row[header] = row.get(header, "")
-        if email_header:
-            error_row[email_header] = row.get(email_header, "")
-        error_row["email_body"] = f"Error: {str(exc)}"
-        error_row["sif_personalized_line"] = ""
+def _row_pipeline_mode(meta: Optional[dict]) -> str:
+    """Resolve whether rows run through the staged pipeline or one thread per row."""
+    meta = _ensure_dict(meta)
+    mode = str(meta.get("row_pipeline") or ROW_PIPELINE_MODE).strip().lower()
+    return mode if mode in ("staged", "threaded") else "staged"
+
+
+def _iter_processed_rows(
+    rows: List[dict],
+    ctx: _RowContext,
+    stage_metrics: Optional[dict] = None,
+) -> Iterator[Tuple[int, dict, Optional[str]]]:
+    """Process ``rows`` and yield ``(row_index, normalized_row, error)`` as rows complete.
+
+    In "staged" mode research, generation and cleaning each run in their own
+    bounded pool, so a throttled provider only backs up its own stage. Per-stage
+    metrics are written into ``stage_metrics`` when the rows are done.
+    """
+    email_header = ctx.email_header
+
+    def new_state(indexed_row):
+        index, row = indexed_row
+        return _RowState(index, row, row.get(email_header, "") if email_header else "")
 
-        return (row_index, error_row, str(exc))
+    if _row_pipeline_mode(ctx.meta) == "threaded":
+        with ThreadPoolExecutor(max_workers=PARALLEL_ROWS_PER_WORKER) as executor:
+            futures = {
+                executor.submit(
+                    _process_single_row,
+                    i,
+                    row,
+                    ctx.row_headers,
+                    email_header,
+                    ctx.meta,
+                    ctx.job_id,
+                    ctx.chunk_id,
+                    ctx.precomputed_research.get(str(row.get(email_header) or "")) if email_header else None,
+                    ctx.stats,
+                    ctx.prompt_plan,
+                    ctx.generation_batcher,
+                ): i
+                for i, row in enumerate(rows)
+            }
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as exc:
+                    # This should never happen because _process_single_row catches everything
+                    row_idx = futures[future]
+                    yield _row_error_result(ctx, row_idx, rows[row_idx], exc)
+        return
+
+    pipeline = StagedPipeline(
+        [
+            Stage("research", lambda state: _research_stage(ctx, state), RESEARCH_STAGE_WORKERS, ROW_STAGE_QUEUE_SIZE),
+            Stage("generation", lambda state: _generation_stage(ctx, state), GENERATION_STAGE_WORKERS, ROW_STAGE_QUEUE_SIZE),
+            Stage("cleaning", lambda state: _cleaning_stage(ctx, state), CLEANING_STAGE_WORKERS, ROW_STAGE_QUEUE_SIZE),
+        ],
+        on_error=lambda state, stage, exc: _row_error_result(ctx, state.row_index, state.row, exc),
+    )
+    try:
+        yield from pipeline.run(map(new_state, enumerate(rows)))
+    finally:
+        metrics = pipeline.metrics()
+        if stage_metrics is not None:
+            stage_metrics.update(metrics)
+        print(f"[Worker] Job {ctx.job_id} | Chunk {ctx.chunk_id} | Stage metrics: {metrics}")
 
 
-def process_subjob(job_id: str, chunk_id: int, chunk_storage_path: str, meta: dict, user_id: str, total_rows: int):
-    """Process a chunk of rows for a given job, with global progress logging."""
+def process_subjob(
+    job_id: str,
+    chunk_id: int,
+    chunk_storage_path: str,
+    meta: dict,
+    user_id: str,
+    total_rows: int,
+    prompt_plan: Optional[PromptPlan] = None,
+    attempts_left: Optional[int] = None,
+):
+    """Process a chunk of rows for a given job, with global progress logging.
+
+    ``prompt_plan`` is compiled once by ``process_job``; subjobs enqueued
+    without one compile it from ``meta``. Finished rows are journaled, so a
+    retry only processes the rest. While ``attempts_left`` (by default the RQ
+    job's remaining retries) is positive, a failure is re-raised for the
+    retry instead of failing the job.
+    """
     sub_start = time.time()
     processed_in_chunk = 0
     rows_since_last_report = 0
@@ -1101,107 +1668,118 @@ def process_subjob(job_id: str, chunk_id: int, chunk_storage_path: str, meta: di
 
         print(f"[Worker] Job {job_id} | Chunk {chunk_id} | Processing {len(rows)} rows in parallel with {PARALLEL_ROWS_PER_WORKER} workers")
 
-        # Parallel processing with ThreadPoolExecutor
-        results = []
-        completed_count = 0
+        if prompt_plan is None:
+            prompt_plan = compile_prompt_plan(meta.get("service", "{}"))
+        chunk_stats = JobStats()
+
+        # Rows finished by an earlier attempt of this chunk are not processed again.
+        journal = RowJournal(job_id, chunk_id)
+        journaled = {index: row for index, row in journal.load().items() if index < len(rows)}
+        pending = [(index, row) for index, row in enumerate(rows) if index not in journaled]
+        pending_rows = [row for _, row in pending]
+        if journaled:
+            chunk_stats.incr("rows_resumed", len(journaled))
+            print(
+                f"[Worker] Job {job_id} | Chunk {chunk_id} | Resuming: {len(journaled)} rows already done, {len(pending)} left"
+            )
+
+        precomputed_research = {}
+        batch_size = _research_batch_size(meta)
+        if batch_size > 1:
+            precomputed_research = _prefetch_research_batched(
+                pending_rows, email_header, batch_size, job_id, chunk_id, chunk_stats
+            )
+
+        # Parallel processing through the staged row pipeline
+        results = [(index, row, None) for index, row in journaled.items()]
+        completed_count = len(results)
         rows_since_last_report = 0
-        last_reported = 0
+        # Progress is reported every few rows, and failed rows are not journaled,
+        # so the earlier attempt may have reported fewer or more rows than were
+        # journaled. Reports carry on from what it actually reported.
+        last_reported = min(journal.reported, chunk_total_rows)
         progress_lock = Lock()
 
-        with ThreadPoolExecutor(max_workers=PARALLEL_ROWS_PER_WORKER) as executor:
-            # Submit all rows to thread pool
-            futures = {}
-            for i, row in enumerate(rows):
-                future = executor.submit(
-                    _process_single_row,
-                    i,  # row_index
-                    row,  # row dict
-                    row_headers,
-                    email_header,
-                    meta,
-                    job_id,
-                    chunk_id,
-                )
-                futures[future] = i
-
-            # Collect results as they complete
-            for future in as_completed(futures):
+        ctx = _RowContext(
+            row_headers,
+            email_header,
+            meta,
+            job_id,
+            chunk_id,
+            precomputed_research,
+            chunk_stats,
+            prompt_plan,
+            generation_batcher=_new_generation_batcher(meta, prompt_plan, chunk_stats),
+        )
+        stage_metrics: dict = {}
+        for pending_index, normalized_row, error in _iter_processed_rows(pending_rows, ctx, stage_metrics):
+            row_index = pending[pending_index][0]
+            results.append((row_index, normalized_row, error))
+            if not error:
+                journal.record(row_index, normalized_row)
+
+            # Update progress atomically
+            with progress_lock:
+                completed_count += 1
+                rows_since_last_report += 1
+                current = completed_count
+                rows_since = rows_since_last_report
+
+            # Update progress every 5 rows or on last row
+            is_last_row = current == chunk_total_rows
+            if rows_since >= 5 or is_last_row:
                 try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as exc:
-                    # This should never happen because _process_single_row catches everything
-                    row_idx = futures[future]
-                    print(f"[Worker] Job {job_id} | Chunk {chunk_id} | CRITICAL: Thread {row_idx} exception: {exc}")
-                    traceback.print_exc()
-                    # Add error result
-                    error_row = {header: "" for header in row_headers}
-                    if email_header:
-                        error_row[email_header] = ""
-                    error_row["email_body"] = f"Critical error: {str(exc)}"
-                    error_row["sif_personalized_line"] = ""
-                    results.append((row_idx, error_row, str(exc)))
-
-                # Update progress atomically
-                with progress_lock:
-                    completed_count += 1
-                    rows_since_last_report += 1
-                    current = completed_count
-                    rows_since = rows_since_last_report
-
-                # Update progress every 5 rows or on last row
-                is_last_row = current == chunk_total_rows
-                if rows_since >= 5 or is_last_row:
-                    try:
-                        last_reported, progress_info = _update_job_progress(
-                            job_id,
-                            total_rows,
-                            current,
-                            last_reported,
-                        )
-                    except RuntimeError as exc:
+                    last_reported, progress_info = _update_job_progress(
+                        job_id,
+                        total_rows,
+                        current,
+                        last_reported,
+                    )
+                    if progress_info:
+                        journal.record_reported(last_reported)
+                except RuntimeError as exc:
+                    print(
+                        f"[Worker] Job {job_id} | Chunk {chunk_id} | Progress update failed: {exc}"
+                    )
+                else:
+                    with progress_lock:
+                        rows_since_last_report = 0
+                    if progress_info:
+                        new_done = progress_info["new_done"]
+                        percent = progress_info["percent"]
+                        delta = progress_info["delta"]
                         print(
-                            f"[Worker] Job {job_id} | Chunk {chunk_id} | Progress update failed: {exc}"
+                            f"[Worker] Job {job_id} | Chunk {chunk_id} | Progress +{delta} -> {new_done}/{total_rows} rows ({percent}%)"
                         )
-                    else:
-                        with progress_lock:
-                            rows_since_last_report = 0
-                        if progress_info:
-                            new_done = progress_info["new_done"]
-                            percent = progress_info["percent"]
-                            delta = progress_info["delta"]
-                            print(
-                                f"[Worker] Job {job_id} | Chunk {chunk_id} | Progress +{delta} -> {new_done}/{total_rows} rows ({percent}%)"
-                            )
-                            # Insert progress into job_logs (for history/recovery)
-                            supabase.table("job_logs").insert(
-                                {
-                                    "job_id": job_id,
-                                    "step": new_done,
-                                    "total": total_rows,
-                                    "message": (
-                                        f"Global progress: +{delta} rows -> {new_done}/{total_rows} ({percent}%)"
-                                    ),
-                                }
-                            ).execute()
-
-                            # Publish real-time progress update to Redis pub/sub for WebSocket
-                            try:
-                                # Get current job status from database
-                                job_status_res = supabase.table("jobs").select("status").eq("id", job_id).single().execute()
-                                current_status = job_status_res.data.get("status", "in_progress") if job_status_res.data else "in_progress"
-
-                                progress_data = {
-                                    "job_id": job_id,
-                                    "status": current_status,
-                                    "percent": percent,
-                                    "message": f"Global progress: +{delta} rows -> {new_done}/{total_rows} ({percent}%)",
-                                }
-                                redis_conn.publish(f"job_progress:{job_id}", json.dumps(progress_data))
-                                print(f"[Worker] Published progress for job {job_id}: {percent}% to Redis channel job_progress:{job_id}")
-                            except Exception as pub_error:
-                                # Non-critical: WebSocket clients will fall back to polling
-                                print(f"[Worker] Job {job_id} | Failed to publish progress to Redis: {pub_error}")
+                        # Insert progress into job_logs (for history/recovery)
+                        supabase.table("job_logs").insert(
+                            {
+                                "job_id": job_id,
+                                "step": new_done,
+                                "total": total_rows,
+                                "message": (
+                                    f"Global progress: +{delta} rows -> {new_done}/{total_rows} ({percent}%)"
+                                ),
+                            }
+                        ).execute()
+
+                        # Publish real-time progress update to Redis pub/sub for WebSocket
+                        try:
+                            # Get current job status from database
+                            job_status_res = supabase.table("jobs").select("status").eq("id", job_id).single().execute()
+                            current_status = job_status_res.data.get("status", "in_progress") if job_status_res.data else "in_progress"
+
+                            progress_data = {
+                                "job_id": job_id,
+                                "status": current_status,
+                                "percent": percent,
+                                "message": f"Global progress: +{delta} rows -> {new_done}/{total_rows} ({percent}%)",
+                            }
+                            redis_conn.publish(f"job_progress:{job_id}", json.dumps(progress_data))
+                            print(f"[Worker] Published progress for job {job_id}: {percent}% to Redis channel job_progress:{job_id}")
+                        except Exception as pub_error:
+                            # Non-critical: WebSocket clients will fall back to polling
+                            print(f"[Worker] Job {job_id} | Failed to publish progress to Redis: {pub_error}")
 
         # Sort results by original row index to preserve order
         results.sort(key=lambda x: x[0])
@@ -1244,28 +1822,48 @@ def process_subjob(job_id: str, chunk_id: int, chunk_storage_path: str, meta: di
 
         elapsed = record_time(f"Chunk {chunk_id} row processing", sub_start, job_id)
 
-        job_record = (
-            supabase.table("jobs").select("timing_json").eq("id", job_id).limit(1).execute()
-        )
-        timings = {}
-        if job_record.data and job_record.data[0].get("timing_json"):
-            try:
-                timings = json.loads(job_record.data[0]["timing_json"])
-            except Exception:
-                timings = {}
-        if "chunks" not in timings:
-            timings["chunks"] = {}
-        timings["chunks"][str(chunk_id)] = elapsed
-        supabase.table("jobs").update({"timing_json": json.dumps(timings)}).eq("id", job_id).execute()
+        # Counters are summed into running totals that finalize_job reports once.
+        totals = JobTotals(job_id)
+        totals.add("rows", chunk_stats.as_dict())
+        totals.add("stages", flatten_stage_metrics(stage_metrics))
+        if _job_scheduler(meta) == "micro":
+            # Thousands of micro-batches would bloat timing_json with per-batch entries.
+            totals.add("batches", {"batches": 1, "batch_seconds": elapsed})
+        else:
+            job_record = (
+                supabase.table("jobs").select("timing_json").eq("id", job_id).limit(1).execute()
+            )
+            timings = {}
+            if job_record.data and job_record.data[0].get("timing_json"):
+                try:
+                    timings = json.loads(job_record.data[0]["timing_json"])
+                except Exception:
+                    timings = {}
+            if "chunks" not in timings:
+                timings["chunks"] = {}
+            timings["chunks"][str(chunk_id)] = elapsed
+            supabase.table("jobs").update({"timing_json": json.dumps(timings)}).eq("id", job_id).execute()
 
         print(f"[Worker] Finished chunk {chunk_id}/{chunk_total_rows} for job {job_id}")
+        print(f"[Worker] Job {job_id} | Chunk {chunk_id} | Serper cache stats: {serper_cache_stats()}")
+        print(f"[Worker] Job {job_id} | Chunk {chunk_id} | LLM stats: {_llm_metrics()}")
 
         _remove_from_storage(chunk_storage_path, f"raw chunk {chunk_id} for job {job_id}", bucket=RAW_CHUNK_BUCKET)
+        journal.clear()
         cleanup_local_raw = True
 
         return storage_path
 
     except Exception as exc:
+        if attempts_left is None:
+            rq_job = get_current_job()
+            attempts_left = (rq_job.retries_left or 0) if rq_job else 0
+        if attempts_left > 0:
+            print(
+                f"[Worker] Job {job_id} | Chunk {chunk_id} | Failed ({exc}); retrying with {attempts_left} attempt(s) left"
+            )
+            traceback.print_exc()
+            raise
         error_message = f"Chunk {chunk_id} failed: {exc}"
         print(f"[Worker] Chunk error for job {job_id}: {exc}")
         traceback.print_exc()
@@ -1313,6 +1911,164 @@ def process_subjob(job_id: str, chunk_id: int, chunk_storage_path: str, meta: di
                 )
 
 
+def _drainer_timeout() -> int:
+    """RQ timeout for a drainer: it stops claiming after one subjob timeout, so
+    the batch in hand always has a full subjob timeout left to finish."""
+    return 2 * _get_job_timeout()
+
+
+def _run_micro_batch(
+    batches: MicroBatchQueue,
+    batch_id: int,
+    payload: dict,
+    meta: dict,
+    user_id: str,
+    total_rows: int,
+    prompt_plan: Optional[PromptPlan],
+    final_headers: Optional[List[str]],
+) -> None:
+    """Process one claimed batch with retries, then enqueue ``finalize_job`` if it was the last.
+
+    The batch's lease is renewed throughout, since provider pauses and
+    retries can outlast ``MICRO_BATCH_LEASE_SECONDS``.
+    """
+    job_id = batches.job_id
+    with batches.keep_leased(batch_id):
+        for attempt in range(SUBJOB_MAX_RETRIES + 1):
+            try:
+                process_subjob(
+                    job_id,
+                    batch_id,
+                    payload.get("storage_path"),
+                    meta,
+                    user_id,
+                    total_rows,
+                    prompt_plan,
+                    attempts_left=SUBJOB_MAX_RETRIES - attempt,
+                )
+                break
+            except Exception as exc:
+                if attempt == SUBJOB_MAX_RETRIES:
+                    # process_subjob already failed the job; stop the other drainers.
+                    batches.abort(f"micro-batch {batch_id} failed: {exc}")
+                    raise
+
+    if batches.complete(batch_id):
+        total_batches = batches.total()
+        print(f"[Worker] Job {job_id} | All {total_batches} micro-batches done; enqueuing finalize")
+        queue.enqueue(
+            finalize_job,
+            job_id,
+            user_id,
+            total_batches,
+            final_headers,
+            job_timeout=_get_job_timeout(),
+        )
+
+
+def drain_micro_batches(
+    job_id: str,
+    user_id: str,
+    meta: dict,
+    total_rows: int,
+    prompt_plan: Optional[PromptPlan] = None,
+    final_headers: Optional[List[str]] = None,
+):
+    """Process micro-batches of a job from its shared work queue until none are left.
+
+    Several drainers are enqueued per job and any live worker may run them.
+    Each claims batches while some are pending, then waits up to
+    ``MICRO_BATCH_IDLE_SECONDS`` for batches still being split or held by
+    other workers (taking over any whose lease expired). The drainer that
+    completes the last batch enqueues ``finalize_job``. A drainer that runs
+    out of time with work left hands over to a fresh one.
+    """
+    batches = MicroBatchQueue(job_id)
+    processed = 0
+    idle_since = time.monotonic()
+    stop_claiming_at = time.monotonic() + _get_job_timeout()
+    while not batches.aborted():
+        if time.monotonic() >= stop_claiming_at:
+            if batches.unfinished():
+                queue.enqueue(
+                    drain_micro_batches,
+                    job_id,
+                    user_id,
+                    meta,
+                    total_rows,
+                    prompt_plan,
+                    final_headers,
+                    job_timeout=_drainer_timeout(),
+                )
+            break
+        claimed = batches.claim()
+        if claimed is None:
+            if batches.total() is not None and batches.unfinished() == 0:
+                break
+            if time.monotonic() - idle_since >= MICRO_BATCH_IDLE_SECONDS:
+                break
+            time.sleep(MICRO_BATCH_POLL_SECONDS)
+            continue
+
+        batch_id, payload = claimed
+        _run_micro_batch(batches, batch_id, payload, meta, user_id, total_rows, prompt_plan, final_headers)
+        processed += 1
+        idle_since = time.monotonic()
+
+    print(f"[Worker] Job {job_id} | Drainer processed {processed} micro-batches ({batches.stats()})")
+    return processed
+
+
+def drain_fair_share():
+    """Process micro-batches of every registered job in fair-share order.
+
+    Unlike ``drain_micro_batches`` a fair-share drainer is not tied to a job:
+    each batch comes from whichever user deficit round-robin picks next, so a
+    small job submitted behind a large one is served within a round. Exits
+    after ``MICRO_BATCH_IDLE_SECONDS`` without claimable work, and hands over
+    to a fresh drainer when it runs out of time.
+    """
+    scheduler = FairShareScheduler()
+    prompt_plans: Dict[str, PromptPlan] = {}
+    processed = 0
+    idle_since = time.monotonic()
+    stop_claiming_at = time.monotonic() + _get_job_timeout()
+    while True:
+        if time.monotonic() >= stop_claiming_at:
+            if scheduler.users():
+                queue.enqueue(drain_fair_share, job_timeout=_drainer_timeout())
+            break
+        claim = scheduler.next_batch()
+        if claim is None:
+            if not scheduler.users() or time.monotonic() - idle_since >= MICRO_BATCH_IDLE_SECONDS:
+                break
+            time.sleep(MICRO_BATCH_POLL_SECONDS)
+            continue
+
+        meta = _ensure_dict(claim.context.get("meta"))
+        if claim.job_id not in prompt_plans:
+            prompt_plans[claim.job_id] = compile_prompt_plan(meta.get("service", "{}"))
+        try:
+            _run_micro_batch(
+                MicroBatchQueue(claim.job_id, worker_id=claim.worker_id),
+                claim.batch_id,
+                claim.payload,
+                meta,
+                claim.user_id,
+                int(claim.context.get("total_rows") or 0),
+                prompt_plans[claim.job_id],
+                claim.context.get("final_headers"),
+            )
+        except Exception as exc:
+            # That job has been failed and aborted; keep serving everyone else.
+            print(f"[Worker] Job {claim.job_id} | Micro-batch {claim.batch_id} failed: {exc}")
+        processed += 1
+        idle_since = time.monotonic()
+
+    print(f"[Worker] Fair-share drainer processed {processed} micro-batches")
+    return processed
+
+
 def finalize_job(
     job_id: str,
     user_id: str,
@@ -1321,6 +2077,7 @@ def finalize_job(
 ):
     """Merge all partial CSV files into one final result and update job status."""
     finalize_start = time.time()
+    temp_dirs: List[str] = []
     try:
         print(f"[Worker] Finalizing job {job_id} with {total_chunks} chunks")
 
@@ -1335,14 +2092,13 @@ def finalize_job(
         if "chunks" not in timings:
             timings["chunks"] = {}
 
-        # --- Merge CSVs ---
+        # --- Collect chunk CSVs ---
         merge_start = time.time()
-        frames = []
+        chunk_paths = []
         for chunk_id in range(1, total_chunks + 1):
             local_path = os.path.join("/data/chunks", job_id, f"chunk_{chunk_id}.csv")
             if os.path.exists(local_path):
                 print(f"[Worker] Using local chunk {chunk_id} for job {job_id}")
-                df = pd.read_csv(local_path)
             else:
                 print(f"[Worker] Local chunk {chunk_id} missing, downloading from Supabase...")
                 storage_path = f"{user_id}/{job_id}/chunk_{chunk_id}.csv"
@@ -1353,46 +2109,37 @@ def finalize_job(
                 resp = requests.get(url, timeout=60)
                 resp.raise_for_status()
                 tmp_dir = tempfile.mkdtemp()
+                temp_dirs.append(tmp_dir)
                 local_path = os.path.join(tmp_dir, f"chunk_{chunk_id}.csv")
                 with open(local_path, "wb") as f:
                     f.write(resp.content)
-                df = pd.read_csv(local_path)
+            chunk_paths.append(local_path)
 
-            frames.append(df)
+        timings["merge_csvs"] = record_time("Collecting CSV chunks", merge_start, job_id)
 
-
-        timings["merge_csvs"] = record_time("Merging CSV chunks", merge_start, job_id)
-
-        # --- Final CSV → XLSX ---
+        # --- Stream chunks into the final XLSX, one row at a time ---
         upload_start = time.time()
-        final_df = pd.concat(frames, ignore_index=True)
-        if final_headers:
-            ordered_headers: List[str] = []
-            seen_headers = set()
-            for header in final_headers:
-                if not header or header in seen_headers:
-                    continue
-                ordered_headers.append(header)
-                seen_headers.add(header)
-            for header in ordered_headers:
-                if header not in final_df.columns:
-                    final_df[header] = ""
-            ordered_in_df = [header for header in ordered_headers if header in final_df.columns]
-            extra_headers = [header for header in final_df.columns if header not in ordered_in_df]
-            final_df = final_df[ordered_in_df + extra_headers]
+        columns = resolve_result_columns(final_headers, csv_columns(chunk_paths))
         local_dir = tempfile.mkdtemp()
-        out_csv = os.path.join(local_dir, f"{job_id}_final.csv")
+        temp_dirs.append(local_dir)
         out_xlsx = os.path.join(local_dir, f"{job_id}_final.xlsx")
-
-        final_df.to_csv(out_csv, index=False)
-        final_df.to_excel(out_xlsx, index=False, engine="openpyxl")
+        row_count = write_result_xlsx(out_xlsx, columns, iter_csv_rows(chunk_paths))
 
         storage_path = f"{user_id}/{job_id}/result.xlsx"
         with open(out_xlsx, "rb") as f:
             _upload_to_storage(storage_path, f, f"final result for job {job_id}")
-        timings["csv_to_xlsx"] = record_time("Final CSV→XLSX + upload", upload_start, job_id)
+        timings["csv_to_xlsx"] = record_time(f"Streaming XLSX ({row_count} rows) + upload", upload_start, job_id)
 
         timings["finalize_total"] = record_time("Finalize total", finalize_start, job_id)
+        totals = JobTotals(job_id)
+        timings["row_stats"] = summarize_counts(totals.load("rows"))
+        stage_totals = totals.load("stages")
+        if stage_totals:
+            timings["stage_metrics"] = unflatten_stage_metrics(stage_totals)
+        batch_totals = totals.load("batches")
+        if batch_totals:
+            timings["micro_batch_totals"] = batch_totals
+        timings["llm_metrics"] = _llm_metrics()
 
         # Save full timings
         supabase.table("jobs").update(
@@ -1404,6 +2151,7 @@ def finalize_job(
                 "timing_json": json.dumps(timings),
             }
         ).eq("id", job_id).execute()
+        totals.clear("rows", "stages", "batches")
 
         # Publish final success status to Redis pub/sub for WebSocket
         try:
@@ -1450,6 +2198,9 @@ def finalize_job(
             print(f"[Worker] Failed to publish failure status to Redis: {pub_error}")
 
         refund_job_credits(job_id, user_id, "finalize error")
+    finally:
+        for temp_dir in temp_dirs:
+            shutil.rmtree(temp_dir, ignore_errors=True)
 
 
 def process_job(job_id: str):
@@ -1601,6 +2352,9 @@ def process_job(job_id: str):
 
         timings["setup"] = record_time("Setup (DB updates + job claim)", setup_start, job_id)
 
+        # Identical for every row of the job, so compile it once here.
+        prompt_plan = compile_prompt_plan(meta.get("service", "{}"))
+
         # --- Small-file fast path: Process inline for files < 100 rows ---
         SMALL_FILE_THRESHOLD = 100
         if total > 0 and total < SMALL_FILE_THRESHOLD:
@@ -1616,10 +2370,11 @@ def process_job(job_id: str):
                 final_output_headers,
                 timings,
                 job_start,
+                prompt_plan,
             )
             return  # Job complete, skip chunking
 
-        # --- Chunking (Parallelized) ---
+        # --- Chunking (streamed) ---
         chunk_start = time.time()
         try:
             num_workers = int(os.getenv("WORKER_COUNT", "1"))
@@ -1627,72 +2382,58 @@ def process_job(job_id: str):
             num_workers = 1
 
         subjob_refs = []
-        chunk_buffer = []
-        chunks_to_persist = []  # List of (chunk_id, rows) tuples
+        subjob_refs_lock = Lock()
         chunk_count = 0
 
         job_timeout = _get_job_timeout()
+        scheduler = _job_scheduler(meta)
+        batches = MicroBatchQueue(job_id) if scheduler == "micro_batch" else None
+
+        def enqueue_drainer():
+            if FAIR_SHARE_ENABLED:
+                return queue.enqueue(drain_fair_share, job_timeout=_drainer_timeout())
+            return queue.enqueue(
+                drain_micro_batches,
+                job_id,
+                user_id,
+                meta,
+                total,
+                prompt_plan,
+                final_output_headers,
+                job_timeout=_drainer_timeout(),
+            )
 
-        if total > 0:
-            num_chunks = min(total, num_workers) or 1
-            chunk_size = max(1, math.ceil(total / num_chunks))
-
-            # Phase 1: Collect all chunks in memory
-            print(f"[Worker] Job {job_id} | Collecting chunks for parallel persistence...")
-            for row in row_iter:
-                chunk_buffer.append(row)
-                if len(chunk_buffer) >= chunk_size:
-                    chunk_count += 1
-                    # Store chunk data for later parallel persistence
-                    chunks_to_persist.append((chunk_count, list(chunk_buffer)))
-                    chunk_buffer = []
-
-            # Handle remaining rows
-            if chunk_buffer:
-                chunk_count += 1
-                chunks_to_persist.append((chunk_count, list(chunk_buffer)))
-                chunk_buffer = []
-
-            # Phase 2: Persist all chunks in parallel
-            def persist_chunk_task(chunk_id, rows):
-                """Persist a single chunk to storage (runs in thread pool)."""
-                storage_path = _persist_chunk_rows(
-                    job_id,
-                    chunk_id,
-                    chunk_headers,
-                    rows,
-                    user_id,
-                )
-                return (chunk_id, storage_path)
-
-            chunk_storage_paths = {}  # Map chunk_id -> storage_path
-
-            if chunks_to_persist:
-                # Use ThreadPoolExecutor to persist chunks in parallel
-                max_parallel_uploads = min(len(chunks_to_persist), 10)  # Cap at 10 concurrent uploads
-                print(f"[Worker] Job {job_id} | Persisting {len(chunks_to_persist)} chunks in parallel (max {max_parallel_uploads} workers)...")
-
-                persist_start = time.time()
-                with ThreadPoolExecutor(max_workers=max_parallel_uploads) as executor:
-                    futures = {
-                        executor.submit(persist_chunk_task, chunk_id, rows): chunk_id
-                        for chunk_id, rows in chunks_to_persist
-                    }
-
-                    for future in as_completed(futures):
-                        chunk_id, storage_path = future.result()
-                        chunk_storage_paths[chunk_id] = storage_path
-
-                timings["parallel_chunk_persistence"] = record_time(
-                    f"Parallel chunk persistence ({len(chunks_to_persist)} chunks)",
-                    persist_start,
-                    job_id
-                )
+        if batches is not None and FAIR_SHARE_ENABLED:
+            FairShareScheduler().register(
+                job_id,
+                user_id,
+                plan_quantum(_user_plan_type(user_id)),
+                {"meta": meta, "total_rows": total, "final_headers": final_output_headers},
+            )
 
-                # Phase 3: Enqueue all subjobs (in order)
-                print(f"[Worker] Job {job_id} | Enqueuing {len(chunk_storage_paths)} subjobs...")
-                for chunk_id in sorted(chunk_storage_paths.keys()):
-                    storage_path = chunk_storage_paths[chunk_id]
+        if total > 0:
+            if batches is not None:
+                # Many small batches instead of one chunk per worker, so workers
+                # added after dispatch share the remaining rows.
+                chunk_size = _micro_batch_rows(meta)
+                num_chunks = math.ceil(total / chunk_size)
+            else:
+                num_chunks = min(total, num_workers) or 1
+                chunk_size = max(1, math.ceil(total / num_chunks))
+
+            def upload_and_enqueue(chunk_id, local_path):
+                """Upload a sealed chunk and enqueue its subjob (runs in thread pool)."""
+                storage_path = _upload_chunk_file(job_id, chunk_id, local_path, user_id)
+                if batches is not None:
+                    # Batches are mostly drained on other pods; keep the local
+                    # copy from being picked over the uploaded one.
+                    os.remove(local_path)
+                    batches.push(chunk_id, {"storage_path": storage_path})
+                    job_ref = enqueue_drainer() if chunk_id <= MICRO_BATCH_MAX_DRAINERS else None
+                    if FAIR_SHARE_ENABLED:
+                        # Shared drainers also serve other jobs; never cancel them for this one.
+                        job_ref = None
+                else:
                     job_ref = queue.enqueue(
                         process_subjob,
                         job_id,
@@ -1701,13 +2442,68 @@ def process_job(job_id: str):
                         meta,
                         user_id,
                         total,
+                        prompt_plan,
                         job_timeout=job_timeout,
+                        retry=Retry(max=SUBJOB_MAX_RETRIES) if SUBJOB_MAX_RETRIES > 0 else None,
                     )
-                    subjob_refs.append(job_ref)
-
-        timings["chunking_total"] = record_time("Chunking + parallel persist + enqueue", chunk_start, job_id)
-
-        if chunk_count > 0:
+                if job_ref is not None:
+                    with subjob_refs_lock:
+                        subjob_refs.append(job_ref)
+                print(f"[Worker] Job {job_id} | Chunk {chunk_id} sealed, uploaded and enqueued")
+
+            # Rows are written to disk as they are read; each chunk is uploaded
+            # and its subjob enqueued as soon as it is sealed.
+            max_parallel_uploads = min(num_chunks, 10)  # Cap at 10 concurrent uploads
+            print(f"[Worker] Job {job_id} | Streaming {total} rows into {num_chunks} chunks of up to {chunk_size} rows")
+            futures = []
+            with ThreadPoolExecutor(max_workers=max_parallel_uploads) as executor:
+                chunker = _StreamingChunker(
+                    job_id,
+                    chunk_headers,
+                    chunk_size,
+                    lambda chunk_id, local_path: futures.append(
+                        executor.submit(upload_and_enqueue, chunk_id, local_path)
+                    ),
+                )
+                try:
+                    for row in row_iter:
+                        chunker.add(row)
+                    chunk_count = chunker.close()
+                    for future in as_completed(futures):
+                        future.result()
+                except Exception as exc:
+                    chunker.abort()
+                    for future in futures:
+                        future.cancel()
+                    if batches is not None:
+                        batches.abort(f"dispatch failed: {exc}")
+                    # Chunks already enqueued must not run for a job that is about to fail.
+                    with subjob_refs_lock:
+                        for job_ref in subjob_refs:
+                            try:
+                                job_ref.cancel()
+                            except Exception as cancel_exc:
+                                print(f"[Worker] Job {job_id} | Could not cancel subjob {job_ref.id}: {cancel_exc}")
+                    raise
+
+        timings["chunking_total"] = record_time("Streaming chunk persist + enqueue", chunk_start, job_id)
+
+        if chunk_count > 0 and batches is not None:
+            if batches.seal(chunk_count):
+                # Every batch finished before the split was sealed.
+                queue.enqueue(
+                    finalize_job,
+                    job_id,
+                    user_id,
+                    chunk_count,
+                    final_output_headers,
+                    job_timeout=job_timeout,
+                )
+            else:
+                # Backstop in case earlier drainers went idle while rows were read.
+                enqueue_drainer()
+            timings["micro_batches"] = {"count": chunk_count, "rows_per_batch": chunk_size}
+        elif chunk_count > 0:
             queue.enqueue(
                 finalize_job,
                 job_id,
@@ -1730,7 +2526,7 @@ def process_job(job_id: str):
         timings["process_job_total"] = record_time("process_job total", job_start, job_id)
         supabase.table("jobs").update({"timing_json": json.dumps(timings)}).eq("id", job_id).execute()
 
-        print(f"[Worker] Enqueued {chunk_count} chunks + finalize for job {job_id}")
+        print(f"[Worker] Dispatched {chunk_count} chunks for job {job_id} ({scheduler} scheduler)")
 
     except Exception as e:
         print(f"[Worker] FATAL ERROR job {job_id}: {e}")
@@ -0,0 +1,111 @@
+"""Tolerant repair of almost-valid JSON returned by LLMs.
+
+Models asked for "ONLY valid JSON" still return code fences, a sentence of
+preamble, trailing commas, Python literals, typographic quotes or output cut
+off at the token limit. ``repair_json`` fixes those locally so the caller
+does not have to pay for another completion and backoff sleep.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Optional
+
+_FENCE_RE = re.compile(r"```[a-zA-Z]*\s*(.*?)\s*(?:```|$)", re.DOTALL)
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"', "‘": "'", "’": "'"})
+_PYTHON_LITERALS = {"None": "null", "True": "true", "False": "false"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _strip_fences(text: str) -> str:
+    match = _FENCE_RE.search(text)
+    return match.group(1) if match else text
+
+
+def _extract_json_span(text: str) -> str:
+    """Drop prose before the first ``{``/``[`` and after the last ``}``/``]``."""
+
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    if not starts:
+        return text
+    start = min(starts)
+    end = max(text.rfind("}"), text.rfind("]"))
+    return text[start : end + 1] if end > start else text[start:]
+
+
+def _normalize_tokens(text: str) -> str:
+    """Remove trailing commas, map Python literals and close truncated output.
+
+    Walks the text once, tracking whether it is inside a string so commas and
+    words inside string values are left alone.
+    """
+
+    out: list[str] = []
+    stack: list[str] = []
+    in_string = False
+    escaped = False
+    index = 0
+    length = len(text)
+    while index < length:
+        char = text[index]
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            index += 1
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+        elif char in "}]":
+            # Drop a trailing comma before the closing bracket.
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+        elif char.isalpha():
+            end = index
+            while end < length and text[end].isalpha():
+                end += 1
+            word = text[index:end]
+            out.append(_PYTHON_LITERALS.get(word, word))
+            index = end
+            continue
+        out.append(char)
+        index += 1
+
+    if in_string:
+        out.append('"')
+    while out and (out[-1].isspace() or out[-1] in ",:"):
+        out.pop()
+    out.extend(reversed(stack))
+    return "".join(out)
+
+
+def repair_json(content: str) -> Optional[Any]:
+    """Parse ``content`` as JSON, repairing common LLM formatting mistakes.
+
+    Returns the parsed value, or ``None`` when the text cannot be repaired.
+    """
+
+    if not content or not content.strip():
+        return None
+    text = _extract_json_span(_strip_fences(content.strip()))
+    # Typographic quotes are only replaced as a last resort since they are
+    # legitimate inside string values.
+    candidates = (text, _normalize_tokens(text), _normalize_tokens(text.translate(_SMART_QUOTES)))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
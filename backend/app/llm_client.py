@@ -0,0 +1,375 @@
+"""Shared call path for OpenAI-compatible chat completion requests.
+
+Every LLM call (research extraction, generation, cleaning) goes through
+``post_chat_completion``, which picks the stage's providers from
+``llm_router``, acquires rate-limiter capacity, records latency and health
+per provider and fails over to the next provider on connection errors, 429s
+and 5xx responses. Providers whose circuit breaker is open are skipped; when
+every provider is open, ``ProviderUnavailable`` is raised. Callers may opt a call into request hedging: when the
+call has not returned after the model's rolling p95 latency, a duplicate is
+sent and whichever usable response arrives first wins. The losing request
+is abandoned (its response is discarded and closed when it eventually
+completes), since a blocking ``requests`` call cannot be interrupted.
+
+Hedges are capped at ``LLM_HEDGE_BUDGET_RATIO`` of all hedge-eligible calls
+so a provider-wide slowdown cannot double the request volume.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Deque, Dict, Optional
+
+import requests
+
+from backend.app import rate_limiter, row_deadline
+from backend.app.circuit_breaker import ProviderUnavailable, get_breaker, is_outage_status, record_outcome
+from backend.app.llm_router import LLMProvider, get_router
+
+LOGGER = logging.getLogger(__name__)
+
+HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "0") != "0"
+# Extra requests allowed as a fraction of hedge-eligible calls.
+HEDGE_BUDGET_RATIO = float(os.getenv("LLM_HEDGE_BUDGET_RATIO", "0.05"))
+# Hedges only start once this many latencies have been observed for the model.
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1.0"))
+LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+
+# Providers (``name:model``) that rejected ``response_format``; it is dropped
+# from their requests for the rest of the process.
+_JSON_MODE_UNSUPPORTED: set = set()
+
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_HEDGE_MAX_WORKERS", "64")),
+    thread_name_prefix="llm-call",
+)
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=max(1, window))
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            return _percentile(list(self._samples), q)
+
+
+class HedgeController:
+    """Decides when to hedge and keeps the hedging metrics."""
+
+    def __init__(
+        self,
+        budget_ratio: float = HEDGE_BUDGET_RATIO,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        min_delay_seconds: float = HEDGE_MIN_DELAY_SECONDS,
+        window: int = LATENCY_WINDOW,
+    ):
+        self.budget_ratio = budget_ratio
+        self.min_samples = min_samples
+        self.min_delay_seconds = min_delay_seconds
+        self.window = window
+        self._trackers: Dict[str, LatencyTracker] = {}
+        # Latency callers actually observed, and what the primary request alone took.
+        self._effective = LatencyTracker(window)
+        self._primary = LatencyTracker(window)
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "hedges": 0, "hedge_wins": 0, "budget_denied": 0}
+
+    def tracker(self, model: str) -> LatencyTracker:
+        with self._lock:
+            tracker = self._trackers.get(model)
+            if tracker is None:
+                tracker = self._trackers[model] = LatencyTracker(self.window)
+            return tracker
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging, or ``None`` while there is too little history."""
+
+        tracker = self.tracker(model)
+        if len(tracker) < self.min_samples:
+            return None
+        return max(self.min_delay_seconds, tracker.percentile(0.95))
+
+    def start_call(self) -> None:
+        with self._lock:
+            self._counters["calls"] += 1
+
+    def try_spend_hedge(self) -> bool:
+        with self._lock:
+            allowed = self._counters["hedges"] < self.budget_ratio * self._counters["calls"]
+            self._counters["hedges" if allowed else "budget_denied"] += 1
+            return allowed
+
+    def record_win(self, hedge_won: bool, effective_seconds: float) -> None:
+        self._effective.record(effective_seconds)
+        if hedge_won:
+            with self._lock:
+                self._counters["hedge_wins"] += 1
+
+    def record_primary(self, seconds: float) -> None:
+        self._primary.record(seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        calls = counters["calls"]
+        counters["hedge_rate"] = round(counters["hedges"] / calls, 4) if calls else 0.0
+        counters["p99_primary_seconds"] = round(self._primary.percentile(0.99), 3)
+        counters["p99_effective_seconds"] = round(self._effective.percentile(0.99), 3)
+        counters["p99_improvement_seconds"] = round(
+            counters["p99_primary_seconds"] - counters["p99_effective_seconds"], 3
+        )
+        return counters
+
+
+_HEDGER = HedgeController()
+
+
+def hedge_stats() -> dict:
+    """Process-wide hedging counters and p99 latency with and without hedging."""
+
+    return _HEDGER.stats()
+
+
+def disable_json_mode(provider_key: str) -> None:
+    """Stop sending ``response_format`` to one provider and model."""
+
+    _JSON_MODE_UNSUPPORTED.add(provider_key)
+
+
+def _usable(response) -> bool:
+    status = getattr(response, "status_code", 200)
+    return status != 429 and status < 500
+
+
+def _send(
+    provider: LLMProvider,
+    headers: dict,
+    payload: dict,
+    timeout: float,
+    tokens: int,
+    acquire: bool = True,
+    deadline_capped: bool = False,
+):
+    """Send one request; ``acquire=False`` when the caller already waited on the limiter.
+
+    ``deadline_capped`` marks a ``timeout`` shortened to fit the row deadline:
+    hitting it says nothing about the provider, so it is not recorded as a
+    failure.
+    """
+
+    router = get_router()
+    if acquire:
+        rate_limiter.acquire(provider.name, provider.model, tokens=tokens)
+    # Time only the round trip: queueing on our own limiter says nothing about
+    # the provider, so it must not feed its health score or the hedge delay.
+    start = time.monotonic()
+    try:
+        response = requests.post(provider.endpoint, headers=headers, json=payload, timeout=timeout)
+    except Exception as exc:
+        if deadline_capped and isinstance(exc, requests.Timeout):
+            get_breaker(provider.name).release_probe()
+        else:
+            router.record(provider, False, time.monotonic() - start)
+            record_outcome(provider.name, False)
+        raise
+    elapsed = time.monotonic() - start
+    router.record(provider, _usable(response), elapsed)
+    record_outcome(provider.name, not is_outage_status(getattr(response, "status_code", None)))
+    _HEDGER.tracker(provider.key).record(elapsed)
+    return response
+
+
+def _discard(future: Future) -> None:
+    """Close the response of an abandoned request once it completes."""
+
+    def close(done: Future) -> None:
+        try:
+            _close(done.result())
+        except Exception:
+            return
+
+    future.add_done_callback(close)
+
+
+def post_chat_completion(
+    url: str,
+    *,
+    headers: dict,
+    payload: dict,
+    model: str,
+    tokens: int = 0,
+    timeout: float = 30,
+    hedge: bool = False,
+    stage: Optional[str] = None,
+):
+    """POST a chat completion and return the ``requests`` response.
+
+    ``url``, ``headers`` and ``model`` describe the default (Groq) provider,
+    used when ``stage`` has no configured route. ``tokens`` is the estimated
+    prompt plus completion size used for rate limiting; ``timeout`` is capped
+    by the current row deadline. With ``hedge=True``
+    (and ``LLM_HEDGING_ENABLED``), a slow call is duplicated once its latency
+    passes the model's rolling p95.
+
+    When every provider fails, the last provider's response is returned (or
+    its error raised) so callers keep their existing error handling. The
+    returned response carries the ``llm_provider`` key that produced it.
+    """
+
+    candidates = get_router().candidates(stage, LLMProvider("groq", url, model), headers)
+    last_response = None
+    last_error: Optional[Exception] = None
+    open_breakers = []
+    for provider, provider_headers in candidates:
+        # Raises DeadlineExceeded when the row is out of time.
+        attempt_timeout = row_deadline.timeout(timeout)
+        breaker = get_breaker(provider.name)
+        if not breaker.allow():
+            open_breakers.append(breaker)
+            continue
+        provider_payload = dict(payload, model=provider.model)
+        if provider.key in _JSON_MODE_UNSUPPORTED:
+            provider_payload.pop("response_format", None)
+        try:
+            response = _post_to_provider(
+                provider, provider_headers, provider_payload, attempt_timeout, tokens, hedge, attempt_timeout < timeout
+            )
+        except row_deadline.DeadlineExceeded as exc:
+            # The limiter refused a wait the row cannot afford, or a hedged call
+            # ran out of row time; either way this provider got no verdict.
+            breaker.release_probe()
+            LOGGER.warning("LLM provider %s is rate limited past the row deadline; failing over", provider.key)
+            last_error = exc
+            continue
+        except Exception as exc:
+            LOGGER.warning("LLM provider %s failed (%s); failing over", provider.key, exc)
+            last_error = exc
+            continue
+        response.llm_provider = provider.key
+        if _usable(response):
+            _close(last_response)
+            return response
+        LOGGER.warning("LLM provider %s returned %s; failing over", provider.key, response.status_code)
+        _close(last_response)
+        last_response = response
+
+    if last_response is not None:
+        return last_response
+    if last_error is not None:
+        raise last_error
+    raise ProviderUnavailable(
+        ", ".join(breaker.name for breaker in open_breakers),
+        min(breaker.retry_after() for breaker in open_breakers),
+    )
+
+
+def _close(response) -> None:
+    close_response = getattr(response, "close", None)
+    if callable(close_response):
+        close_response()
+
+
+def _post_to_provider(
+    provider: LLMProvider,
+    headers: dict,
+    payload: dict,
+    timeout: float,
+    tokens: int,
+    hedge: bool,
+    deadline_capped: bool = False,
+):
+    if not (hedge and HEDGING_ENABLED):
+        return _send(provider, headers, payload, timeout, tokens, deadline_capped=deadline_capped)
+
+    model = provider.key
+    # Wait for the primary's tokens before starting the hedge clock, so a
+    # request still queued on our own limiter is never hedged.
+    rate_limiter.acquire(provider.name, provider.model, tokens=tokens)
+    _HEDGER.start_call()
+    start = time.monotonic()
+    primary = _EXECUTOR.submit(_send, provider, headers, payload, timeout, tokens, False, deadline_capped)
+    primary.add_done_callback(lambda _: _HEDGER.record_primary(time.monotonic() - start))
+
+    delay = _HEDGER.hedge_delay(model)
+    if delay is None:
+        response = primary.result()
+        _HEDGER.record_win(False, time.monotonic() - start)
+        return response
+
+    done, _ = wait([primary], timeout=delay)
+    # A backup is not worth starting once the row has too little time left for it.
+    if done or not row_deadline.allows(0) or not _HEDGER.try_spend_hedge():
+        response = primary.result()
+        _HEDGER.record_win(False, time.monotonic() - start)
+        return response
+
+    LOGGER.info("Hedging %s request after %.2fs (rolling p95)", model, delay)
+    # The backup waits on the limiter on its own thread; running it in a copy of
+    # this context keeps that wait and its timeout bounded by the row deadline.
+    backup_timeout = row_deadline.timeout(timeout)
+    backup = _EXECUTOR.submit(
+        contextvars.copy_context().run,
+        _send,
+        provider,
+        headers,
+        payload,
+        backup_timeout,
+        tokens,
+        True,
+        deadline_capped or backup_timeout < timeout,
+    )
+    pending = {primary, backup}
+    first_error: Optional[BaseException] = None
+    fallback_response = None
+    while pending:
+        left = row_deadline.remaining()
+        done, pending = wait(pending, timeout=None if left is None else max(0.0, left), return_when=FIRST_COMPLETED)
+        if not done:
+            for loser in pending:
+                _discard(loser)
+            _HEDGER.record_win(False, time.monotonic() - start)
+            raise row_deadline.DeadlineExceeded(f"row deadline exceeded waiting on hedged {model} request")
+        for future in done:
+            try:
+                response = future.result()
+            except Exception as exc:
+                first_error = first_error or exc
+                continue
+            if _usable(response):
+                for loser in pending:
+                    _discard(loser)
+                _HEDGER.record_win(future is backup, time.monotonic() - start)
+                return response
+            fallback_response = fallback_response or response
+
+    _HEDGER.record_win(False, time.monotonic() - start)
+    if fallback_response is not None:
+        return fallback_response
+    raise first_error
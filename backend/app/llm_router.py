@@ -0,0 +1,211 @@
+"""Per-stage routing of chat completions across OpenAI-compatible providers.
+
+Each pipeline stage (``research``, ``generation``, ``cleaning``) can list
+several providers in priority order with ``LLM_ROUTES_JSON``::
+
+    {
+      "generation": [
+        {"name": "groq", "endpoint": "https://api.groq.com/openai/v1/chat/completions",
+         "model": "openai/gpt-oss-120b", "api_key_env": "GROQ_API_KEY"},
+        {"name": "backup", "endpoint": "http://localhost:8101/openai/v1/chat/completions",
+         "model": "llama-3.3-70b", "api_key_env": "BACKUP_LLM_API_KEY"}
+      ]
+    }
+
+Stages without a route use the caller's endpoint and model (Groq), so the
+default behaviour is unchanged. Every call outcome feeds a rolling health
+window per provider and model; providers with a high recent error rate or
+latency are tried after the healthy ones, and ``llm_client`` fails over to
+the next provider on connection errors, 429s and 5xx responses. Point
+routes at ``provider_simulator`` instances on different ports to exercise
+failover offline.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+STAGES = ("research", "generation", "cleaning")
+
+HEALTH_WINDOW = int(os.getenv("LLM_HEALTH_WINDOW", "50"))
+# Outcomes needed before a provider can be marked unhealthy.
+HEALTH_MIN_SAMPLES = int(os.getenv("LLM_HEALTH_MIN_SAMPLES", "5"))
+UNHEALTHY_ERROR_RATE = float(os.getenv("LLM_UNHEALTHY_ERROR_RATE", "0.5"))
+UNHEALTHY_LATENCY_SECONDS = float(os.getenv("LLM_UNHEALTHY_LATENCY_SECONDS", "20"))
+
+
+@dataclass(frozen=True)
+class LLMProvider:
+    """One OpenAI-compatible chat completions endpoint and model."""
+
+    name: str
+    endpoint: str
+    model: str
+    api_key_env: str = ""
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.model}"
+
+    def headers(self) -> Optional[dict]:
+        """Request headers, or ``None`` when the provider's API key is not set."""
+
+        api_key = os.getenv(self.api_key_env) if self.api_key_env else None
+        if not api_key:
+            return None
+        return {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
+
+class ProviderHealth:
+    """Rolling window of ``(ok, latency)`` outcomes for one provider and model."""
+
+    def __init__(self, window: int = HEALTH_WINDOW):
+        self._outcomes: Deque[Tuple[bool, float]] = deque(maxlen=max(1, window))
+        self._lock = threading.Lock()
+
+    def record(self, ok: bool, latency_seconds: float) -> None:
+        with self._lock:
+            self._outcomes.append((ok, latency_seconds))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            outcomes = list(self._outcomes)
+        latencies = sorted(latency for ok, latency in outcomes if ok)
+        errors = sum(1 for ok, _ in outcomes if not ok)
+        error_rate = errors / len(outcomes) if outcomes else 0.0
+        p50 = latencies[len(latencies) // 2] if latencies else 0.0
+        return {
+            "samples": len(outcomes),
+            "error_rate": round(error_rate, 4),
+            "p50_latency_seconds": round(p50, 3),
+            # Higher is better: share of successful calls discounted by latency.
+            "score": round((1.0 - error_rate) / (1.0 + p50), 4),
+        }
+
+
+class LLMRouter:
+    """Orders a stage's providers by priority and recent health."""
+
+    def __init__(
+        self,
+        routes: Optional[Dict[str, List[LLMProvider]]] = None,
+        window: int = HEALTH_WINDOW,
+        min_samples: int = HEALTH_MIN_SAMPLES,
+        unhealthy_error_rate: float = UNHEALTHY_ERROR_RATE,
+        unhealthy_latency_seconds: float = UNHEALTHY_LATENCY_SECONDS,
+    ):
+        self.routes = routes or {}
+        self.window = window
+        self.min_samples = min_samples
+        self.unhealthy_error_rate = unhealthy_error_rate
+        self.unhealthy_latency_seconds = unhealthy_latency_seconds
+        self._health: Dict[str, ProviderHealth] = {}
+        self._lock = threading.Lock()
+
+    def health(self, provider: LLMProvider) -> ProviderHealth:
+        with self._lock:
+            health = self._health.get(provider.key)
+            if health is None:
+                health = self._health[provider.key] = ProviderHealth(self.window)
+            return health
+
+    def record(self, provider: LLMProvider, ok: bool, latency_seconds: float) -> None:
+        self.health(provider).record(ok, latency_seconds)
+
+    def is_healthy(self, provider: LLMProvider) -> bool:
+        snapshot = self.health(provider).snapshot()
+        if snapshot["samples"] < self.min_samples:
+            return True
+        return (
+            snapshot["error_rate"] < self.unhealthy_error_rate
+            and snapshot["p50_latency_seconds"] < self.unhealthy_latency_seconds
+        )
+
+    def candidates(
+        self, stage: Optional[str], default: LLMProvider, default_headers: dict
+    ) -> List[Tuple[LLMProvider, dict]]:
+        """Providers to try for ``stage`` with their headers, best first.
+
+        Healthy providers keep their configured priority; unhealthy ones
+        follow, best score first, so they are still used when nothing else
+        is left.
+        """
+
+        configured = self.routes.get(stage or "") or []
+        usable: List[Tuple[LLMProvider, dict]] = []
+        for provider in configured:
+            headers = provider.headers()
+            if headers is None:
+                LOGGER.warning("LLM provider %s has no API key (%s); skipping", provider.key, provider.api_key_env)
+                continue
+            usable.append((provider, headers))
+        if not usable:
+            return [(default, default_headers)]
+
+        healthy = [entry for entry in usable if self.is_healthy(entry[0])]
+        unhealthy = [entry for entry in usable if entry not in healthy]
+        unhealthy.sort(key=lambda entry: self.health(entry[0]).snapshot()["score"], reverse=True)
+        return healthy + unhealthy
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            items = list(self._health.items())
+        return {key: health.snapshot() for key, health in items}
+
+
+def load_routes(raw: Optional[str] = None) -> Dict[str, List[LLMProvider]]:
+    """Parse ``LLM_ROUTES_JSON``; invalid entries are logged and skipped."""
+
+    raw = os.getenv("LLM_ROUTES_JSON") if raw is None else raw
+    if not raw:
+        return {}
+    try:
+        config = json.loads(raw)
+    except json.JSONDecodeError:
+        LOGGER.warning("LLM_ROUTES_JSON is not valid JSON; using the default providers")
+        return {}
+    if not isinstance(config, dict):
+        return {}
+
+    routes: Dict[str, List[LLMProvider]] = {}
+    for stage, entries in config.items():
+        if stage not in STAGES:
+            LOGGER.warning("Ignoring LLM route for unknown stage %r", stage)
+            continue
+        providers = []
+        for entry in entries if isinstance(entries, list) else []:
+            try:
+                providers.append(
+                    LLMProvider(
+                        name=str(entry["name"]),
+                        endpoint=str(entry["endpoint"]),
+                        model=str(entry["model"]),
+                        api_key_env=str(entry.get("api_key_env") or ""),
+                    )
+                )
+            except (KeyError, TypeError, AttributeError):
+                LOGGER.warning("Ignoring malformed LLM route entry for %s: %r", stage, entry)
+        if providers:
+            routes[stage] = providers
+    return routes
+
+
+_ROUTER: Optional[LLMRouter] = None
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    global _ROUTER
+    if _ROUTER is None:
+        with _ROUTER_LOCK:
+            if _ROUTER is None:
+                _ROUTER = LLMRouter(load_routes())
+    return _ROUTER
@@ -0,0 +1,77 @@
+"""Coalesce concurrent single-item calls into batched calls.
+
+Row workers call ``MicroBatcher.submit(item)`` and block for their own
+result. Items are collected until ``max_batch`` are waiting or the oldest
+has waited ``max_wait_seconds``; the thread that completes the batch (or
+times out first) runs ``batch_fn`` for everyone in it. No extra threads are
+involved, so a batcher can be created per chunk and simply dropped.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class _Slot:
+    __slots__ = ("item", "done", "result", "error", "taken")
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.taken = False
+
+
+class MicroBatcher(Generic[T, R]):
+    """``batch_fn(items) -> results`` (same length and order) shared by concurrent callers."""
+
+    def __init__(self, batch_fn: Callable[[List[T]], List[R]], max_batch: int, max_wait_seconds: float = 0.5):
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait_seconds = max_wait_seconds
+        self._pending: List[_Slot] = []
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item: T) -> R:
+        slot = _Slot(item)
+        with self._lock:
+            self._pending.append(slot)
+            batch = self._take() if len(self._pending) >= self.max_batch else None
+        if batch is None and not slot.done.wait(self.max_wait_seconds):
+            with self._lock:
+                batch = None if slot.taken else self._take()
+        if batch is not None:
+            self._run(batch)
+        slot.done.wait()
+        if slot.error is not None:
+            raise slot.error
+        return slot.result
+
+    def _take(self) -> List[_Slot]:
+        batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch :]
+        for slot in batch:
+            slot.taken = True
+        self.batches += 1
+        self.items += len(batch)
+        return batch
+
+    def _run(self, batch: List[_Slot]) -> None:
+        try:
+            results = self.batch_fn([slot.item for slot in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+            for slot, result in zip(batch, results):
+                slot.result = result
+        except BaseException as exc:  # noqa: BLE001 - delivered to every caller in the batch
+            for slot in batch:
+                slot.error = exc
+        finally:
+            for slot in batch:
+                slot.done.set()
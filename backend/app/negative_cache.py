@@ -0,0 +1,222 @@
+"""Negative-result cache for prospects that yield no usable research.
+
+Parked, personal and tiny domains return no organic Serper results (or nothing
+Groq can extract) on every job. Marking them here lets later rows skip the
+provider calls and go straight to the fallback path.
+
+Two layers:
+
+* A Bloom filter answers "definitely not negative" for the common case without
+  a network round trip. Its bitmap lives in Redis so every worker learns about
+  new negatives; each process keeps a local copy refreshed every
+  ``refresh_seconds``. Filters rotate per TTL-sized generation so stale bits
+  age out instead of saturating the filter.
+* Exact entries (``negative:{namespace}:{kind}:{sha1}``) with a TTL confirm a
+  Bloom hit and carry the fallback message, so false positives never skip
+  research and entries expire on their own.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from backend.app.cache import LRUCache
+from backend.app.redis_client import get_redis_connection
+
+LOGGER = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over a bytearray, using double hashing."""
+
+    def __init__(self, size_bits: int = 1 << 20, num_hashes: int = 7):
+        self.size_bits = max(8, int(size_bits))
+        self.num_hashes = max(1, int(num_hashes))
+        self.bits = bytearray((self.size_bits + 7) // 8)
+
+    def positions(self, item: str) -> List[int]:
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return [(h1 + i * h2) % self.size_bits for i in range(self.num_hashes)]
+
+    def add(self, item: str) -> List[int]:
+        positions = self.positions(item)
+        for position in positions:
+            # Big-endian bit order within each byte, matching Redis SETBIT.
+            self.bits[position // 8] |= 0x80 >> (position % 8)
+        return positions
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p // 8] & (0x80 >> (p % 8)) for p in self.positions(item))
+
+    def merge_bytes(self, raw: bytes) -> None:
+        """OR a Redis bitmap (which may be shorter than the filter) into the local bits."""
+
+        for index, value in enumerate(raw[: len(self.bits)]):
+            self.bits[index] |= value
+
+
+class NegativeCache:
+    """Bloom-filtered, TTL'd record of emails and domains without usable research."""
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        ttl_seconds: float = 7 * 86400.0,
+        bloom_bits: int = 1 << 20,
+        bloom_hashes: int = 7,
+        refresh_seconds: float = 60.0,
+        local_max_entries: int = 4096,
+        redis_client=None,
+        use_redis: bool = True,
+        enabled: bool = True,
+        redis_retry_seconds: float = 30.0,
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = max(1.0, float(ttl_seconds))
+        self.bloom_bits = bloom_bits
+        self.bloom_hashes = bloom_hashes
+        self.refresh_seconds = refresh_seconds
+        self.use_redis = use_redis
+        self.enabled = enabled
+        self.redis_retry_seconds = redis_retry_seconds
+        self.local = LRUCache(max_entries=local_max_entries, ttl_seconds=self.ttl_seconds)
+        self._redis = redis_client
+        self._redis_disabled_until = 0.0
+        self._filters: Dict[int, BloomFilter] = {}
+        self._synced_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counters = {"hits": 0, "bloom_false_positives": 0, "marks": 0, "redis_errors": 0}
+
+    def _incr(self, name: str) -> None:
+        with self._stats_lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self._counters)
+
+    def _redis_client(self):
+        if not self.use_redis or time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._redis is None:
+            self._redis = get_redis_connection(decode_responses=False)
+        return self._redis
+
+    def _redis_failed(self, action: str, exc: Exception) -> None:
+        self._incr("redis_errors")
+        self._redis_disabled_until = time.monotonic() + self.redis_retry_seconds
+        LOGGER.warning(
+            "Redis %s failed for negative cache '%s'; using local state only for %ss: %s",
+            action,
+            self.namespace,
+            self.redis_retry_seconds,
+            exc,
+        )
+
+    def _generation(self) -> int:
+        return int(time.time() // self.ttl_seconds)
+
+    def _bloom_key(self, generation: int) -> str:
+        return f"negative:{self.namespace}:bloom:{generation}"
+
+    def _exact_key(self, member: str) -> str:
+        digest = hashlib.sha1(member.encode("utf-8")).hexdigest()
+        return f"negative:{self.namespace}:{digest}"
+
+    @staticmethod
+    def _member(kind: str, value: str) -> str:
+        return f"{kind}:{str(value or '').strip().lower()}"
+
+    def _filter(self, generation: int) -> BloomFilter:
+        """Return the local filter for ``generation``, pulling Redis bits when stale."""
+
+        with self._lock:
+            bloom = self._filters.get(generation)
+            if bloom is None:
+                bloom = BloomFilter(self.bloom_bits, self.bloom_hashes)
+                self._filters[generation] = bloom
+                # Only the current and previous generations can hold live entries.
+                for old in [g for g in self._filters if g < generation - 1]:
+                    self._filters.pop(old, None)
+                    self._synced_at.pop(old, None)
+            if time.monotonic() - self._synced_at.get(generation, float("-inf")) < self.refresh_seconds:
+                return bloom
+            self._synced_at[generation] = time.monotonic()
+
+        client = self._redis_client()
+        if client is not None:
+            try:
+                raw = client.get(self._bloom_key(generation))
+            except Exception as exc:
+                self._redis_failed("bloom read", exc)
+                raw = None
+            if raw:
+                with self._lock:
+                    bloom.merge_bytes(raw)
+        return bloom
+
+    def _might_contain(self, member: str) -> bool:
+        generation = self._generation()
+        return any(member in self._filter(g) for g in (generation, generation - 1))
+
+    def lookup(self, kind: str, value: str) -> Optional[str]:
+        """Return the cached fallback message for ``value`` or ``None``."""
+
+        if not self.enabled or not value:
+            return None
+        member = self._member(kind, value)
+        if not self._might_contain(member):
+            return None
+
+        message = self.local.get(member)
+        if message is None:
+            client = self._redis_client()
+            if client is not None:
+                try:
+                    raw = client.get(self._exact_key(member))
+                except Exception as exc:
+                    self._redis_failed("read", exc)
+                    raw = None
+                if raw is not None:
+                    message = raw.decode("utf-8") if isinstance(raw, bytes) else str(raw)
+                    self.local.set(member, message)
+
+        if message is None:
+            self._incr("bloom_false_positives")
+            return None
+        self._incr("hits")
+        return message
+
+    def mark(self, kind: str, value: str, message: str) -> None:
+        """Record that ``value`` produced ``message`` instead of usable research."""
+
+        if not self.enabled or not value:
+            return
+        member = self._member(kind, value)
+        generation = self._generation()
+        positions = self._filter(generation).add(member)
+        self.local.set(member, message)
+        self._incr("marks")
+
+        client = self._redis_client()
+        if client is None:
+            return
+        bloom_key = self._bloom_key(generation)
+        try:
+            pipe = client.pipeline(transaction=False)
+            for position in positions:
+                pipe.setbit(bloom_key, position, 1)
+            # A generation is read until the end of the next one.
+            pipe.expire(bloom_key, int(self.ttl_seconds * 2) + 60)
+            pipe.set(self._exact_key(member), message, ex=max(1, int(self.ttl_seconds)))
+            pipe.execute()
+        except Exception as exc:
+            self._redis_failed("write", exc)
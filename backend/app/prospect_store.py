@@ -0,0 +1,209 @@
+"""Persistent store of completed prospect research, keyed by normalized email.
+
+Customers often re-upload overlapping lead lists; a fresh stored result lets a
+repeat prospect cost one lookup instead of two Serper searches and a Groq
+extraction. Backends:
+
+* ``redis``: keys with a TTL equal to the freshness window (default).
+* ``supabase``: the ``prospect_research`` table (see migrations).
+* ``sqlite``: a local/in-memory SQLite database, mainly for tests.
+* ``none``: disabled.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from backend.app.redis_client import get_redis_connection
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE_SECONDS = float(os.getenv("PROSPECT_STORE_MAX_AGE_DAYS", "14")) * 86400
+
+
+def normalize_email(email: str) -> str:
+    return str(email or "").strip().lower()
+
+
+def is_storable_research(research: str) -> bool:
+    """Only successful research (a JSON object) is worth keeping."""
+
+    if not research or research.lower().startswith("research unavailable"):
+        return False
+    try:
+        return isinstance(json.loads(research), dict)
+    except (TypeError, ValueError):
+        return False
+
+
+class ProspectStore(ABC):
+    """Interface implemented by every backend."""
+
+    def __init__(self, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        self.max_age_seconds = max_age_seconds
+
+    @abstractmethod
+    def get(self, email: str) -> Optional[str]:
+        """Return research stored within the freshness window, else ``None``."""
+
+    @abstractmethod
+    def put(self, email: str, research: str) -> None:
+        """Store successful research for ``email``."""
+
+
+class SQLiteProspectStore(ProspectStore):
+    """SQLite-backed store; ``":memory:"`` gives an isolated in-process stand-in."""
+
+    def __init__(self, path: str = ":memory:", max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        super().__init__(max_age_seconds)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS prospect_research ("
+                "email TEXT PRIMARY KEY, research TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, email: str) -> Optional[str]:
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT research FROM prospect_research WHERE email = ? AND updated_at >= ?",
+                (normalize_email(email), cutoff),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, email: str, research: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO prospect_research (email, research, updated_at) VALUES (?, ?, ?)",
+                (normalize_email(email), research, time.time()),
+            )
+            self._conn.commit()
+
+
+class RedisProspectStore(ProspectStore):
+    def __init__(self, redis_client=None, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        super().__init__(max_age_seconds)
+        self._redis = redis_client
+
+    def _client(self):
+        if self._redis is None:
+            self._redis = get_redis_connection()
+        return self._redis
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return f"prospect_research:{normalize_email(email)}"
+
+    def get(self, email: str) -> Optional[str]:
+        return self._client().get(self._key(email))
+
+    def put(self, email: str, research: str) -> None:
+        self._client().set(self._key(email), research, ex=max(1, int(self.max_age_seconds)))
+
+
+class SupabaseProspectStore(ProspectStore):
+    def __init__(self, supabase_client=None, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        super().__init__(max_age_seconds)
+        if supabase_client is None:
+            from backend.app.supabase_client import supabase as supabase_client
+        self._supabase = supabase_client
+
+    def get(self, email: str) -> Optional[str]:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.max_age_seconds)
+        res = (
+            self._supabase.table("prospect_research")
+            .select("research")
+            .eq("email", normalize_email(email))
+            .gte("updated_at", cutoff.isoformat())
+            .limit(1)
+            .execute()
+        )
+        return res.data[0]["research"] if res.data else None
+
+    def put(self, email: str, research: str) -> None:
+        self._supabase.table("prospect_research").upsert(
+            {
+                "email": normalize_email(email),
+                "research": research,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+        ).execute()
+
+
+class SafeProspectStore(ProspectStore):
+    """Wraps a backend so storage errors degrade to cache misses.
+
+    After a failure the backend is skipped for ``retry_seconds`` so an outage
+    costs one timeout rather than one per row.
+    """
+
+    def __init__(self, backend: ProspectStore, retry_seconds: float = 30.0):
+        super().__init__(backend.max_age_seconds)
+        self.backend = backend
+        self.retry_seconds = retry_seconds
+        self._disabled_until = 0.0
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._disabled_until
+
+    def _failed(self, action: str, email: str, exc: Exception) -> None:
+        self._disabled_until = time.monotonic() + self.retry_seconds
+        LOGGER.warning("Prospect store %s failed for %s; skipping store for %ss: %s", action, email, self.retry_seconds, exc)
+
+    def get(self, email: str) -> Optional[str]:
+        if not normalize_email(email) or not self._available():
+            return None
+        try:
+            return self.backend.get(email)
+        except Exception as exc:
+            self._failed("lookup", email, exc)
+            return None
+
+    def put(self, email: str, research: str) -> None:
+        if not normalize_email(email) or not is_storable_research(research) or not self._available():
+            return
+        try:
+            self.backend.put(email, research)
+        except Exception as exc:
+            self._failed("write", email, exc)
+
+
+_store: Optional[ProspectStore] = None
+_store_configured = False
+_store_lock = threading.Lock()
+
+
+def build_prospect_store(backend: str) -> Optional[ProspectStore]:
+    backend = (backend or "none").strip().lower()
+    if backend == "redis":
+        return SafeProspectStore(RedisProspectStore())
+    if backend == "supabase":
+        return SafeProspectStore(SupabaseProspectStore())
+    if backend == "sqlite":
+        return SafeProspectStore(SQLiteProspectStore(os.getenv("PROSPECT_STORE_SQLITE_PATH", ":memory:")))
+    if backend != "none":
+        LOGGER.warning("Unknown PROSPECT_STORE_BACKEND '%s'; prospect store disabled", backend)
+    return None
+
+
+def get_prospect_store() -> Optional[ProspectStore]:
+    """Return the configured process-wide store, or ``None`` when disabled."""
+
+    global _store, _store_configured
+    if not _store_configured:
+        with _store_lock:
+            if not _store_configured:
+                _store = build_prospect_store(os.getenv("PROSPECT_STORE_BACKEND", "redis"))
+                _store_configured = True
+    return _store
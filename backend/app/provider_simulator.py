@@ -0,0 +1,347 @@
+"""Offline simulator for the Serper and Groq APIs used by the research pipeline.
+
+Run it locally and point the pipeline at it through the endpoint constants::
+
+    uvicorn backend.app.provider_simulator:app --port 8100
+    SERPER_ENDPOINT=http://localhost:8100/search \\
+    GROQ_ENDPOINT=http://localhost:8100/openai/v1/chat/completions \\
+    SERPER_API_KEY=sim GROQ_API_KEY=sim python -m backend.app.worker
+
+Responses follow the real payload shapes closely enough for the pipeline's
+parsers: Serper returns ``organic`` results, and chat completions return
+research JSON, batched research arrays, email bodies or cleaned emails
+depending on the prompt. Behaviour is configured with ``SIM_*`` environment
+variables (see ``SimulatorConfig``): log-normal latency, injected 429/5xx
+responses, malformed JSON, per-minute rate limits and token accounting.
+``GET /stats`` reports counters and ``POST /reset`` clears them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from backend.app.tokens import estimate_tokens
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+@dataclass
+class SimulatorConfig:
+    """Knobs for simulated provider behaviour. Rates are probabilities in [0, 1]."""
+
+    serper_latency_ms: float = 300.0
+    groq_latency_ms: float = 400.0
+    latency_sigma: float = 0.5
+    groq_tokens_per_second: float = 500.0
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    malformed_json_rate: float = 0.0
+    serper_empty_rate: float = 0.0
+    serper_results: int = 5
+    serper_rpm: float = 0.0
+    groq_rpm: float = 0.0
+    groq_tpm: float = 0.0
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "SimulatorConfig":
+        seed = os.getenv("SIM_SEED")
+        return cls(
+            serper_latency_ms=_env_float("SIM_SERPER_LATENCY_MS", 300.0),
+            groq_latency_ms=_env_float("SIM_GROQ_LATENCY_MS", 400.0),
+            latency_sigma=_env_float("SIM_LATENCY_SIGMA", 0.5),
+            groq_tokens_per_second=_env_float("SIM_GROQ_TOKENS_PER_SECOND", 500.0),
+            rate_429=_env_float("SIM_429_RATE", 0.0),
+            rate_5xx=_env_float("SIM_5XX_RATE", 0.0),
+            malformed_json_rate=_env_float("SIM_MALFORMED_JSON_RATE", 0.0),
+            serper_empty_rate=_env_float("SIM_SERPER_EMPTY_RATE", 0.0),
+            serper_results=int(os.getenv("SIM_SERPER_RESULTS", "5")),
+            serper_rpm=_env_float("SIM_SERPER_RPM", 0.0),
+            groq_rpm=_env_float("SIM_GROQ_RPM", 0.0),
+            groq_tpm=_env_float("SIM_GROQ_TPM", 0.0),
+            seed=int(seed) if seed else None,
+        )
+
+
+class _MinuteWindow:
+    """Sliding one-minute window of (timestamp, amount) used for rpm/tpm limits."""
+
+    def __init__(self):
+        self._events: Deque[Tuple[float, float]] = deque()
+        self._total = 0.0
+
+    def used(self, now: float) -> float:
+        while self._events and self._events[0][0] <= now - 60.0:
+            self._total -= self._events.popleft()[1]
+        return self._total
+
+    def add(self, now: float, amount: float) -> None:
+        self._events.append((now, amount))
+        self._total += amount
+
+
+class ProviderSimulator:
+    """Stateful behaviour shared by the simulated endpoints."""
+
+    def __init__(self, config: SimulatorConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats: Dict[str, Dict[str, int]] = {
+                "serper": {"requests": 0, "ok": 0, "429": 0, "5xx": 0, "malformed": 0},
+                "groq": {
+                    "requests": 0,
+                    "ok": 0,
+                    "429": 0,
+                    "5xx": 0,
+                    "malformed": 0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                },
+            }
+            self._windows = {
+                "serper:requests": _MinuteWindow(),
+                "groq:requests": _MinuteWindow(),
+                "groq:tokens": _MinuteWindow(),
+            }
+
+    def count(self, provider: str, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[provider][name] += amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return json.loads(json.dumps(self.stats))
+
+    def chance(self, probability: float) -> bool:
+        return probability > 0 and self.random.random() < probability
+
+    def latency_seconds(self, median_ms: float) -> float:
+        if median_ms <= 0:
+            return 0.0
+        return self.random.lognormvariate(math.log(median_ms), self.config.latency_sigma) / 1000.0
+
+    def admit(self, provider: str, tokens: int = 0) -> Optional[float]:
+        """Apply configured rate limits; returns retry-after seconds when refused."""
+
+        limits = [(f"{provider}:requests", getattr(self.config, f"{provider}_rpm"), 1)]
+        if provider == "groq":
+            limits.append(("groq:tokens", self.config.groq_tpm, tokens))
+        now = time.monotonic()
+        with self._lock:
+            for key, per_minute, amount in limits:
+                if per_minute > 0 and self._windows[key].used(now) + amount > per_minute:
+                    return 60.0 / per_minute if key.endswith("requests") else 1.0
+            for key, per_minute, amount in limits:
+                self._windows[key].add(now, amount)
+        return None
+
+    def injected_error(self, provider: str) -> Optional[Response]:
+        if self.chance(self.config.rate_429):
+            self.count(provider, "429")
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (simulated)", "type": "rate_limit"}},
+                status_code=429,
+                headers={"retry-after": "1"},
+            )
+        if self.chance(self.config.rate_5xx):
+            self.count(provider, "5xx")
+            status = self.random.choice([500, 502, 503])
+            return JSONResponse({"error": {"message": "Upstream error (simulated)"}}, status_code=status)
+        return None
+
+
+def _seeded(text: str) -> random.Random:
+    """Deterministic RNG per input so repeated queries return identical payloads."""
+
+    return random.Random(int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:12], 16))
+
+
+def serper_payload(query: str, results: int, empty: bool) -> dict:
+    words = query.split()
+    domain = next((w for w in reversed(words) if "." in w), "example.com")
+    company = domain.split(".")[0].replace("-", " ").title()
+    person = " ".join(w for w in words if w != domain).replace(".", " ").title()
+    rng = _seeded(query)
+    organic = []
+    if not empty:
+        for position in range(1, results + 1):
+            subject = person or company
+            organic.append(
+                {
+                    "title": f"{subject} | {company} - result {position}",
+                    "link": f"https://{domain}/page-{position}",
+                    "snippet": (
+                        f"{subject} at {company} {rng.choice(['announced', 'launched', 'expanded', 'hired for'])} "
+                        f"{rng.choice(['a new product line', 'its EMEA team', 'a partner program', 'an AI pilot'])}."
+                    ),
+                    "date": f"{rng.randint(1, 28)} days ago",
+                    "position": position,
+                }
+            )
+    return {
+        "searchParameters": {"q": query, "type": "search", "engine": "google"},
+        "organic": organic,
+        "credits": 1,
+    }
+
+
+def _prospect(email: str) -> dict:
+    local, _, domain = email.partition("@")
+    rng = _seeded(email)
+    return {
+        "prospect_info": {
+            "name": local.replace(".", " ").title() or "Unknown",
+            "title": rng.choice(["Head of Sales", "VP Marketing", "Founder", "Operations Lead"]),
+            "company": domain.split(".")[0].title() or "Unknown",
+            "recent_activity": [f"{domain} announced a new partnership"],
+            "relevance_signals": ["Growing team", "Investing in outbound"],
+        }
+    }
+
+
+_EMAIL_BODY = (
+    "I noticed your team has been expanding its partner program and investing in outbound.\n\n"
+    "We help companies like yours turn research into personalised outreach at scale, "
+    "without adding headcount.\n\n"
+    "Would a short call next week be useful to see if this fits your plans?"
+)
+
+
+def completion_content(prompt: str) -> Tuple[str, bool]:
+    """Return ``(content, is_json)`` matching what the pipeline asked for."""
+
+    if "Original email:" in prompt:
+        original = prompt.split("Original email:", 1)[1].rsplit("Return ONLY", 1)[0]
+        return original.strip(), False
+    # Batched generation: one body per "PROSPECT <id>" section, keyed by id.
+    if '{"emails": [' in prompt:
+        row_ids = re.findall(r"^PROSPECT (\S+)$", prompt, re.MULTILINE)
+        return json.dumps({"emails": [{"id": row_id, "email_body": _EMAIL_BODY} for row_id in row_ids]}), True
+    emails = re.findall(r"EMAIL:\s*(\S+)", prompt)
+    if "for EACH prospect" in prompt:
+        return json.dumps([{"email": email, **_prospect(email)} for email in emails]), True
+    if "Extract structured information" in prompt:
+        return json.dumps(_prospect(emails[0] if emails else "prospect@example.com")), True
+    return _EMAIL_BODY, False
+
+
+def create_app(config: Optional[SimulatorConfig] = None) -> FastAPI:
+    sim = ProviderSimulator(config or SimulatorConfig.from_env())
+    app = FastAPI(title="Provider simulator")
+    app.state.simulator = sim
+
+    @app.post("/search")
+    async def search(request: Request):
+        sim.count("serper", "requests")
+        body = await request.json()
+
+        retry_after = sim.admit("serper")
+        if retry_after is not None:
+            sim.count("serper", "429")
+            return JSONResponse(
+                {"message": "Rate limit exceeded (simulated)"},
+                status_code=429,
+                headers={"retry-after": f"{retry_after:.2f}"},
+            )
+        error = sim.injected_error("serper")
+        if error is not None:
+            return error
+
+        await asyncio.sleep(sim.latency_seconds(sim.config.serper_latency_ms))
+        payload = serper_payload(
+            str(body.get("q") or ""),
+            sim.config.serper_results,
+            sim.chance(sim.config.serper_empty_rate),
+        )
+        if sim.chance(sim.config.malformed_json_rate):
+            sim.count("serper", "malformed")
+            return Response(json.dumps(payload)[:-7], media_type="application/json")
+        sim.count("serper", "ok")
+        return payload
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        sim.count("groq", "requests")
+        body = await request.json()
+        messages = body.get("messages") or []
+        prompt = "\n".join(str(m.get("content") or "") for m in messages if isinstance(m, dict))
+        prompt_tokens = estimate_tokens(prompt)
+        content, is_json = completion_content(prompt)
+        completion_tokens = estimate_tokens(content)
+
+        retry_after = sim.admit("groq", prompt_tokens + completion_tokens)
+        if retry_after is not None:
+            sim.count("groq", "429")
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (simulated)", "type": "tokens"}},
+                status_code=429,
+                headers={"retry-after": f"{retry_after:.2f}"},
+            )
+        error = sim.injected_error("groq")
+        if error is not None:
+            return error
+
+        await asyncio.sleep(
+            sim.latency_seconds(sim.config.groq_latency_ms)
+            + completion_tokens / max(sim.config.groq_tokens_per_second, 1.0)
+        )
+        if is_json and sim.chance(sim.config.malformed_json_rate):
+            sim.count("groq", "malformed")
+            content = content[: max(1, len(content) // 2)]
+
+        sim.count("groq", "ok")
+        sim.count("groq", "prompt_tokens", prompt_tokens)
+        sim.count("groq", "completion_tokens", completion_tokens)
+        return {
+            "id": f"chatcmpl-sim-{sim.random.getrandbits(48):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return sim.snapshot()
+
+    @app.post("/reset")
+    async def reset():
+        sim.reset()
+        return {"ok": True}
+
+    return app
+
+
+app = create_app()
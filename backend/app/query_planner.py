@@ -0,0 +1,100 @@
+"""Decide which Serper queries are worth running for an email address.
+
+Research normally searches ``"{username} {domain}"`` (the person) and
+``domain`` (the company). That wastes calls for some addresses:
+
+* role accounts (``info@``, ``sales@``, ``noreply@``) have no person to find,
+  so only the company query runs;
+* free-mail domains (gmail.com, outlook.com, ...) have no company, so only the
+  person query runs;
+* a role account on a free-mail domain has neither, and malformed addresses
+  cannot be searched at all, so research is skipped.
+
+Classification uses the bundled lists below and never touches the network.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+ROLE = "role"
+FREE_MAIL = "free_mail"
+CORPORATE = "corporate"
+MALFORMED = "malformed"
+
+# Queries run for a corporate address; every other plan is measured against it.
+FULL_QUERY_COUNT = 2
+
+INVALID_EMAIL_MESSAGE = "Research unavailable: invalid or missing email address."
+ROLE_FREE_MAIL_MESSAGE = "Research unavailable: role address on a free-mail domain."
+
+ROLE_LOCAL_PARTS = frozenset(
+    {
+        "abuse", "accounting", "accounts", "admin", "administrator", "billing",
+        "bookings", "careers", "contact", "contactus", "customercare",
+        "customerservice", "enquiries", "enquiry", "events", "finance", "hello",
+        "help", "helpdesk", "hi", "hr", "info", "inquiries", "inquiry", "invoices",
+        "jobs", "legal", "mail", "mailer-daemon", "marketing", "media", "news",
+        "newsletter", "no-reply", "noreply", "do-not-reply", "donotreply",
+        "office", "orders", "partners", "postmaster", "pr", "press", "privacy",
+        "recruiting", "recruitment", "reservations", "sales", "security",
+        "service", "shop", "support", "team", "webmaster", "welcome",
+    }
+)
+
+FREE_MAIL_DOMAINS = frozenset(
+    {
+        "aol.com", "gmail.com", "googlemail.com", "gmx.com", "gmx.de", "gmx.net",
+        "hey.com", "hotmail.co.uk", "hotmail.com", "hotmail.fr", "icloud.com",
+        "live.com", "mac.com", "mail.com", "mail.ru", "me.com", "msn.com",
+        "outlook.com", "pm.me", "proton.me", "protonmail.com", "qq.com",
+        "rediffmail.com", "tutanota.com", "web.de", "yahoo.co.in", "yahoo.co.uk",
+        "yahoo.com", "yahoo.fr", "yandex.com", "yandex.ru", "ymail.com",
+        "zoho.com", "163.com", "126.com",
+    }
+)
+
+_EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """Classification of an email and the Serper queries to run for it."""
+
+    category: str
+    queries: List[str] = field(default_factory=list)
+    skip_message: Optional[str] = None
+
+    @property
+    def skip_research(self) -> bool:
+        return self.skip_message is not None
+
+    @property
+    def provider_calls_saved(self) -> int:
+        """Serper (and, when skipped, Groq) calls avoided versus the full plan."""
+
+        saved = FULL_QUERY_COUNT - len(self.queries)
+        return saved + 1 if self.skip_research else saved
+
+
+def plan_queries(email: str) -> QueryPlan:
+    """Return the search plan for ``email`` using only local lists."""
+
+    value = str(email or "").strip()
+    if not _EMAIL_PATTERN.match(value.lower()):
+        return QueryPlan(MALFORMED, skip_message=INVALID_EMAIL_MESSAGE)
+
+    username, domain = value.split("@", 1)
+    base = username.lower().split("+", 1)[0]
+    is_role = base in ROLE_LOCAL_PARTS
+    is_free_mail = domain.lower() in FREE_MAIL_DOMAINS
+
+    if is_role and is_free_mail:
+        return QueryPlan(ROLE, skip_message=ROLE_FREE_MAIL_MESSAGE)
+    if is_role:
+        return QueryPlan(ROLE, queries=[domain])
+    if is_free_mail:
+        return QueryPlan(FREE_MAIL, queries=[f"{username} {domain}"])
+    return QueryPlan(CORPORATE, queries=[f"{username} {domain}", domain])
@@ -0,0 +1,297 @@
+"""Cluster-wide token-bucket rate limiting for outbound provider calls.
+
+Every worker thread calling Groq or Serper first acquires capacity from a set
+of Redis token buckets (one per provider and one per provider/model, for both
+requests and tokens). The buckets are refilled continuously at the configured
+per-minute rate, so the fleet as a whole converges on a steady request rate
+just under the provider limit instead of bursting into 429s and backing off.
+
+Limits are configured with ``RATE_LIMITS_JSON``, a mapping of
+``"provider"`` or ``"provider:model"`` to ``{"rpm": ..., "tpm": ...}``, merged
+over ``DEFAULT_LIMITS``. A limit of 0 (or a missing key) means unlimited.
+When Redis is unreachable the limiter falls back to in-process buckets so a
+single pod still throttles itself. Waits are bounded by the current row
+deadline: a wait that would leave no time for the call itself raises
+``row_deadline.DeadlineExceeded`` instead of sleeping.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from backend.app import row_deadline
+from backend.app.redis_client import get_redis_connection
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Per-minute request and token budgets; 0 disables that budget."""
+
+    requests_per_minute: float = 0.0
+    tokens_per_minute: float = 0.0
+
+
+DEFAULT_LIMITS: Dict[str, RateLimit] = {
+    "serper": RateLimit(requests_per_minute=600),
+    "groq": RateLimit(requests_per_minute=1000),
+    "groq:llama-3.1-8b-instant": RateLimit(requests_per_minute=1000, tokens_per_minute=250000),
+    "groq:openai/gpt-oss-120b": RateLimit(requests_per_minute=1000, tokens_per_minute=250000),
+}
+
+# Atomically checks every bucket for the request and either consumes from all
+# of them (returns "0") or none (returns the seconds to wait). Uses the Redis
+# clock so pods with skewed clocks still share one timeline.
+_TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local wait = 0
+local levels = {}
+for i = 1, #KEYS do
+    local rate = tonumber(ARGV[(i - 1) * 3 + 1])
+    local capacity = tonumber(ARGV[(i - 1) * 3 + 2])
+    local cost = math.min(tonumber(ARGV[(i - 1) * 3 + 3]), capacity)
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i = 1, #KEYS do
+    local rate = tonumber(ARGV[(i - 1) * 3 + 1])
+    local capacity = tonumber(ARGV[(i - 1) * 3 + 2])
+    local cost = math.min(tonumber(ARGV[(i - 1) * 3 + 3]), capacity)
+    redis.call('HSET', KEYS[i], 'tokens', tostring(levels[i] - cost), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[i], math.ceil(capacity / rate) + 60)
+end
+return "0"
+"""
+
+
+def _load_limits() -> Dict[str, RateLimit]:
+    limits = dict(DEFAULT_LIMITS)
+    raw = os.getenv("RATE_LIMITS_JSON")
+    if not raw:
+        return limits
+    try:
+        overrides = json.loads(raw)
+    except json.JSONDecodeError:
+        LOGGER.warning("RATE_LIMITS_JSON is not valid JSON; using default rate limits")
+        return limits
+    if not isinstance(overrides, dict):
+        return limits
+    for name, config in overrides.items():
+        if not isinstance(config, dict):
+            continue
+        limits[str(name)] = RateLimit(
+            requests_per_minute=float(config.get("rpm") or 0),
+            tokens_per_minute=float(config.get("tpm") or 0),
+        )
+    return limits
+
+
+class _LocalBuckets:
+    """In-process equivalent of the Redis script, used when Redis is unavailable."""
+
+    def __init__(self):
+        self._levels: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, buckets: List[Tuple[str, float, float, float]]) -> float:
+        now = time.monotonic()
+        with self._lock:
+            wait = 0.0
+            levels = []
+            for key, rate, capacity, cost in buckets:
+                tokens, ts = self._levels.get(key, (capacity, now))
+                tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+                levels.append(tokens)
+                cost = min(cost, capacity)
+                if tokens < cost:
+                    wait = max(wait, (cost - tokens) / rate)
+            if wait > 0:
+                return wait
+            for (key, rate, capacity, cost), tokens in zip(buckets, levels):
+                self._levels[key] = (tokens - min(cost, capacity), now)
+            return 0.0
+
+
+class RateLimiter:
+    """Blocking token-bucket limiter shared by all workers through Redis."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, RateLimit]] = None,
+        *,
+        redis_client=None,
+        use_redis: bool = True,
+        enabled: bool = True,
+        burst_seconds: float = 5.0,
+        max_wait_seconds: float = 120.0,
+        redis_retry_seconds: float = 30.0,
+    ):
+        self.limits = _load_limits() if limits is None else dict(limits)
+        self.enabled = enabled
+        self.use_redis = use_redis
+        self.burst_seconds = burst_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.redis_retry_seconds = redis_retry_seconds
+        self._redis = redis_client
+        self._script = None
+        self._redis_disabled_until = 0.0
+        self._local = _LocalBuckets()
+
+    def _buckets(self, provider: str, model: Optional[str], tokens: int):
+        names = [provider]
+        if model:
+            names.append(f"{provider}:{model}")
+        buckets = []
+        for name in names:
+            limit = self.limits.get(name)
+            if limit is None:
+                continue
+            for kind, per_minute, cost in (
+                ("requests", limit.requests_per_minute, 1),
+                ("tokens", limit.tokens_per_minute, tokens),
+            ):
+                if per_minute <= 0 or cost <= 0:
+                    continue
+                rate = per_minute / 60.0
+                capacity = max(float(cost), rate * self.burst_seconds, 1.0)
+                buckets.append((f"ratelimit:{name}:{kind}", rate, capacity, float(cost)))
+        return buckets
+
+    def _try_acquire(self, buckets) -> float:
+        """Attempt to consume from ``buckets``; returns seconds to wait (0 when granted)."""
+
+        if self.use_redis and time.monotonic() >= self._redis_disabled_until:
+            try:
+                if self._redis is None:
+                    self._redis = get_redis_connection()
+                if self._script is None:
+                    self._script = self._redis.register_script(_TOKEN_BUCKET_SCRIPT)
+                args = []
+                for _, rate, capacity, cost in buckets:
+                    args.extend([rate, capacity, cost])
+                return float(self._script(keys=[b[0] for b in buckets], args=args))
+            except Exception as exc:
+                self._redis_disabled_until = time.monotonic() + self.redis_retry_seconds
+                LOGGER.warning(
+                    "Redis rate limiter unavailable; using local buckets for %ss: %s",
+                    self.redis_retry_seconds,
+                    exc,
+                )
+        return self._local.try_acquire(buckets)
+
+    def acquire(self, provider: str, model: Optional[str] = None, tokens: int = 0) -> float:
+        """Block until a request of ``tokens`` estimated tokens may be sent.
+
+        Returns the seconds spent waiting. Raises ``DeadlineExceeded`` when the
+        wait does not fit in the row deadline. After ``max_wait_seconds`` the
+        call proceeds anyway and leaves the provider's own 429 handling to cope.
+        """
+
+        if not self.enabled:
+            return 0.0
+        buckets = self._buckets(provider, model, tokens)
+        if not buckets:
+            return 0.0
+
+        start = time.monotonic()
+        while True:
+            wait = self._try_acquire(buckets)
+            waited = time.monotonic() - start
+            if wait <= 0:
+                return waited
+            _check_deadline(provider, model, wait)
+            if waited + wait > self.max_wait_seconds:
+                LOGGER.warning(
+                    "Rate limiter wait for %s:%s exceeded %ss; proceeding", provider, model, self.max_wait_seconds
+                )
+                return waited
+            # Jitter spreads out waiters that were refused at the same instant.
+            time.sleep(_capped_sleep(wait + random.uniform(0, 0.05)))
+
+    async def acquire_async(self, provider: str, model: Optional[str] = None, tokens: int = 0) -> float:
+        """Async variant of ``acquire``; neither the Redis call nor the sleep blocks the event loop."""
+
+        if not self.enabled:
+            return 0.0
+        buckets = self._buckets(provider, model, tokens)
+        if not buckets:
+            return 0.0
+
+        start = time.monotonic()
+        while True:
+            # The Redis round trip blocks, so it must not run on the shared event loop.
+            wait = await asyncio.to_thread(self._try_acquire, buckets)
+            waited = time.monotonic() - start
+            if wait <= 0:
+                return waited
+            _check_deadline(provider, model, wait)
+            if waited + wait > self.max_wait_seconds:
+                LOGGER.warning(
+                    "Rate limiter wait for %s:%s exceeded %ss; proceeding", provider, model, self.max_wait_seconds
+                )
+                return waited
+            await asyncio.sleep(_capped_sleep(wait + random.uniform(0, 0.05)))
+
+
+def _check_deadline(provider: str, model: Optional[str], wait: float) -> None:
+    if not row_deadline.allows(wait):
+        raise row_deadline.DeadlineExceeded(
+            f"rate limiter wait of {wait:.1f}s for {provider}:{model} does not fit in the row deadline"
+        )
+
+
+def _capped_sleep(seconds: float) -> float:
+    """``seconds`` capped so the sleep never eats into the last ``MIN_CALL_SECONDS``."""
+
+    left = row_deadline.remaining()
+    if left is None:
+        return seconds
+    return max(0.0, min(seconds, left - row_deadline.MIN_CALL_SECONDS))
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter configured from the environment."""
+
+    global _default_limiter
+    if _default_limiter is None:
+        with _default_lock:
+            if _default_limiter is None:
+                _default_limiter = RateLimiter(
+                    enabled=os.getenv("RATE_LIMITER_ENABLED", "1") != "0",
+                    burst_seconds=float(os.getenv("RATE_LIMIT_BURST_SECONDS", "5")),
+                    max_wait_seconds=float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "120")),
+                )
+    return _default_limiter
+
+
+def acquire(provider: str, model: Optional[str] = None, tokens: int = 0) -> float:
+    """Block on the shared limiter before calling ``provider``."""
+
+    return get_rate_limiter().acquire(provider, model, tokens)
+
+
+async def acquire_async(provider: str, model: Optional[str] = None, tokens: int = 0) -> float:
+    return await get_rate_limiter().acquire_async(provider, model, tokens)
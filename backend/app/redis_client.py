@@ -0,0 +1,40 @@
+"""Shared Redis connection for worker-side caches and coordination helpers."""
+
+from __future__ import annotations
+
+import os
+import threading
+
+import redis
+
+REDIS_URL = os.getenv(
+    "REDIS_URL",
+    f"redis://{os.getenv('REDIS_HOST', 'redis')}:{os.getenv('REDIS_PORT', '6379')}",
+)
+
+_connections: dict = {}
+_connection_lock = threading.Lock()
+
+
+def get_redis_connection(decode_responses: bool = True):
+    """Return a process-wide Redis client, creating it on first use.
+
+    The client is configured with short socket timeouts so that callers using
+    Redis as an optimisation (caches, limiters) degrade quickly when Redis is
+    unreachable instead of stalling row processing. Pass
+    ``decode_responses=False`` for binary values such as bitmaps.
+    """
+
+    connection = _connections.get(decode_responses)
+    if connection is None:
+        with _connection_lock:
+            connection = _connections.get(decode_responses)
+            if connection is None:
+                connection = redis.from_url(
+                    REDIS_URL,
+                    decode_responses=decode_responses,
+                    socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", "1")),
+                    socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "2")),
+                )
+                _connections[decode_responses] = connection
+    return connection
@@ -2,20 +2,283 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
+import threading
 import time
+import weakref
 from typing import List
 
+import httpx
 import requests
 
+from backend.app import rate_limiter, row_deadline
+from backend.app.cache import TwoTierCache
+from backend.app.circuit_breaker import ProviderUnavailable, get_breaker
+from backend.app.job_stats import JobStats
+from backend.app.json_repair import repair_json
+from backend.app.llm_client import disable_json_mode, post_chat_completion
+from backend.app.negative_cache import NegativeCache
+from backend.app.query_planner import plan_queries
+from backend.app.singleflight import SingleFlight
+from backend.app.tokens import estimate_tokens
+
 LOGGER = logging.getLogger(__name__)
 
-SERPER_ENDPOINT = "https://google.serper.dev/search"
-GROQ_ENDPOINT = "https://api.groq.com/openai/v1/chat/completions"
+# Overridable so the pipeline can run against provider_simulator offline.
+SERPER_ENDPOINT = os.getenv("SERPER_ENDPOINT", "https://google.serper.dev/search")
+GROQ_ENDPOINT = os.getenv("GROQ_ENDPOINT", "https://api.groq.com/openai/v1/chat/completions")
 MODEL_NAME = "llama-3.1-8b-instant"
 
+# Number of prospects packed into one Groq extraction request (1 disables batching).
+RESEARCH_BATCH_SIZE = int(os.getenv("RESEARCH_BATCH_SIZE", "1"))
+
+# Upper bound on the estimated tokens of compacted search data per prospect.
+RESEARCH_PROMPT_TOKEN_BUDGET = int(os.getenv("RESEARCH_PROMPT_TOKEN_BUDGET", "1500"))
+
+NO_SEARCH_RESULTS_MESSAGE = "Research unavailable: no search results from Serper."
+MALFORMED_RESEARCH_MESSAGE = "Research unavailable: Groq returned malformed JSON after retries."
+DEADLINE_RESEARCH_MESSAGE = "Research unavailable: row deadline reached before Groq returned valid JSON."
+
+# Provider calls a short-circuited prospect avoids: two Serper searches and one Groq extraction.
+PROVIDER_CALLS_PER_PROSPECT = 3
+
+# Ask Groq for a JSON object response (``response_format``). A provider that
+# rejects the parameter has it dropped via ``llm_client.disable_json_mode``.
+GROQ_JSON_MODE = os.getenv("GROQ_JSON_MODE", "1") != "0"
+
+SERPER_TIMEOUT_SECONDS = 20.0
+SERPER_MAX_CONNECTIONS = int(os.getenv("SERPER_MAX_CONNECTIONS", "50"))
+SERPER_MAX_CONNECTIONS_PER_HOST = int(os.getenv("SERPER_MAX_CONNECTIONS_PER_HOST", "20"))
+
+# Serper responses are shared across rows (many rows per company domain) and
+# across worker pods through the Redis tier.
+_SERPER_CACHE = TwoTierCache(
+    "serper",
+    max_entries=int(os.getenv("SERPER_CACHE_MAX_ENTRIES", "2048")),
+    ttl_seconds=float(os.getenv("SERPER_CACHE_TTL_SECONDS", "86400")),
+    use_redis=os.getenv("SERPER_CACHE_REDIS", "1") != "0",
+)
+
+# Identical Serper queries in flight at the same time (e.g. the domain query
+# for 40 rows of one company at chunk start) share a single request.
+_SERPER_FLIGHT = SingleFlight(
+    "serper",
+    use_redis=os.getenv("SERPER_SINGLEFLIGHT_REDIS", "1") != "0",
+)
+
+
+# Emails and domains that produced no organic results or failed extraction.
+_NEGATIVE_CACHE = NegativeCache(
+    "research",
+    ttl_seconds=float(os.getenv("NEGATIVE_CACHE_TTL_SECONDS", str(7 * 86400))),
+    bloom_bits=int(os.getenv("NEGATIVE_CACHE_BLOOM_BITS", str(1 << 20))),
+    use_redis=os.getenv("NEGATIVE_CACHE_REDIS", "1") != "0",
+    enabled=os.getenv("NEGATIVE_CACHE_ENABLED", "1") != "0",
+)
+
+
+# Process-wide counters for how often extraction responses needed repair or a retry.
+_EXTRACTION_STATS = JobStats()
+
+
+def _normalize_query(query: str) -> str:
+    """Normalize a search query so equivalent queries share a cache entry."""
+
+    return " ".join((query or "").lower().split())
+
+
+def serper_cache_stats() -> dict:
+    """Return hit/miss counters for the Serper result cache and query coalescing."""
+
+    stats = _SERPER_CACHE.stats()
+    stats.update(_SERPER_FLIGHT.stats())
+    return stats
+
+
+def extraction_stats() -> dict:
+    """Return counters for Groq extraction responses, local repairs and retries."""
+
+    return _EXTRACTION_STATS.as_dict()
+
+
+class _BackgroundLoop:
+    """Event loop running in a daemon thread so sync callers share one async engine."""
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(
+                        target=loop.run_forever,
+                        name="research-async-engine",
+                        daemon=True,
+                    )
+                    thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def run(self, coro):
+        """Run ``coro`` on the background loop and block until it completes."""
+
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        return future.result()
+
+
+_ENGINE = _BackgroundLoop()
+
+# One pooled client per event loop: httpx clients cannot be shared across loops.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_host_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _build_async_client() -> httpx.AsyncClient:
+    """Create the keep-alive HTTP client used for Serper requests."""
+
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(SERPER_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=SERPER_MAX_CONNECTIONS,
+            max_keepalive_connections=SERPER_MAX_CONNECTIONS,
+            keepalive_expiry=30.0,
+        ),
+    )
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _build_async_client()
+        _async_clients[loop] = client
+    return client
+
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    """Return the per-host concurrency limiter for the running loop."""
+
+    loop = asyncio.get_running_loop()
+    semaphores = _host_semaphores.setdefault(loop, {})
+    host = httpx.URL(url).host
+    semaphore = semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(SERPER_MAX_CONNECTIONS_PER_HOST)
+        semaphores[host] = semaphore
+    return semaphore
+
+
+async def _serper_search_async(query: str, headers: dict) -> dict | None:
+    """Fetch Serper results for ``query``, consulting the shared cache first.
+
+    Cache misses go through single-flight so concurrent identical queries,
+    in this process or on other workers, wait on one request.
+    """
+
+    cache_key = _normalize_query(query)
+    cached = _SERPER_CACHE.get(cache_key)
+    if cached is not None:
+        LOGGER.info("Serper cache hit for query '%s'", query)
+        return cached
+
+    return await _SERPER_FLIGHT.do(cache_key, lambda: _request_serper(query, headers, cache_key))
+
+
+def _is_serper_outage(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+async def _request_serper(query: str, headers: dict, cache_key: str) -> dict | None:
+    timeout = row_deadline.timeout(SERPER_TIMEOUT_SECONDS)
+    breaker = get_breaker("serper")
+    breaker.check()
+    try:
+        await rate_limiter.acquire_async("serper")
+    except row_deadline.DeadlineExceeded:
+        breaker.release_probe()
+        raise
+    try:
+        async with _host_semaphore(SERPER_ENDPOINT):
+            response = await _get_async_client().post(
+                SERPER_ENDPOINT,
+                headers=headers,
+                json={"q": query},
+                timeout=timeout,
+            )
+        response.raise_for_status()
+        payload = response.json()
+    except Exception as exc:
+        if _is_serper_outage(exc):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        LOGGER.exception("Serper request failed for query '%s': %s", query, exc)
+        return None
+    breaker.record_success()
+
+    if isinstance(payload, dict):
+        _SERPER_CACHE.set(cache_key, payload)
+    return payload
+
+
+async def _fetch_search_payloads_async(queries: List[str], headers: dict) -> List[dict | None]:
+    """Run all Serper queries concurrently; failed queries are ``None`` in query order."""
+
+    return list(
+        await asyncio.gather(*(_serper_search_async(query, headers) for query in queries if query))
+    )
+
+
+async def _fetch_search_data_async(queries: List[str], headers: dict) -> List[dict]:
+    """Run all Serper queries concurrently, preserving query order in the result."""
+
+    results = await _fetch_search_payloads_async(queries, headers)
+    return [payload for payload in results if payload is not None]
+
+
+def negative_research_result(email: str) -> str | None:
+    """Return the cached fallback for an email or domain known to yield no research."""
+
+    if not email or "@" not in email:
+        return None
+    cached = _NEGATIVE_CACHE.lookup("email", email)
+    if cached is None:
+        cached = _NEGATIVE_CACHE.lookup("domain", email.split("@", 1)[1])
+    return cached
+
+
+def _record_search_outcome(email: str, queries: List[str], payloads: List[dict | None]) -> None:
+    """Mark the email/domain negative when every search succeeded but found nothing.
+
+    Failed requests are transient and never count as evidence.
+    """
+
+    if not payloads or any(payload is None for payload in payloads):
+        return
+    domain = email.split("@", 1)[1]
+    for query, payload in zip([query for query in queries if query], payloads):
+        if query == domain and not payload.get("organic"):
+            _NEGATIVE_CACHE.mark("domain", domain, NO_SEARCH_RESULTS_MESSAGE)
+    if not _has_organic_results(payloads):
+        _NEGATIVE_CACHE.mark("email", email, NO_SEARCH_RESULTS_MESSAGE)
+
+
+def _record_extraction_outcome(email: str, research: str) -> None:
+    if research == MALFORMED_RESEARCH_MESSAGE:
+        _NEGATIVE_CACHE.mark("email", email, research)
+
 
 def _clean_response_content(content: str) -> str:
     """Normalize Groq response content to a raw JSON string."""
@@ -126,10 +389,64 @@ def _is_valid_research_payload(content: str) -> tuple[bool, dict | None]:
     return False, None
 
 
+def _compact_search_data(search_data: List[dict], token_budget: int | None = None) -> List[dict]:
+    """Reduce raw Serper payloads to the organic fields the extraction prompt uses.
+
+    Knowledge graphs, "people also ask", sitelinks, related searches and
+    request metadata are dropped. Results from the different queries are
+    interleaved so each query stays represented, duplicate snippets are
+    removed, and results are appended until the estimated token budget is
+    reached.
+    """
+
+    if token_budget is None:
+        token_budget = RESEARCH_PROMPT_TOKEN_BUDGET
+
+    per_query: List[List[dict]] = []
+    for payload in search_data:
+        entries = []
+        for item in payload.get("organic") or []:
+            if not isinstance(item, dict):
+                continue
+            title = " ".join(str(item.get("title") or "").split())
+            snippet = " ".join(str(item.get("snippet") or "").split())
+            if not title and not snippet:
+                continue
+            entry = {"title": title, "snippet": snippet}
+            if isinstance(item.get("date"), str) and item["date"]:
+                entry["date"] = item["date"]
+            entries.append(entry)
+        per_query.append(entries)
+
+    compacted: List[dict] = []
+    seen: set[str] = set()
+    used_tokens = 0
+    longest = max((len(entries) for entries in per_query), default=0)
+    for position in range(longest):
+        for entries in per_query:
+            if position >= len(entries):
+                continue
+            entry = entries[position]
+            dedupe_key = (entry["snippet"] or entry["title"]).lower()
+            if dedupe_key in seen:
+                continue
+            cost = estimate_tokens(_compact_json(entry))
+            if used_tokens + cost > token_budget:
+                return compacted
+            seen.add(dedupe_key)
+            compacted.append(entry)
+            used_tokens += cost
+    return compacted
+
+
+def _compact_json(value: object) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
 def _build_prompt(email: str, search_data: List[dict]) -> str:
     prompt = (
         "Extract structured information from this research data and return ONLY valid JSON.\n\n"
-        f"RESEARCH DATA:\n{json.dumps(search_data, indent=2)}\n\n"
+        f"RESEARCH DATA:\n{_compact_json(search_data)}\n\n"
         "Extract into this exact structure (a SINGLE JSON OBJECT, NOT an array):\n"
         "{\n"
         '    "prospect_info": {\n'
@@ -151,6 +468,217 @@ def _build_prompt(email: str, search_data: List[dict]) -> str:
     return prompt
 
 
+def _build_compact_prompt(email: str, search_data: List[dict]) -> str:
+    """Compact raw Serper payloads and build the extraction prompt, logging the savings."""
+
+    compacted = _compact_search_data(search_data)
+    LOGGER.debug("Compacted research data for %s: %s", email, _compact_json(compacted))
+
+    prompt = _build_prompt(email, compacted)
+    raw_text = json.dumps(search_data, indent=2)
+    compact_text = _compact_json(compacted)
+    LOGGER.info(
+        "Research prompt for %s: search data %d -> %d chars (~%d -> ~%d tokens), prompt ~%d tokens",
+        email,
+        len(raw_text),
+        len(compact_text),
+        estimate_tokens(raw_text),
+        estimate_tokens(compact_text),
+        estimate_tokens(prompt),
+    )
+    return prompt
+
+
+def _build_batch_prompt(items: List[tuple[str, List[dict]]]) -> str:
+    sections = []
+    for index, (email, search_data) in enumerate(items, start=1):
+        sections.append(
+            f"PROSPECT {index}\n"
+            f"EMAIL: {email}\n"
+            f"RESEARCH DATA:\n{_compact_json(_compact_search_data(search_data))}\n"
+        )
+    prompt = (
+        "Extract structured information for EACH prospect below and return ONLY valid JSON.\n\n"
+        + "\n".join(sections)
+        + "\nReturn a JSON ARRAY with exactly one object per prospect, in this structure:\n"
+        "[\n"
+        "    {\n"
+        '        "email": "The prospect EMAIL exactly as given",\n'
+        '        "prospect_info": {\n'
+        '            "name": "Full name",\n'
+        '            "title": "Current job title or empty string if not found",\n'
+        '            "company": "Company name",\n'
+        '            "recent_activity": ["Recent thing 1", "Recent thing 2"],\n'
+        '            "relevance_signals": ["Major signal"]\n'
+        "        }\n"
+        "    }\n"
+        "]\n\n"
+        "CRITICAL REQUIREMENTS:\n"
+        "- Use ONLY the research data listed under each prospect for that prospect\n"
+        "- If title is not available, use empty string \"\" (NOT null)\n"
+        "- All string fields must be strings, never null\n"
+        "- Return ONLY the JSON array, no explanation, no markdown fences\n"
+        "- Ensure all JSON is valid and parseable\n"
+        "- recent_activity and relevance_signals must be arrays of strings"
+    )
+    return prompt
+
+
+def _parse_batch_payload(content: str, emails: List[str]) -> dict[str, dict]:
+    """Validate a batched extraction response, returning normalized payloads by email.
+
+    Entries that are missing, unknown, duplicated or malformed are left out so
+    the caller can retry them individually.
+    """
+
+    try:
+        payload = json.loads(content)
+    except json.JSONDecodeError:
+        payload = repair_json(content)
+        if payload is None:
+            return {}
+        _EXTRACTION_STATS.incr("extraction_repaired")
+
+    if isinstance(payload, dict):
+        # Tolerate wrappers such as {"prospects": [...]}.
+        wrapped = next((value for value in payload.values() if isinstance(value, list)), None)
+        payload = wrapped if wrapped is not None else [payload]
+    if not isinstance(payload, list):
+        return {}
+
+    wanted = {email.strip().lower(): email for email in emails}
+    parsed: dict[str, dict] = {}
+    for element in payload:
+        if not isinstance(element, dict):
+            continue
+        email = wanted.get(str(element.get("email") or "").strip().lower())
+        if email is None or email in parsed:
+            continue
+        entry = {key: value for key, value in element.items() if key != "email"}
+        is_valid, normalized_payload = _is_valid_research_payload(json.dumps(entry))
+        if is_valid and normalized_payload is not None:
+            parsed[email] = normalized_payload
+    return parsed
+
+
+_BATCH_SYSTEM_PROMPT = (
+    "You are a precise assistant that only responds with valid JSON. "
+    "Never include explanations, only return the JSON array."
+)
+
+# Typical completion size of one prospect_info object, used for token budgeting.
+EXTRACTION_COMPLETION_TOKEN_ESTIMATE = 300
+
+_JSON_SYSTEM_PROMPT = (
+    "You are a precise assistant that only responds with valid JSON. "
+    "Never include explanations, only return the JSON object."
+)
+
+
+def _request_groq_content(
+    prompt: str,
+    groq_key: str,
+    system_prompt: str = _JSON_SYSTEM_PROMPT,
+    expected_completion_tokens: int = EXTRACTION_COMPLETION_TOKEN_ESTIMATE,
+    json_mode: bool = False,
+) -> str:
+    """Send one extraction request to Groq and return the cleaned message content.
+
+    ``json_mode`` requests a JSON object ``response_format`` (single-prospect
+    extraction only; batched prompts return an array). Raises on HTTP errors
+    or when the response carries no usable content.
+    """
+
+    json_mode = json_mode and GROQ_JSON_MODE
+    request_payload = {
+        "model": MODEL_NAME,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ],
+        "temperature": 0.3,
+        "max_completion_tokens": 11500,
+    }
+    if json_mode:
+        request_payload["response_format"] = {"type": "json_object"}
+    _EXTRACTION_STATS.incr("extraction_requests")
+    response = post_chat_completion(
+        GROQ_ENDPOINT,
+        headers={
+            "Authorization": f"Bearer {groq_key}",
+            "Content-Type": "application/json",
+        },
+        payload=request_payload,
+        model=MODEL_NAME,
+        tokens=estimate_tokens(system_prompt) + estimate_tokens(prompt) + expected_completion_tokens,
+        timeout=30,
+        stage="research",
+    )
+    if json_mode and response.status_code == 400:
+        error = _json_mode_error(response)
+        failed_generation = error.get("failed_generation")
+        if isinstance(failed_generation, str) and failed_generation.strip():
+            # Groq rejects JSON-mode output that does not parse but returns
+            # it, which is usually repairable locally.
+            return _clean_response_content(failed_generation)
+        if _rejects_response_format(error):
+            provider_key = getattr(response, "llm_provider", f"groq:{MODEL_NAME}")
+            LOGGER.warning(
+                "%s rejected response_format (%s); disabling JSON mode for it", provider_key, error.get("message")
+            )
+            disable_json_mode(provider_key)
+            return _request_groq_content(prompt, groq_key, system_prompt, expected_completion_tokens)
+    response.raise_for_status()
+    payload = response.json()
+    choices = payload.get("choices") or []
+    if not choices:
+        raise ValueError("Groq response missing choices")
+    message = choices[0].get("message") or {}
+    content = message.get("content")
+    if not content:
+        raise ValueError("Groq response missing message content")
+
+    cleaned = _clean_response_content(content)
+    if not cleaned:
+        raise ValueError("Groq response empty after cleaning")
+    return cleaned
+
+
+def _json_mode_error(response) -> dict:
+    try:
+        error = response.json().get("error")
+    except Exception:
+        return {}
+    return error if isinstance(error, dict) else {}
+
+
+def _rejects_response_format(error: dict) -> bool:
+    """Whether a 400 error body is about ``response_format`` itself, not the prompt."""
+
+    return "response_format" in f"{error.get('param') or ''} {error.get('message') or ''}"
+
+
+def _validate_research_content(content: str) -> tuple[bool, dict | None]:
+    """Validate ``content``, falling back to local JSON repair before giving up."""
+
+    is_valid, normalized_payload = _is_valid_research_payload(content)
+    if is_valid:
+        return is_valid, normalized_payload
+
+    repaired = repair_json(content)
+    if isinstance(repaired, dict) and "prospect_info" not in repaired and "person" not in repaired:
+        # Unwrap single-key wrappers such as {"prospect": {...}}.
+        inner = [value for value in repaired.values() if isinstance(value, (dict, list))]
+        if len(repaired) == 1 and inner:
+            repaired = inner[0]
+    if repaired is None:
+        return False, None
+    is_valid, normalized_payload = _is_valid_research_payload(json.dumps(repaired))
+    if is_valid:
+        _EXTRACTION_STATS.incr("extraction_repaired")
+    return is_valid, normalized_payload
+
+
 def _call_groq_with_retry(prompt: str, email: str, max_retries: int = 3) -> tuple[bool, str | dict]:
     """Call Groq API with retry logic for malformed JSON responses.
 
@@ -167,41 +695,11 @@ def _call_groq_with_retry(prompt: str, email: str, max_retries: int = 3) -> tupl
         try:
             LOGGER.info("Groq API attempt %d/%d for %s", attempt + 1, max_retries, email)
 
-            response = requests.post(
-                GROQ_ENDPOINT,
-                headers={
-                    "Authorization": f"Bearer {groq_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": MODEL_NAME,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a precise assistant that only responds with valid JSON. Never include explanations, only return the JSON object.",
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    "temperature": 0.3,
-                    "max_completion_tokens": 11500,
-                },
-                timeout=30,
-            )
-            response.raise_for_status()
-            payload = response.json()
-            choices = payload.get("choices") or []
-            if not choices:
-                raise ValueError("Groq response missing choices")
-            message = choices[0].get("message") or {}
-            content = message.get("content")
-            if not content:
-                raise ValueError("Groq response missing message content")
-
-            cleaned = _clean_response_content(content)
-            if not cleaned:
-                raise ValueError("Groq response empty after cleaning")
-
-            is_valid, normalized_payload = _is_valid_research_payload(cleaned)
+            if attempt:
+                _EXTRACTION_STATS.incr("extraction_retries")
+            cleaned = _request_groq_content(prompt, groq_key, json_mode=True)
+
+            is_valid, normalized_payload = _validate_research_content(cleaned)
             if not is_valid or normalized_payload is None:
                 LOGGER.warning(
                     "Groq returned invalid research JSON for %s (attempt %d/%d). Raw response: %s",
@@ -212,25 +710,32 @@ def _call_groq_with_retry(prompt: str, email: str, max_retries: int = 3) -> tupl
                 )
 
                 # If this is not the last attempt, retry with exponential backoff
+                backoff_seconds = 2 ** attempt  # 1s, 2s, 4s
+                if attempt < max_retries - 1 and not row_deadline.allows(backoff_seconds):
+                    LOGGER.warning("Skipping Groq retry for %s: row deadline too close", email)
+                    return False, DEADLINE_RESEARCH_MESSAGE
                 if attempt < max_retries - 1:
-                    backoff_seconds = 2 ** attempt  # 1s, 2s, 4s
                     LOGGER.info("Retrying in %d seconds...", backoff_seconds)
                     time.sleep(backoff_seconds)
                     continue
                 else:
                     # Last attempt failed
+                    _EXTRACTION_STATS.incr("extraction_failures")
                     LOGGER.error(
                         "Groq failed to return valid JSON after %d attempts for %s. Last response: %s",
                         max_retries,
                         email,
                         cleaned
                     )
-                    return False, "Research unavailable: Groq returned malformed JSON after retries."
+                    return False, MALFORMED_RESEARCH_MESSAGE
 
             # Success!
             LOGGER.info("Groq returned valid JSON for %s on attempt %d", email, attempt + 1)
             return True, normalized_payload
 
+        except (ProviderUnavailable, row_deadline.DeadlineExceeded):
+            # No point retrying while the breaker is open or the row is out of time.
+            raise
         except Exception as exc:
             LOGGER.exception(
                 "Groq request failed for %s (attempt %d/%d): %s",
@@ -241,8 +746,11 @@ def _call_groq_with_retry(prompt: str, email: str, max_retries: int = 3) -> tupl
             )
 
             # If this is not the last attempt, retry with exponential backoff
+            backoff_seconds = 2 ** attempt  # 1s, 2s, 4s
+            if attempt < max_retries - 1 and not row_deadline.allows(backoff_seconds):
+                LOGGER.warning("Skipping Groq retry for %s: row deadline too close", email)
+                return False, DEADLINE_RESEARCH_MESSAGE
             if attempt < max_retries - 1:
-                backoff_seconds = 2 ** attempt  # 1s, 2s, 4s
                 LOGGER.info("Retrying in %d seconds...", backoff_seconds)
                 time.sleep(backoff_seconds)
                 continue
@@ -252,14 +760,21 @@ def _call_groq_with_retry(prompt: str, email: str, max_retries: int = 3) -> tupl
     return False, "Research unavailable: max retries exceeded."
 
 
-def perform_research(email: str) -> str:
-    """Run Serper and Groq research for an email address.
+def _has_organic_results(search_data: List[dict]) -> bool:
+    return bool(search_data) and any(d.get("organic") for d in search_data)
 
-    Returns the JSON string from Groq or a descriptive fallback string if anything fails.
+
+def _prepare_research(email: str) -> str | tuple[List[str], dict]:
+    """Validate inputs and build the Serper queries for ``email``.
+
+    Returns a fallback string when research cannot run, otherwise the
+    ``(queries, headers)`` pair for the search fan-out.
     """
 
-    if not email or "@" not in email:
-        return "Research unavailable: invalid or missing email address."
+    plan = plan_queries(email)
+    if plan.skip_research:
+        LOGGER.info("Query planner skipped research for %s (%s)", email, plan.category)
+        return plan.skip_message
 
     serper_key = os.getenv("SERPER_API_KEY")
     
@@ -280,39 +795,27 @@ def perform_research(email: str) -> str:
         LOGGER.warning("GROQ_API_KEY not configured; skipping research for %s", email)
         return "Research unavailable: missing Groq API key."
 
-    username, domain = email.split("@", 1)
-    queries = [f"{username} {domain}".strip(), domain]
+    cached = negative_research_result(email)
+    if cached is not None:
+        LOGGER.info("Negative research cache hit for %s; skipping provider calls", email)
+        return cached
+
+    queries = plan.queries
 
-    search_data: List[dict] = []
     headers = {
         "X-API-KEY": serper_key,
         "Content-Type": "application/json",
     }
+    return queries, headers
 
-    for query in queries:
-        if not query:
-            continue
-        try:
-            response = requests.post(
-                SERPER_ENDPOINT,
-                headers=headers,
-                json={"q": query},
-                timeout=20,
-            )
-            response.raise_for_status()
-            payload = response.json()
-            search_data.append(payload)
-        except Exception as exc:
-            LOGGER.exception("Serper request failed for query '%s': %s", query, exc)
-            continue
 
-    if not search_data or not any(d.get("organic") for d in search_data):
-        return "Research unavailable: no search results from Serper."
+def _extract_research(email: str, search_data: List[dict]) -> str:
+    """Turn fetched Serper payloads into the research JSON string via Groq."""
 
-    print("\n📊 RAW RESEARCH DATA:")
-    print(json.dumps(search_data, indent=2))
+    if not _has_organic_results(search_data):
+        return NO_SEARCH_RESULTS_MESSAGE
 
-    prompt = _build_prompt(email, search_data)
+    prompt = _build_compact_prompt(email, search_data)
 
     # Get max retries from environment variable, default to 3
     max_retries = int(os.getenv("GROQ_MAX_RETRIES", "3"))
@@ -326,3 +829,142 @@ def perform_research(email: str) -> str:
     else:
         # result is an error message string
         return result
+
+
+async def perform_research_async(email: str) -> str:
+    """Async research engine: concurrent Serper queries on a pooled client.
+
+    The Groq extraction step is blocking and runs in the loop's default
+    executor so the event loop stays free for other rows.
+    """
+
+    prepared = _prepare_research(email)
+    if isinstance(prepared, str):
+        return prepared
+    queries, headers = prepared
+
+    payloads = await _fetch_search_payloads_async(queries, headers)
+    _record_search_outcome(email, queries, payloads)
+    search_data = [payload for payload in payloads if payload is not None]
+    research = await asyncio.to_thread(_extract_research, email, search_data)
+    _record_extraction_outcome(email, research)
+    return research
+
+
+def perform_research(email: str) -> str:
+    """Run Serper and Groq research for an email address.
+
+    Thin synchronous wrapper over the async engine: the Serper fan-out runs on
+    a shared background event loop (one connection pool per process) and the
+    Groq extraction runs in the calling thread.
+
+    Returns the JSON string from Groq or a descriptive fallback string if anything fails.
+    """
+
+    prepared = _prepare_research(email)
+    if isinstance(prepared, str):
+        return prepared
+    queries, headers = prepared
+
+    payloads = _ENGINE.run(row_deadline.bind(_fetch_search_payloads_async(queries, headers)))
+    _record_search_outcome(email, queries, payloads)
+    search_data = [payload for payload in payloads if payload is not None]
+    research = _extract_research(email, search_data)
+    _record_extraction_outcome(email, research)
+    return research
+
+
+def extract_research_batch(
+    items: List[tuple[str, List[dict]]], max_retries: int | None = None
+) -> dict[str, str]:
+    """Extract research for several prospects with a single Groq request.
+
+    ``items`` pairs each email with its Serper payloads. Every element of the
+    returned array is validated with ``_is_valid_research_payload``; prospects
+    whose entry is missing or malformed fall back to the single-prospect
+    ``_call_groq_with_retry`` path. Returns research strings keyed by email.
+    """
+
+    if max_retries is None:
+        max_retries = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+
+    groq_key = os.getenv("GROQ_API_KEY")
+    if not groq_key:
+        return {email: "Research unavailable: missing Groq API key." for email, _ in items}
+
+    results: dict[str, str] = {}
+    if len(items) > 1:
+        emails = [email for email, _ in items]
+        try:
+            content = _request_groq_content(
+                _build_batch_prompt(items),
+                groq_key,
+                _BATCH_SYSTEM_PROMPT,
+                EXTRACTION_COMPLETION_TOKEN_ESTIMATE * len(items),
+            )
+            for email, payload in _parse_batch_payload(content, emails).items():
+                results[email] = json.dumps(payload, ensure_ascii=False, indent=2)
+        except (ProviderUnavailable, row_deadline.DeadlineExceeded):
+            raise
+        except Exception as exc:
+            LOGGER.exception("Batched Groq extraction failed for %d prospects: %s", len(items), exc)
+        LOGGER.info(
+            "Batched Groq extraction returned %d/%d valid entries", len(results), len(items)
+        )
+
+    for email, search_data in items:
+        if email in results:
+            continue
+        success, result = _call_groq_with_retry(
+            _build_compact_prompt(email, search_data), email, max_retries
+        )
+        results[email] = json.dumps(result, ensure_ascii=False, indent=2) if success else result
+
+    return results
+
+
+async def _fetch_many_async(pending: List[tuple[str, List[str], dict]]) -> List[List[dict | None]]:
+    return await asyncio.gather(
+        *(_fetch_search_payloads_async(queries, headers) for _, queries, headers in pending)
+    )
+
+
+def perform_research_batch(emails: List[str], batch_size: int | None = None) -> dict[str, str]:
+    """Research several emails, packing Groq extraction into batches.
+
+    Serper searches for all emails run concurrently on the async engine; the
+    prospects with usable results are then extracted ``batch_size`` at a time.
+    Returns the same strings ``perform_research`` would, keyed by email.
+    """
+
+    if batch_size is None:
+        batch_size = RESEARCH_BATCH_SIZE
+    batch_size = max(1, int(batch_size))
+
+    results: dict[str, str] = {}
+    pending: List[tuple[str, List[str], dict]] = []
+    for email in dict.fromkeys(emails):
+        prepared = _prepare_research(email)
+        if isinstance(prepared, str):
+            results[email] = prepared
+        else:
+            pending.append((email, *prepared))
+
+    search_results = _ENGINE.run(row_deadline.bind(_fetch_many_async(pending))) if pending else []
+
+    extractable: List[tuple[str, List[dict]]] = []
+    for (email, queries, _), payloads in zip(pending, search_results):
+        _record_search_outcome(email, queries, payloads)
+        search_data = [payload for payload in payloads if payload is not None]
+        if _has_organic_results(search_data):
+            extractable.append((email, search_data))
+        else:
+            results[email] = NO_SEARCH_RESULTS_MESSAGE
+
+    for start in range(0, len(extractable), batch_size):
+        extracted = extract_research_batch(extractable[start:start + batch_size])
+        for email, research in extracted.items():
+            _record_extraction_outcome(email, research)
+        results.update(extracted)
+
+    return results
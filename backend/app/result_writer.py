@@ -0,0 +1,77 @@
+"""Streaming writer for a job's final XLSX result.
+
+Rows are appended to an openpyxl write-only workbook as they are read, so
+finalizing a job holds one row in memory instead of every chunk as a
+DataFrame. Chunk CSVs are merged in chunk order. Values are written as the
+text the pipeline produced (empty cells stay blank), so IDs and phone
+numbers keep their leading zeros.
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+LOGGER = logging.getLogger(__name__)
+
+SHEET_TITLE = "Sheet1"
+
+
+def resolve_result_columns(
+    final_headers: Optional[Sequence[str]], extra_columns: Iterable[str] = ()
+) -> List[str]:
+    """``final_headers`` in order (blank and duplicate names dropped), then unseen extras."""
+
+    columns: List[str] = []
+    seen = set()
+    for header in list(final_headers or []) + list(extra_columns):
+        if not header or header in seen:
+            continue
+        columns.append(header)
+        seen.add(header)
+    return columns
+
+
+def csv_columns(paths: Iterable[str]) -> List[str]:
+    """Union of the header rows of ``paths``, in first-seen order."""
+
+    columns: List[str] = []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8-sig") as handle:
+            columns = resolve_result_columns(columns, next(csv.reader(handle), []))
+    return columns
+
+
+def iter_csv_rows(paths: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """Rows of every CSV in ``paths``, one file after another."""
+
+    for path in paths:
+        with open(path, newline="", encoding="utf-8-sig") as handle:
+            yield from csv.DictReader(handle)
+
+
+def _cell(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        # Control characters are rejected by openpyxl and make the file unreadable.
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+
+def write_result_xlsx(path: str, columns: Sequence[str], rows: Iterable[Dict[str, object]]) -> int:
+    """Stream ``rows`` into a single-sheet XLSX at ``path``; returns the row count."""
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(SHEET_TITLE)
+    sheet.append(list(columns))
+    count = 0
+    for row in rows:
+        sheet.append([_cell(row.get(column)) for column in columns])
+        count += 1
+    workbook.save(path)
+    return count
@@ -0,0 +1,119 @@
+"""Per-chunk journal of finished rows so a retried subjob can resume.
+
+Each row that completes without an error is written to a Redis hash keyed
+by its index within the chunk. When a subjob is retried, or a micro-batch is
+reclaimed from a worker that died, the journal is loaded first and only the
+missing rows are processed again. Rows that failed are not journaled, so a
+retry gets another chance at them. The hash also keeps how many of the
+chunk's rows were last reported to job progress, so a retry reports exactly
+the difference instead of assuming every journaled row was counted. The
+journal is an optimisation: if Redis is unreachable it switches itself off
+and the chunk is processed in full.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Dict
+
+from backend.app.redis_client import get_redis_connection
+
+LOGGER = logging.getLogger(__name__)
+
+CHECKPOINTS_ENABLED = os.getenv("ROW_CHECKPOINTS_ENABLED", "1") != "0"
+CHECKPOINT_TTL_SECONDS = int(os.getenv("ROW_CHECKPOINT_TTL_SECONDS", str(2 * 24 * 3600)))
+
+# Hash field holding the chunk's reported progress, next to the row indices.
+_REPORTED_FIELD = "reported"
+
+
+class RowJournal:
+    """Completed rows of one chunk, keyed by row index."""
+
+    def __init__(
+        self,
+        job_id: str,
+        chunk_id: int,
+        *,
+        redis_client=None,
+        enabled: bool = CHECKPOINTS_ENABLED,
+        ttl_seconds: int = CHECKPOINT_TTL_SECONDS,
+    ):
+        self.key = f"checkpoint:{job_id}:{chunk_id}"
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.recorded = 0
+        # Rows of the chunk already counted in job progress, as of ``load()``.
+        self.reported = 0
+        self._redis = redis_client
+
+    def _client(self):
+        if not self.enabled:
+            return None
+        if self._redis is None:
+            self._redis = get_redis_connection()
+        return self._redis
+
+    def _disable(self, action: str, exc: Exception) -> None:
+        LOGGER.warning("Row journal %s unavailable while trying to %s (%s); continuing without it", self.key, action, exc)
+        self.enabled = False
+
+    def load(self) -> Dict[int, dict]:
+        """Rows already completed by an earlier attempt; also sets ``reported``."""
+
+        client = self._client()
+        if client is None:
+            return {}
+        try:
+            entries = client.hgetall(self.key) or {}
+        except Exception as exc:  # noqa: BLE001 - the journal must never fail a chunk
+            self._disable("load", exc)
+            return {}
+        rows: Dict[int, dict] = {}
+        for index, payload in entries.items():
+            if index == _REPORTED_FIELD:
+                try:
+                    self.reported = max(0, int(payload))
+                except (TypeError, ValueError):
+                    LOGGER.warning("Ignoring unreadable reported count in %s", self.key)
+                continue
+            try:
+                rows[int(index)] = json.loads(payload)
+            except (TypeError, ValueError):
+                LOGGER.warning("Ignoring unreadable journal entry %s[%s]", self.key, index)
+        return rows
+
+    def record(self, row_index: int, row: dict) -> None:
+        self._write(str(row_index), json.dumps(row), "record")
+
+    def record_reported(self, reported: int) -> None:
+        """Remember how many of the chunk's rows job progress now includes."""
+
+        self.reported = reported
+        self._write(_REPORTED_FIELD, str(reported), "record progress")
+
+    def _write(self, field: str, value: str, action: str) -> None:
+        client = self._client()
+        if client is None:
+            return
+        try:
+            client.hset(self.key, field, value)
+            if self.recorded == 0:
+                client.expire(self.key, self.ttl_seconds)
+            self.recorded += 1
+        except Exception as exc:  # noqa: BLE001
+            self._disable(action, exc)
+
+    def clear(self) -> None:
+        """Drop the journal once the chunk's output is safely stored."""
+
+        client = self._client()
+        if client is None:
+            return
+        try:
+            client.delete(self.key)
+        except Exception as exc:  # noqa: BLE001
+            self._disable("clear", exc)
+
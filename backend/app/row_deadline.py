@@ -0,0 +1,99 @@
+"""End-to-end time budget for processing one row.
+
+A row's deadline is set when its first stage starts and carried on the row
+through research, generation and cleaning. While a stage runs, the deadline
+is held in a context variable so the provider call sites can cap their own
+timeouts with ``timeout(default)`` and skip retries that cannot finish in
+time (``allows(seconds)``) without threading a parameter through every
+helper. Async code on another thread picks it up through ``bind(coro)``.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# 0 disables the deadline.
+ROW_DEADLINE_SECONDS = float(os.getenv("ROW_DEADLINE_SECONDS", "120"))
+# Calls are not started with less budget than this left.
+MIN_CALL_SECONDS = float(os.getenv("ROW_DEADLINE_MIN_CALL_SECONDS", "2"))
+
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("row_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The row's time budget is spent."""
+
+
+def new_deadline(seconds: Optional[float] = None) -> Optional[float]:
+    """Return a monotonic deadline ``seconds`` from now, or ``None`` when disabled."""
+
+    seconds = ROW_DEADLINE_SECONDS if seconds is None else seconds
+    return time.monotonic() + seconds if seconds and seconds > 0 else None
+
+
+@contextmanager
+def scope(deadline: Optional[float]) -> Iterator[None]:
+    """Make ``deadline`` the current deadline for the duration of the block."""
+
+    token = _DEADLINE.set(deadline)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def current() -> Optional[float]:
+    return _DEADLINE.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current deadline, or ``None`` without one."""
+
+    deadline = _DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def extend(seconds: float) -> None:
+    """Push the current deadline back, e.g. by the time a row spent paused."""
+
+    deadline = _DEADLINE.get()
+    if deadline is not None and seconds > 0:
+        _DEADLINE.set(deadline + seconds)
+
+
+def allows(seconds: float) -> bool:
+    """Whether ``seconds`` of waiting still leaves time for a useful call."""
+
+    left = remaining()
+    return left is None or left - seconds >= MIN_CALL_SECONDS
+
+
+def timeout(default: float) -> float:
+    """``default`` capped by the remaining budget; raises when too little is left."""
+
+    left = remaining()
+    if left is None:
+        return default
+    if left < MIN_CALL_SECONDS:
+        raise DeadlineExceeded(f"row deadline exceeded ({max(left, 0.0):.1f}s left)")
+    return min(default, left)
+
+
+async def _run_bound(awaitable: Awaitable[T], deadline: Optional[float]) -> T:
+    token = _DEADLINE.set(deadline)
+    try:
+        return await awaitable
+    finally:
+        _DEADLINE.reset(token)
+
+
+def bind(awaitable: Awaitable[T]) -> Awaitable[T]:
+    """Carry the caller's deadline into ``awaitable`` when it runs on another loop."""
+
+    return _run_bound(awaitable, _DEADLINE.get())
@@ -0,0 +1,193 @@
+"""Staged, backpressured pipeline for per-row work.
+
+Each stage has its own worker threads and reads from a bounded queue fed by
+the previous stage, so a slow provider only fills its own queue instead of
+holding slots needed by the other stages. When a queue is full the upstream
+workers block, which keeps memory bounded and the stages balanced.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+# How often blocked workers re-check for cancellation.
+_POLL_SECONDS = 0.1
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One pipeline stage: ``fn(item) -> item`` run by ``workers`` threads."""
+
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int
+    queue_size: int
+
+
+class _Finished:
+    """An item that failed a stage and skips the remaining ones."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+_END = object()
+
+
+class _StageMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.max_queue_depth = 0
+
+    def sample_depth(self, depth: int) -> None:
+        with self.lock:
+            self.depth_samples += 1
+            self.depth_total += depth
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {
+                "processed": self.processed,
+                "errors": self.errors,
+                "busy_seconds": round(self.busy_seconds, 3),
+                "blocked_seconds": round(self.blocked_seconds, 3),
+                "max_queue_depth": self.max_queue_depth,
+                "avg_queue_depth": round(self.depth_total / self.depth_samples, 2) if self.depth_samples else 0.0,
+            }
+
+
+class StagedPipeline:
+    """Run items through ``stages`` with bounded queues between them.
+
+    ``on_error(item, stage_name, exc)`` turns an exception raised by a stage
+    into a final result that bypasses the remaining stages. Results are
+    yielded in completion order.
+    """
+
+    def __init__(self, stages: List[Stage], on_error: Callable[[Any, str, Exception], Any]):
+        if not stages:
+            raise ValueError("StagedPipeline needs at least one stage")
+        self.stages = stages
+        self.on_error = on_error
+        self._metrics: Dict[str, _StageMetrics] = {stage.name: _StageMetrics() for stage in stages}
+
+    def metrics(self) -> Dict[str, dict]:
+        """Per-stage counters, including the depth of each stage's input queue."""
+
+        return {name: metrics.as_dict() for name, metrics in self._metrics.items()}
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """Start the stage workers and return an iterator over the results."""
+
+        cancel = threading.Event()
+        queues = [queue.Queue(maxsize=max(1, stage.queue_size)) for stage in self.stages]
+        results: "queue.Queue[Any]" = queue.Queue()
+        remaining = [max(1, stage.workers) for stage in self.stages]
+        remaining_lock = threading.Lock()
+
+        def put(index: int, item: Any) -> bool:
+            """Put into stage ``index``'s queue (or the results); False when cancelled."""
+
+            if index == len(self.stages):
+                results.put(item)
+                return True
+            target = queues[index]
+            start = time.monotonic()
+            while not cancel.is_set():
+                try:
+                    target.put(item, timeout=_POLL_SECONDS)
+                except queue.Full:
+                    continue
+                self._metrics[self.stages[index].name].sample_depth(target.qsize())
+                if index > 0:
+                    blocked = time.monotonic() - start
+                    producer = self._metrics[self.stages[index - 1].name]
+                    with producer.lock:
+                        producer.blocked_seconds += blocked
+                return True
+            return False
+
+        def feed() -> None:
+            try:
+                for item in items:
+                    if not put(0, item):
+                        return
+            finally:
+                for _ in range(remaining[0]):
+                    if not put(0, _END):
+                        return
+
+        def work(index: int) -> None:
+            stage = self.stages[index]
+            metrics = self._metrics[stage.name]
+            source = queues[index]
+            while not cancel.is_set():
+                try:
+                    item = source.get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                if item is _END:
+                    break
+                if not isinstance(item, _Finished):
+                    start = time.monotonic()
+                    try:
+                        item = stage.fn(item)
+                    except Exception as exc:  # noqa: BLE001 - surfaced through on_error
+                        item = _Finished(self.on_error(item, stage.name, exc))
+                        with metrics.lock:
+                            metrics.errors += 1
+                    with metrics.lock:
+                        metrics.processed += 1
+                        metrics.busy_seconds += time.monotonic() - start
+                if not put(index + 1, item):
+                    return
+
+            # The last worker of a stage closes the next one.
+            with remaining_lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last:
+                if index + 1 < len(self.stages):
+                    for _ in range(remaining[index + 1]):
+                        put(index + 1, _END)
+                else:
+                    results.put(_END)
+
+        threads = [threading.Thread(target=feed, name="row-pipeline-feed", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            for worker in range(remaining[index]):
+                threads.append(
+                    threading.Thread(
+                        target=work,
+                        args=(index,),
+                        name=f"row-pipeline-{stage.name}-{worker}",
+                        daemon=True,
+                    )
+                )
+        for thread in threads:
+            thread.start()
+
+        def drain() -> Iterator[Any]:
+            try:
+                while True:
+                    item = results.get()
+                    if item is _END:
+                        break
+                    yield item.value if isinstance(item, _Finished) else item
+            finally:
+                cancel.set()
+
+        return drain()
@@ -0,0 +1,195 @@
+"""Single-flight coalescing of identical in-flight async calls.
+
+Concurrent callers asking for the same key share one execution. Within a
+process this is an ``asyncio.Future`` per key and event loop. Across worker
+pods a Redis lock elects one leader; followers poll a short-lived result key
+the leader publishes, and fall back to running the call themselves if the
+leader fails or the wait times out. Followers never wait past the current row
+deadline. Redis calls run in a worker thread so a slow Redis cannot stall
+the event loop shared by every in-flight request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from backend.app import row_deadline
+from backend.app.redis_client import get_redis_connection
+
+LOGGER = logging.getLogger(__name__)
+
+# Delete the lock only if we still own it, so a slow leader never releases a
+# lock that expired and was re-acquired by another worker.
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls in-process and across workers."""
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        redis_client=None,
+        use_redis: bool = True,
+        lock_ttl_seconds: float = 30.0,
+        wait_timeout_seconds: float = 25.0,
+        poll_interval_seconds: float = 0.1,
+        result_ttl_seconds: float = 60.0,
+        redis_retry_seconds: float = 30.0,
+    ):
+        self.namespace = namespace
+        self.use_redis = use_redis
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.wait_timeout_seconds = wait_timeout_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.redis_retry_seconds = redis_retry_seconds
+        self._redis = redis_client
+        self._release = None
+        self._redis_disabled_until = 0.0
+        self._inflight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._stats_lock = threading.Lock()
+        self._counters = {"executed": 0, "coalesced_local": 0, "coalesced_remote": 0}
+
+    def _incr(self, name: str) -> None:
+        with self._stats_lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self._counters)
+
+    def _keys(self, key: str) -> Tuple[str, str]:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        base = f"singleflight:{self.namespace}:{digest}"
+        return f"{base}:lock", f"{base}:result"
+
+    def _redis_client(self):
+        if not self.use_redis or time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._redis is None:
+            self._redis = get_redis_connection()
+        return self._redis
+
+    def _redis_failed(self, exc: Exception) -> None:
+        self._redis_disabled_until = time.monotonic() + self.redis_retry_seconds
+        LOGGER.warning(
+            "Redis single-flight unavailable for '%s'; coalescing in-process only for %ss: %s",
+            self.namespace,
+            self.redis_retry_seconds,
+            exc,
+        )
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return ``await fn()``, sharing one execution among identical concurrent calls.
+
+        ``fn`` results must be JSON-serialisable to be shared across workers;
+        a ``None`` result is never shared.
+        """
+
+        loop_key = (id(asyncio.get_running_loop()), key)
+        existing = self._inflight.get(loop_key)
+        if existing is not None:
+            self._incr("coalesced_local")
+            return await asyncio.shield(existing)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[loop_key] = future
+        try:
+            result = await self._run_clustered(key, fn)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark retrieved so an exception nobody awaited is not logged.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(loop_key, None)
+
+    async def _run_clustered(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        client = self._redis_client()
+        if client is None:
+            self._incr("executed")
+            return await fn()
+
+        lock_key, result_key = self._keys(key)
+        token = uuid.uuid4().hex
+        try:
+            acquired = await asyncio.to_thread(
+                client.set, lock_key, token, nx=True, px=int(self.lock_ttl_seconds * 1000)
+            )
+        except Exception as exc:
+            self._redis_failed(exc)
+            self._incr("executed")
+            return await fn()
+
+        if acquired:
+            return await self._lead(client, lock_key, result_key, token, fn)
+
+        shared = await self._follow(client, lock_key, result_key)
+        if shared is not None:
+            self._incr("coalesced_remote")
+            return shared
+        self._incr("executed")
+        return await fn()
+
+    async def _lead(self, client, lock_key: str, result_key: str, token: str, fn) -> Any:
+        self._incr("executed")
+        try:
+            result = await fn()
+            if result is not None:
+                try:
+                    await asyncio.to_thread(
+                        client.set, result_key, json.dumps(result), ex=max(1, int(self.result_ttl_seconds))
+                    )
+                except Exception as exc:
+                    self._redis_failed(exc)
+            return result
+        finally:
+            try:
+                if self._release is None:
+                    self._release = client.register_script(_RELEASE_SCRIPT)
+                await asyncio.to_thread(self._release, keys=[lock_key], args=[token])
+            except Exception as exc:
+                LOGGER.warning("Failed to release single-flight lock %s: %s", lock_key, exc)
+
+    async def _follow(self, client, lock_key: str, result_key: str) -> Any:
+        """Wait for another worker's result; ``None`` means run the call ourselves."""
+
+        wait_seconds = self.wait_timeout_seconds
+        left = row_deadline.remaining()
+        if left is not None:
+            # Leave the row enough time to make the call itself if the leader is slow.
+            wait_seconds = min(wait_seconds, left - row_deadline.MIN_CALL_SECONDS)
+        deadline = time.monotonic() + wait_seconds
+        try:
+            while time.monotonic() < deadline:
+                raw = await asyncio.to_thread(client.get, result_key)
+                if raw is not None:
+                    return json.loads(raw)
+                if not await asyncio.to_thread(client.exists, lock_key):
+                    # Leader finished; its result may have landed just before the lock was released.
+                    raw = await asyncio.to_thread(client.get, result_key)
+                    return json.loads(raw) if raw is not None else None
+                await asyncio.sleep(self.poll_interval_seconds)
+        except Exception as exc:
+            self._redis_failed(exc)
+        return None
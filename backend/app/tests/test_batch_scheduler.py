@@ -0,0 +1,153 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app.batch_scheduler import MicroBatchQueue  # noqa: E402
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.expires_at = {}
+
+    def _expire_due(self, key):
+        if key in self.expires_at and time.monotonic() >= self.expires_at[key]:
+            self.store.pop(key, None)
+            self.expires_at.pop(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        self._expire_due(key)
+        if nx and key in self.store:
+            return None
+        self.store[key] = str(value)
+        if ex is not None:
+            self.expires_at[key] = time.monotonic() + ex
+        return True
+
+    def get(self, key):
+        self._expire_due(key)
+        return self.store.get(key)
+
+    def delete(self, key):
+        self.store.pop(key, None)
+        self.expires_at.pop(key, None)
+
+    def exists(self, key):
+        self._expire_due(key)
+        return int(key in self.store)
+
+    def expire(self, key, seconds):
+        self._expire_due(key)
+        if key not in self.store:
+            return False
+        self.expires_at[key] = time.monotonic() + seconds
+        return True
+
+    def hset(self, key, field, value):
+        self.store.setdefault(key, {})[field] = value
+
+    def hget(self, key, field):
+        return self.store.get(key, {}).get(field)
+
+    def hlen(self, key):
+        return len(self.store.get(key, {}))
+
+    def lpush(self, key, value):
+        self.store.setdefault(key, []).insert(0, value)
+
+    def rpoplpush(self, source, destination):
+        items = self.store.get(source) or []
+        if not items:
+            return None
+        value = items.pop()
+        self.store.setdefault(destination, []).insert(0, value)
+        return value
+
+    def lrange(self, key, start, end):
+        return list(self.store.get(key, []))
+
+    def lrem(self, key, count, value):
+        self.store[key] = [item for item in self.store.get(key, []) if item != value]
+
+    def llen(self, key):
+        return len(self.store.get(key, []))
+
+    def sadd(self, key, value):
+        self.store.setdefault(key, set()).add(value)
+
+    def sismember(self, key, value):
+        return value in self.store.get(key, set())
+
+    def scard(self, key):
+        return len(self.store.get(key, set()))
+
+
+def test_batches_are_claimed_in_order_and_last_completion_finalizes():
+    redis_stub = FakeRedis()
+    batches = MicroBatchQueue("job-1", redis_client=redis_stub)
+    for batch_id in (1, 2):
+        batches.push(batch_id, {"storage_path": f"raw/chunk_{batch_id}.csv"})
+    assert batches.seal(2) is False
+
+    other_worker = MicroBatchQueue("job-1", redis_client=redis_stub)
+    assert batches.claim() == (1, {"storage_path": "raw/chunk_1.csv"})
+    assert other_worker.claim() == (2, {"storage_path": "raw/chunk_2.csv"})
+    assert batches.claim() is None
+
+    assert other_worker.complete(2) is False
+    assert batches.unfinished() == 1
+    assert batches.complete(1) is True
+    assert batches.unfinished() == 0
+    assert batches.stats() == {"total": 2, "pending": 0, "processing": 0, "done": 2}
+
+
+def test_sealing_after_every_batch_finished_finalizes_once():
+    redis_stub = FakeRedis()
+    batches = MicroBatchQueue("job-1", redis_client=redis_stub)
+    batches.push(1, {})
+    batches.claim()
+    assert batches.complete(1) is False
+
+    assert batches.seal(1) is True
+    assert MicroBatchQueue("job-1", redis_client=redis_stub).seal(1) is False
+
+
+def test_batch_with_expired_lease_is_reclaimed():
+    redis_stub = FakeRedis()
+    crashed = MicroBatchQueue("job-1", redis_client=redis_stub)
+    crashed.push(1, {"storage_path": "raw/chunk_1.csv"})
+    assert crashed.claim()[0] == 1
+
+    survivor = MicroBatchQueue("job-1", redis_client=redis_stub)
+    assert survivor.claim() is None
+
+    redis_stub.delete("microbatch:job-1:lease:1")
+    assert survivor.claim() == (1, {"storage_path": "raw/chunk_1.csv"})
+    assert survivor.claim() is None
+
+
+def test_abort_is_visible_to_every_drainer():
+    redis_stub = FakeRedis()
+    MicroBatchQueue("job-1", redis_client=redis_stub).abort("batch 3 failed")
+
+    assert MicroBatchQueue("job-1", redis_client=redis_stub).aborted() is True
+    assert MicroBatchQueue("job-2", redis_client=redis_stub).aborted() is False
+
+
+def test_running_batch_keeps_its_lease_past_the_lease_time():
+    redis_stub = FakeRedis()
+    worker = MicroBatchQueue("job-1", redis_client=redis_stub, lease_seconds=0.3)
+    worker.push(1, {"storage_path": "raw/chunk_1.csv"})
+    assert worker.claim()[0] == 1
+    other_worker = MicroBatchQueue("job-1", redis_client=redis_stub, lease_seconds=0.3)
+
+    with worker.keep_leased(1):
+        time.sleep(0.8)
+        assert other_worker.claim() is None
+
+    # Without the heartbeat the lease lapses and the batch is handed over.
+    time.sleep(0.4)
+    assert other_worker.claim()[0] == 1
+    assert worker.renew(1) is False
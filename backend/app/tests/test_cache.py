@@ -0,0 +1,87 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app.cache import LRUCache, TwoTierCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.expiries = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return False
+        self.store[key] = value
+        self.expiries[key] = ex
+        return True
+
+
+class BrokenRedis:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        raise ConnectionError("redis down")
+
+    def set(self, *args, **kwargs):
+        self.calls += 1
+        raise ConnectionError("redis down")
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_lru_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = LRUCache(max_entries=4, ttl_seconds=10)
+    cache.set("a", 1)
+    now[0] += 11
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_two_tier_cache_shares_entries_through_redis():
+    shared = FakeRedis()
+    writer = TwoTierCache("test", redis_client=shared, ttl_seconds=120)
+    reader = TwoTierCache("test", redis_client=shared, ttl_seconds=120)
+
+    writer.set("example.com", {"organic": [1]})
+
+    assert reader.get("example.com") == {"organic": [1]}
+    assert reader.get("example.com") == {"organic": [1]}
+    assert reader.stats()["redis_hits"] == 1
+    assert reader.stats()["local_hits"] == 1
+    assert shared.expiries[writer.redis_key("example.com")] == 120
+
+
+def test_two_tier_cache_skips_redis_after_failure():
+    broken = BrokenRedis()
+    cache = TwoTierCache("test", redis_client=broken, redis_retry_seconds=60)
+
+    assert cache.get("missing") is None
+    assert cache.get("missing") is None
+    cache.set("key", "value")
+
+    assert broken.calls == 1
+    assert cache.get("key") == "value"
+    assert cache.stats()["redis_errors"] == 1
@@ -0,0 +1,117 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("SUPABASE_URL", "https://project.supabase.co")
+os.environ.setdefault(
+    "SUPABASE_SERVICE_ROLE_KEY",
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.test",
+)
+
+from backend.app import circuit_breaker, jobs, llm_client, llm_router  # noqa: E402
+from backend.app.circuit_breaker import CircuitBreaker, ProviderUnavailable  # noqa: E402
+from backend.app.job_stats import JobStats  # noqa: E402
+
+
+class DummyResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_once():
+    breaker = CircuitBreaker("groq", failure_threshold=2, reset_seconds=0.05)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == circuit_breaker.OPEN
+    assert not breaker.allow()
+    with pytest.raises(ProviderUnavailable):
+        breaker.check()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == circuit_breaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == circuit_breaker.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == circuit_breaker.CLOSED
+    assert breaker.stats()["opened"] == 2
+
+
+@pytest.fixture
+def isolated(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_BREAKERS", {})
+    monkeypatch.setattr(llm_router, "_ROUTER", llm_router.LLMRouter())
+    monkeypatch.setattr(llm_client.rate_limiter, "acquire", lambda *args, **kwargs: 0.0)
+
+
+def test_open_circuit_fails_fast_without_calling_provider(monkeypatch, isolated):
+    calls = []
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        calls.append(url)
+        return DummyResponse(503)
+
+    monkeypatch.setattr(llm_client.requests, "post", fake_post)
+    for _ in range(circuit_breaker.CIRCUIT_FAILURE_THRESHOLD):
+        llm_client.post_chat_completion("http://groq.test", headers={}, payload={}, model="m")
+
+    with pytest.raises(ProviderUnavailable):
+        llm_client.post_chat_completion("http://groq.test", headers={}, payload={}, model="m")
+    assert len(calls) == circuit_breaker.CIRCUIT_FAILURE_THRESHOLD
+
+
+def test_row_pauses_until_probe_succeeds(monkeypatch, isolated):
+    breaker = CircuitBreaker("groq", failure_threshold=1, reset_seconds=0.2)
+    monkeypatch.setitem(circuit_breaker._BREAKERS, "groq", breaker)
+    breaker.record_failure()
+    calls = []
+
+    def generate(research, service, plan):
+        breaker.check()
+        calls.append(research)
+        breaker.record_success()
+        return "Body"
+
+    monkeypatch.setattr(jobs, "generate_full_email_body", generate)
+    stats = JobStats()
+    ctx = jobs._RowContext(["email"], "email", {}, "job", 1, {}, stats, None)
+    state = jobs._RowState(0, {"email": "a@example.com"}, "a@example.com", research_components="{}")
+
+    started = time.monotonic()
+    state = jobs._generation_stage(ctx, state)
+
+    assert state.email_body == "Body"
+    assert not state.generation_failed
+    assert time.monotonic() - started >= 0.15
+    assert calls == ["{}"]
+    assert stats.get("circuit_pauses") == 1
+
+
+def test_row_gives_up_after_max_pause(monkeypatch, isolated):
+    monkeypatch.setattr(jobs, "CIRCUIT_MAX_PAUSE_SECONDS", 0.05)
+
+    def generate(research, service, plan):
+        raise ProviderUnavailable("groq", 10.0)
+
+    monkeypatch.setattr(jobs, "generate_full_email_body", generate)
+    ctx = jobs._RowContext(["email"], "email", {}, "job", 1, {}, JobStats(), None)
+    state = jobs._generation_stage(ctx, jobs._RowState(0, {}, "a@example.com", research_components="{}"))
+
+    assert state.generation_failed
+    assert "unavailable" in state.email_body
@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("SUPABASE_URL", "https://project.supabase.co")
+os.environ.setdefault(
+    "SUPABASE_SERVICE_ROLE_KEY",
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.test",
+)
+
+from backend.app import email_body_cache, jobs  # noqa: E402
+from backend.app.cache import TwoTierCache  # noqa: E402
+from backend.app.gpt_helpers import compile_prompt_plan  # noqa: E402
+from backend.app.job_stats import JobStats  # noqa: E402
+
+RESEARCH = json.dumps({"prospect_info": {"company": "Acme", "name": ""}})
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch):
+    monkeypatch.setattr(email_body_cache, "_CACHE", TwoTierCache("email-body-test", use_redis=False))
+
+
+def test_key_ignores_research_key_order_but_not_offer():
+    plan = compile_prompt_plan(json.dumps({"core_offer": "Audits"}))
+    reordered = json.dumps({"b": 1, "a": 2})
+
+    assert email_body_cache.email_body_key(reordered, plan, "hybrid") == email_body_cache.email_body_key(
+        json.dumps({"a": 2, "b": 1}), plan, "hybrid"
+    )
+    other_plan = compile_prompt_plan(json.dumps({"core_offer": "Payroll"}))
+    assert email_body_cache.email_body_key(RESEARCH, plan, "hybrid") != email_body_cache.email_body_key(
+        RESEARCH, other_plan, "hybrid"
+    )
+    assert email_body_cache.email_body_key("Research unavailable: nothing", plan, "hybrid") is None
+
+
+@pytest.mark.parametrize("meta, expected_calls", [({}, 1), ({"email_body_cache": False}, 3)])
+def test_identical_research_reuses_cached_body(monkeypatch, meta, expected_calls):
+    calls = []
+
+    def fake_generate(research, service, plan):
+        calls.append(research)
+        return "Generated body."
+
+    monkeypatch.setattr(jobs, "generate_full_email_body", fake_generate)
+    monkeypatch.setattr(jobs, "clean_email_body_for_mode", lambda body, mode, name: (body + " Clean.", False))
+    rows = [{"email": f"user{i}@acme.io"} for i in range(3)]
+    ctx = jobs._RowContext(
+        [],
+        "email",
+        meta,
+        "job-1",
+        1,
+        {},
+        JobStats(),
+        compile_prompt_plan("{}"),
+    )
+
+    results = []
+    for row in rows:
+        state = jobs._RowState(0, row, row["email"], research_components=RESEARCH)
+        results.append(jobs._cleaning_stage(ctx, jobs._generation_stage(ctx, state)))
+
+    assert len(calls) == expected_calls
+    assert all(result[1]["email_body"] == "Generated body. Clean." for result in results)
+    if expected_calls == 1:
+        assert ctx.stats.get("email_body_cache_hits") == 2
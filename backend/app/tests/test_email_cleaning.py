@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("SUPABASE_URL", "https://project.supabase.co")
+os.environ.setdefault(
+    "SUPABASE_SERVICE_ROLE_KEY",
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.test",
+)
+
+from backend.app import email_cleaning  # noqa: E402
+
+
+RAW_EMAIL = (
+    "Hi Chris, I saw ExampleCo  just launched an AI-powered onboarding flow — impressive work.\n\n"
+    "We help teams like yours cut ramp time, Chris.   Our approach is simple -- no jargon.\n\n"
+    "Would a quick call next week make sense?"
+)
+
+
+def test_quick_clean_removes_name_dashes_and_keeps_paragraphs():
+    cleaned = email_cleaning.quick_clean_email_body(RAW_EMAIL, "Chris")
+
+    assert cleaned == (
+        "I saw ExampleCo just launched an AI-powered onboarding flow, impressive work.\n\n"
+        "We help teams like yours cut ramp time. Our approach is simple, no jargon.\n\n"
+        "Would a quick call next week make sense?"
+    )
+    assert email_cleaning.email_quality_issues(cleaned, "Chris") == []
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("We help e-commerce teams with follow-up emails.", "We help e-commerce teams with follow-up emails."),
+        ("Jean-Luc is a co-founder at Coca-Cola.", "Jean-Luc is a co-founder at Coca-Cola."),
+        ("You grew revenue 2020\u20132023 by 10\u201320%.", "You grew revenue 2020 to 2023 by 10 to 20%."),
+        ("Great launch\u2014congrats. Quick idea \u2013 worth a chat.", "Great launch, congrats. Quick idea, worth a chat."),
+        ("Simple--no jargon.", "Simple, no jargon."),
+    ],
+)
+def test_quick_clean_only_rewrites_dash_punctuation(raw, expected):
+    cleaned = email_cleaning.quick_clean_email_body(raw)
+
+    assert cleaned == expected
+    assert email_cleaning.email_quality_issues(cleaned) == []
+
+
+def test_quality_check_flags_leftover_issues():
+    assert email_cleaning.email_quality_issues("", None) == ["empty"]
+    assert "recipient_name" in email_cleaning.email_quality_issues("Thanks for your time Chris.", "Chris")
+    long_sentence = " ".join(["word"] * 60) + "."
+    assert email_cleaning.email_quality_issues(long_sentence) == ["long_sentence"]
+
+
+def test_recipient_name_from_research_supports_both_schemas():
+    assert email_cleaning.recipient_name_from_research(
+        json.dumps({"prospect_info": {"name": "Chris Smith"}})
+    ) == "Chris"
+    assert email_cleaning.recipient_name_from_research(json.dumps({"person": {"name": "Alex"}})) == "Alex"
+    assert email_cleaning.recipient_name_from_research("Research unavailable: nothing") is None
+
+
+def test_hybrid_mode_escalates_only_when_quality_check_fails(monkeypatch):
+    calls = []
+
+    def fake_llm_clean(body):
+        calls.append(body)
+        return "LLM cleaned."
+
+    monkeypatch.setattr(email_cleaning, "clean_email_body", fake_llm_clean)
+
+    assert email_cleaning.clean_email_body_for_mode(RAW_EMAIL, "hybrid", "Chris") == (
+        email_cleaning.quick_clean_email_body(RAW_EMAIL, "Chris"),
+        False,
+    )
+    assert calls == []
+
+    long_body = "Word " + " ".join(["word"] * 60) + "."
+    assert email_cleaning.clean_email_body_for_mode(long_body, "hybrid") == ("LLM cleaned.", True)
+    assert email_cleaning.clean_email_body_for_mode(long_body, "rules") == (long_body, False)
+    assert email_cleaning.clean_email_body_for_mode(RAW_EMAIL, "llm") == ("LLM cleaned.", True)
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("meta, expected", [({"cleaning_mode": "rules"}, "rules"), ({"cleaning_mode": "bogus"}, "hybrid")])
+def test_cleaning_mode_is_resolved_per_job(meta, expected):
+    from backend.app import jobs
+
+    assert jobs._cleaning_mode(meta) == expected
@@ -0,0 +1,122 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app.batch_scheduler import MicroBatchQueue  # noqa: E402
+from backend.app.fair_share import FairShareScheduler, plan_quantum  # noqa: E402
+from backend.app.tests.test_batch_scheduler import FakeRedis as BatchFakeRedis  # noqa: E402
+
+
+class FakeRedis(BatchFakeRedis):
+    def rpush(self, key, value):
+        self.store.setdefault(key, []).append(value)
+
+    def lindex(self, key, index):
+        items = self.store.get(key) or []
+        try:
+            return items[index]
+        except IndexError:
+            return None
+
+    def sadd(self, key, value):
+        members = self.store.setdefault(key, set())
+        if value in members:
+            return 0
+        members.add(value)
+        return 1
+
+    def srem(self, key, value):
+        self.store.get(key, set()).discard(value)
+
+    def hincrbyfloat(self, key, field, amount):
+        values = self.store.setdefault(key, {})
+        values[field] = float(values.get(field) or 0.0) + amount
+        return values[field]
+
+    def hdel(self, key, field):
+        self.store.get(key, {}).pop(field, None)
+
+
+def _submit(redis_stub, scheduler, job_id, user_id, batches, plan="free"):
+    queue = MicroBatchQueue(job_id, redis_client=redis_stub)
+    scheduler.register(job_id, user_id, plan_quantum(plan), {"total_rows": batches * 25})
+    for batch_id in range(1, batches + 1):
+        queue.push(batch_id, {"storage_path": f"{job_id}/chunk_{batch_id}.csv"})
+    queue.seal(batches)
+    return queue
+
+
+def _drain(redis_stub, scheduler, count):
+    served = []
+    for _ in range(count):
+        claim = scheduler.next_batch()
+        if claim is None:
+            break
+        served.append(claim.user_id)
+        MicroBatchQueue(claim.job_id, redis_client=redis_stub).complete(claim.batch_id)
+    return served
+
+
+def test_small_job_is_interleaved_with_an_earlier_large_job():
+    redis_stub = FakeRedis()
+    scheduler = FairShareScheduler(redis_client=redis_stub)
+    _submit(redis_stub, scheduler, "big", "alice", 6)
+    _submit(redis_stub, scheduler, "small", "bob", 2)
+
+    served = _drain(redis_stub, scheduler, 10)
+
+    assert sorted(served[:4]) == ["alice", "alice", "bob", "bob"]
+    assert served[4:] == ["alice"] * 4
+    assert scheduler.next_batch() is None
+    assert scheduler.users() == []
+
+
+def test_paid_plans_get_more_batches_per_round():
+    redis_stub = FakeRedis()
+    scheduler = FairShareScheduler(redis_client=redis_stub)
+    _submit(redis_stub, scheduler, "free-job", "free-user", 10)
+    _submit(redis_stub, scheduler, "pro-job", "pro-user", 10, plan="pro_annual")
+
+    served = _drain(redis_stub, scheduler, 10)
+
+    assert served.count("pro-user") == 8
+    assert served.count("free-user") == 2
+
+
+def test_in_flight_cap_yields_to_others_but_uses_idle_capacity():
+    redis_stub = FakeRedis()
+    scheduler = FairShareScheduler(redis_client=redis_stub, max_inflight_per_user=1)
+    _submit(redis_stub, scheduler, "big", "alice", 3)
+    _submit(redis_stub, scheduler, "small", "bob", 1)
+
+    first = scheduler.next_batch()
+    second = scheduler.next_batch()
+    assert {first.user_id, second.user_id} == {"alice", "bob"}
+
+    # Bob has nothing left, so Alice goes past her cap rather than idling workers.
+    third = scheduler.next_batch()
+    assert third.user_id == "alice"
+    assert scheduler.in_flight("alice") == 2
+
+
+def test_claim_carries_the_job_context():
+    redis_stub = FakeRedis()
+    scheduler = FairShareScheduler(redis_client=redis_stub)
+    _submit(redis_stub, scheduler, "job-1", "alice", 1)
+
+    claim = scheduler.next_batch()
+
+    assert claim.job_id == "job-1"
+    assert claim.batch_id == 1
+    assert claim.payload == {"storage_path": "job-1/chunk_1.csv"}
+    assert claim.context == {"total_rows": 25, "user_id": "alice"}
+
+
+def test_aborted_jobs_are_retired():
+    redis_stub = FakeRedis()
+    scheduler = FairShareScheduler(redis_client=redis_stub)
+    _submit(redis_stub, scheduler, "job-1", "alice", 2).abort("batch 1 failed")
+
+    assert scheduler.next_batch() is None
+    assert scheduler.users() == []
@@ -1,6 +1,7 @@
 import csv
 import json
 import sys
+import threading
 from pathlib import Path
 from types import SimpleNamespace
 
@@ -238,3 +239,132 @@ def test_process_subjob_header_order(monkeypatch, tmp_path, sif_research_payload
 
     assert headers[-2:] == ["sif_research", "sif_personalized"]
     assert row[-2:] == [sif_research_payload, "SIF hook."]
+
+
+def test_generate_full_email_body_uses_compiled_prompt_plan(monkeypatch, sif_research_payload):
+    monkeypatch.setenv("GROQ_API_KEY", "test-groq")
+    prompts = []
+
+    def fake_post(url, *_, **kwargs):
+        prompts.append(kwargs["json"]["messages"][-1]["content"])
+        return DummyResponse({"choices": [{"message": {"content": "Body."}}]})
+
+    monkeypatch.setattr(gpt_helpers.requests, "post", fake_post)
+    service = json.dumps({"core_offer": "Onboarding", "include_fallback": True})
+    plan = gpt_helpers.compile_prompt_plan(service)
+    monkeypatch.setattr(
+        gpt_helpers,
+        "compile_prompt_plan",
+        lambda *_: pytest.fail("prompt plan should not be recompiled per row"),
+    )
+
+    assert gpt_helpers.generate_full_email_body(sif_research_payload, service, plan) == "Body."
+    other_research = json.dumps({"person": {"name": "Sam"}})
+    assert gpt_helpers.generate_full_email_body(other_research, service, plan) == "Body."
+
+    # Both rows share the static instructions as a common prefix; only research differs.
+    assert all(prompt.startswith(plan.static_prefix) for prompt in prompts)
+    assert "whoever oversees Onboarding" in plan.static_prefix
+    assert prompts[1].endswith(json.dumps(json.loads(other_research), indent=2))
+
+
+def test_generate_email_bodies_batch_falls_back_per_entry(monkeypatch, sif_research_payload):
+    monkeypatch.setenv("GROQ_API_KEY", "test-groq")
+    long_body = " ".join(["word"] * 40)
+    prompts = []
+
+    def fake_post(url, *_, **kwargs):
+        prompt = kwargs["json"]["messages"][-1]["content"]
+        prompts.append((prompt, kwargs["json"].get("response_format")))
+        if "PROSPECT a" in prompt:
+            content = json.dumps(
+                {"emails": [{"id": "a", "email_body": long_body}, {"id": "b", "email_body": "Too short."}]}
+            )
+        else:
+            content = "Single body."
+        return DummyResponse({"choices": [{"message": {"content": content}}]})
+
+    monkeypatch.setattr(gpt_helpers.requests, "post", fake_post)
+
+    bodies = gpt_helpers.generate_email_bodies_batch(
+        [("a", sif_research_payload), ("b", sif_research_payload), ("c", "Research unavailable: none")],
+        json.dumps({"core_offer": "Widgets"}),
+    )
+
+    assert bodies == {
+        "a": long_body,
+        "b": "Single body.",
+        "c": "Email body unavailable: research unavailable.",
+    }
+    assert len(prompts) == 2
+    assert "PROSPECT b" in prompts[0][0]
+    assert prompts[0][1] == {"type": "json_object"}
+    assert prompts[1][1] is None
+
+
+def test_failed_generation_batch_falls_back_on_each_row_thread(monkeypatch, sif_research_payload):
+    monkeypatch.setenv("GROQ_API_KEY", "test-groq")
+    single_calls = []
+
+    def fake_post(url, *_, **kwargs):
+        prompt = kwargs["json"]["messages"][-1]["content"]
+        if "PROSPECT 0" in prompt:
+            return DummyResponse({"choices": [{"message": {"content": "not json"}}]})
+        single_calls.append((threading.current_thread().name, jobs.row_deadline.remaining()))
+        return DummyResponse({"choices": [{"message": {"content": "Single body."}}]})
+
+    monkeypatch.setattr(gpt_helpers.requests, "post", fake_post)
+    meta = {"service": json.dumps({"core_offer": "Widgets"}), "generation_batch_size": 2, "row_deadline_seconds": 60}
+    plan = gpt_helpers.compile_prompt_plan(meta["service"])
+    stats = jobs.JobStats()
+    batcher = jobs._new_generation_batcher(meta, plan, stats)
+    ctx = jobs._RowContext(["email"], "email", meta, "job", 1, {}, stats, plan, generation_batcher=batcher)
+    bodies = {}
+
+    def row_worker(index):
+        state = jobs._RowState(index, {}, f"row{index}@example.com", research_components=sif_research_payload)
+        bodies[index] = jobs._generation_stage(ctx, state).email_body
+
+    threads = [threading.Thread(target=row_worker, args=(index,), name=f"row-{index}") for index in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert bodies == {0: "Single body.", 1: "Single body."}
+    assert sorted(name for name, _ in single_calls) == ["row-0", "row-1"]
+    assert all(remaining is not None and remaining > 50 for _, remaining in single_calls)
+    assert stats.get("generation_batch_fallbacks") == 2
+
+
+@pytest.mark.parametrize("fallback", [True, False])
+def test_generate_email_bodies_batch_honours_fallback_flag(monkeypatch, sif_research_payload, fallback):
+    monkeypatch.setenv("GROQ_API_KEY", "test-groq")
+    single_prompts = []
+
+    def fake_post(url, *_, **kwargs):
+        prompt = kwargs["json"]["messages"][-1]["content"]
+        if "PROSPECT a" in prompt:
+            return DummyResponse({"choices": [{"message": {"content": "not json"}}]})
+        single_prompts.append(prompt)
+        return DummyResponse({"choices": [{"message": {"content": "Single body."}}]})
+
+    monkeypatch.setattr(gpt_helpers.requests, "post", fake_post)
+
+    # The last item has valid research, so the flag alone decides the fallback.
+    bodies = gpt_helpers.generate_email_bodies_batch(
+        [("c", "Research unavailable: none"), ("a", sif_research_payload), ("b", sif_research_payload)],
+        json.dumps({"core_offer": "Widgets"}),
+        fallback=fallback,
+    )
+
+    if fallback:
+        assert bodies == {
+            "a": "Single body.",
+            "b": "Single body.",
+            "c": "Email body unavailable: research unavailable.",
+        }
+        assert len(single_prompts) == 2
+    else:
+        assert bodies == {"c": "Email body unavailable: research unavailable."}
+        assert single_prompts == []
@@ -212,7 +212,7 @@ class DummyHTTPResponse:
         return None
 
 
-def fake_persist_chunk_rows(job_id, chunk_id, headers, rows, user_id):
+def fake_upload_chunk_file(job_id, chunk_id, local_path, user_id):
     return f"{job_id}/chunk_{chunk_id}.csv"
 
 
@@ -228,7 +228,7 @@ def test_process_job_only_one_worker_claims(monkeypatch):
     monkeypatch.setattr(jobs, "supabase", fake_supabase)
     monkeypatch.setattr(jobs, "queue", fake_queue)
     monkeypatch.setattr(jobs, "redis_conn", fake_redis)
-    monkeypatch.setattr(jobs, "_persist_chunk_rows", fake_persist_chunk_rows)
+    monkeypatch.setattr(jobs, "_upload_chunk_file", fake_upload_chunk_file)
     monkeypatch.setattr(jobs, "_input_iterator", fake_input_iterator)
     monkeypatch.setattr(jobs, "_get_job_timeout", lambda: 30)
     monkeypatch.setattr(jobs, "requests", SimpleNamespace(get=lambda url, timeout=0: DummyHTTPResponse()))
@@ -250,3 +250,51 @@ def test_process_job_only_one_worker_claims(monkeypatch):
     assert fake_supabase.profiles[fake_supabase.user_id]["credits_remaining"] == 9
     assert fake_supabase.jobs[fake_supabase.job_id]["status"] == "in_progress"
     assert fake_supabase.jobs[fake_supabase.job_id]["meta_json"].get("credits_deducted") is True
+
+
+def test_streaming_chunker_seals_chunks_as_rows_arrive(monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, "RAW_CHUNK_BASE_DIR", str(tmp_path))
+    sealed = []
+
+    def on_sealed(chunk_id, local_path):
+        with open(local_path, encoding="utf-8") as handle:
+            sealed.append((chunk_id, handle.read().splitlines()))
+
+    chunker = jobs._StreamingChunker("job-1", ["a", "b"], 2, on_sealed)
+    chunker.add({"a": "1", "b": "x"})
+    assert sealed == []
+    chunker.add({"a": "2", "b": None})
+    assert sealed == [(1, ["a,b", "1,x", "2,"])]
+
+    chunker.add({"a": "3", "extra": "ignored"})
+    assert chunker.close() == 2
+    assert sealed[1] == (2, ["a,b", "3,"])
+
+
+def test_drainer_processes_batches_and_enqueues_finalize_once(monkeypatch):
+    from backend.app.tests.test_batch_scheduler import FakeRedis
+
+    redis_stub = FakeRedis()
+    queue_cls = jobs.MicroBatchQueue
+    seed = queue_cls("job-1", redis_client=redis_stub)
+    for batch_id in (1, 2, 3):
+        seed.push(batch_id, {"storage_path": f"raw/chunk_{batch_id}.csv"})
+    seed.seal(3)
+
+    processed = []
+    enqueued = []
+    monkeypatch.setattr(jobs, "MicroBatchQueue", lambda job_id: queue_cls(job_id, redis_client=redis_stub))
+    monkeypatch.setattr(
+        jobs, "process_subjob", lambda job_id, batch_id, storage_path, *args, **kwargs: processed.append(storage_path)
+    )
+    monkeypatch.setattr(
+        jobs, "queue", SimpleNamespace(enqueue=lambda fn, *args, **kwargs: enqueued.append((fn, args)))
+    )
+    monkeypatch.setattr(jobs, "_get_job_timeout", lambda: 30)
+
+    assert jobs.drain_micro_batches("job-1", "user-1", {}, 75) == 3
+    assert processed == ["raw/chunk_1.csv", "raw/chunk_2.csv", "raw/chunk_3.csv"]
+    assert enqueued == [(jobs.finalize_job, ("job-1", "user-1", 3, None))]
+
+    assert jobs.drain_micro_batches("job-1", "user-1", {}, 75) == 0
+    assert len(enqueued) == 1
@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app.job_stats import (  # noqa: E402
+    JobTotals,
+    flatten_stage_metrics,
+    summarize_counts,
+    unflatten_stage_metrics,
+)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    def hincrbyfloat(self, key, field, amount):
+        values = self.hashes.setdefault(key, {})
+        values[field] = str(float(values.get(field, 0.0)) + amount)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def expire(self, key, seconds):
+        return True
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+
+def test_batches_add_into_one_running_total():
+    redis_stub = FakeRedis()
+    for _ in range(3):
+        JobTotals("job-1", redis_client=redis_stub).add(
+            "rows", {"prospect_store_hits": 1, "prospect_store_lookups": 2, "ignored": "text"}
+        )
+
+    totals = JobTotals("job-1", redis_client=redis_stub)
+    assert summarize_counts(totals.load("rows")) == {
+        "prospect_store_hits": 3,
+        "prospect_store_lookups": 6,
+        "prospect_store_hit_rate": 0.5,
+    }
+    assert JobTotals("job-2", redis_client=redis_stub).load("rows") == {}
+
+    totals.clear("rows")
+    assert totals.load("rows") == {}
+
+
+def test_stage_metrics_keep_only_additive_fields():
+    stage_metrics = {"research": {"processed": 25, "busy_seconds": 1.5, "max_queue_depth": 4}}
+    redis_stub = FakeRedis()
+    totals = JobTotals("job-1", redis_client=redis_stub)
+    totals.add("stages", flatten_stage_metrics(stage_metrics))
+    totals.add("stages", flatten_stage_metrics(stage_metrics))
+
+    assert unflatten_stage_metrics(totals.load("stages")) == {"research": {"processed": 50, "busy_seconds": 3}}
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app.json_repair import repair_json  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ('{"a": 1}', {"a": 1}),
+        ('```json\n{"a": [1, 2,],}\n```', {"a": [1, 2]}),
+        ('Sure, here you go: {"a": None, "b": True} Let me know!', {"a": None, "b": True}),
+        ('[{"a": "x, y"}]', [{"a": "x, y"}]),
+        ('{"a": "truncated', {"a": "truncated"}),
+        ('{"a": ["b", "c"', {"a": ["b", "c"]}),
+        ("{“a”: “b”}", {"a": "b"}),
+    ],
+)
+def test_repair_json_fixes_common_llm_mistakes(content, expected):
+    assert repair_json(content) == expected
+
+
+def test_repair_json_keeps_literals_inside_strings():
+    assert repair_json('{"note": "None, True,]",}') == {"note": "None, True,]"}
+
+
+def test_repair_json_gives_up_on_prose():
+    assert repair_json("I could not find anything about this prospect.") is None
+    assert repair_json("") is None
@@ -0,0 +1,145 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app import circuit_breaker, llm_client, llm_router  # noqa: E402
+
+
+class DummyResponse:
+    def __init__(self, label, status_code=200):
+        self.label = label
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def hedger(monkeypatch):
+    controller = llm_client.HedgeController(budget_ratio=1.0, min_samples=3, min_delay_seconds=0.05)
+    monkeypatch.setattr(llm_client, "_HEDGER", controller)
+    monkeypatch.setattr(llm_client, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(llm_router, "_ROUTER", llm_router.LLMRouter())
+    monkeypatch.setattr(circuit_breaker, "_BREAKERS", {})
+    monkeypatch.setattr(llm_client.rate_limiter, "acquire", lambda *args, **kwargs: 0.0)
+    for _ in range(3):
+        controller.tracker("groq:model").record(0.01)
+    return controller
+
+
+def _call(hedge=True):
+    return llm_client.post_chat_completion(
+        "http://llm.test/chat", headers={}, payload={}, model="model", hedge=hedge
+    )
+
+
+def test_slow_primary_is_hedged_and_backup_wins(monkeypatch, hedger):
+    calls = []
+    release = threading.Event()
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        calls.append(url)
+        if len(calls) == 1:
+            release.wait(2)
+            return DummyResponse("primary")
+        return DummyResponse("backup")
+
+    monkeypatch.setattr(llm_client.requests, "post", fake_post)
+
+    response = _call()
+    release.set()
+
+    assert response.label == "backup"
+    assert len(calls) == 2
+    stats = hedger.stats()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+    assert stats["hedge_rate"] == 1.0
+
+
+def test_hedge_budget_caps_duplicate_requests(monkeypatch, hedger):
+    hedger.budget_ratio = 0.0
+    calls = []
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        calls.append(url)
+        time.sleep(0.1)
+        return DummyResponse("primary")
+
+    monkeypatch.setattr(llm_client.requests, "post", fake_post)
+
+    assert _call().label == "primary"
+    assert len(calls) == 1
+    assert hedger.stats()["budget_denied"] == 1
+
+
+def test_unhedged_calls_go_straight_through(monkeypatch, hedger):
+    monkeypatch.setattr(
+        llm_client.requests, "post", lambda url, headers=None, json=None, timeout=None: DummyResponse("direct")
+    )
+
+    assert _call(hedge=False).label == "direct"
+    assert hedger.stats()["calls"] == 0
+
+
+def test_server_error_waits_for_the_other_request(monkeypatch, hedger):
+    calls = []
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        calls.append(url)
+        if len(calls) == 1:
+            time.sleep(0.3)
+            return DummyResponse("primary")
+        return DummyResponse("backup", status_code=503)
+
+    monkeypatch.setattr(llm_client.requests, "post", fake_post)
+
+    assert _call().label == "primary"
+    assert hedger.stats()["hedge_wins"] == 0
+
+
+def test_limiter_wait_is_not_counted_as_request_latency(monkeypatch, hedger):
+    hedger.min_samples = 100
+    monkeypatch.setattr(llm_client.rate_limiter, "acquire", lambda *args, **kwargs: time.sleep(0.2) or 0.2)
+    monkeypatch.setattr(
+        llm_client.requests, "post", lambda url, headers=None, json=None, timeout=None: DummyResponse("direct")
+    )
+
+    assert _call().label == "direct"
+    assert hedger.tracker("groq:model").percentile(1.0) < 0.1
+
+
+def test_hedge_backup_limiter_wait_is_bounded_by_the_row_deadline(monkeypatch, hedger):
+    release = threading.Event()
+    backup_deadlines = []
+
+    def acquire(*args, **kwargs):
+        # Only the backup acquires on an executor thread; it must see the row deadline.
+        if threading.current_thread() is not threading.main_thread():
+            backup_deadlines.append(llm_client.row_deadline.current())
+            raise llm_client.row_deadline.DeadlineExceeded("limiter wait past the row deadline")
+        return 0.0
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        # A primary that overruns its timeout must not hold the row past its deadline.
+        release.wait(5)
+        return DummyResponse("primary")
+
+    monkeypatch.setattr(llm_client.rate_limiter, "acquire", acquire)
+    monkeypatch.setattr(llm_client.requests, "post", fake_post)
+
+    deadline = time.monotonic() + 2.4
+    started = time.monotonic()
+    with llm_client.row_deadline.scope(deadline):
+        with pytest.raises(llm_client.row_deadline.DeadlineExceeded):
+            _call()
+    release.set()
+
+    assert backup_deadlines == [deadline]
+    assert time.monotonic() - started < 3.0
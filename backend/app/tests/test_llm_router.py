@@ -0,0 +1,157 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app import circuit_breaker, llm_client, llm_router  # noqa: E402
+from backend.app.llm_router import LLMProvider, LLMRouter, load_routes  # noqa: E402
+
+PRIMARY = LLMProvider("primary", "http://primary.test/v1/chat/completions", "model-a", "PRIMARY_KEY")
+BACKUP = LLMProvider("backup", "http://backup.test/v1/chat/completions", "model-b", "BACKUP_KEY")
+
+
+class DummyResponse:
+    def __init__(self, status_code=200, model=None):
+        self.status_code = status_code
+        self.model = model
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setenv("PRIMARY_KEY", "primary-secret")
+    monkeypatch.setenv("BACKUP_KEY", "backup-secret")
+    monkeypatch.setattr(llm_client.rate_limiter, "acquire", lambda *args, **kwargs: 0.0)
+    instance = LLMRouter({"generation": [PRIMARY, BACKUP]}, min_samples=2)
+    monkeypatch.setattr(llm_router, "_ROUTER", instance)
+    monkeypatch.setattr(circuit_breaker, "_BREAKERS", {})
+    return instance
+
+
+def _install_servers(monkeypatch, handlers):
+    calls = []
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        calls.append((url, headers["Authorization"], json["model"]))
+        return handlers[url](json)
+
+    monkeypatch.setattr(llm_client.requests, "post", fake_post)
+    return calls
+
+
+def _generate(stage="generation"):
+    return llm_client.post_chat_completion(
+        "http://groq.test/chat",
+        headers={"Authorization": "Bearer groq"},
+        payload={"model": "groq-model", "messages": []},
+        model="groq-model",
+        stage=stage,
+    )
+
+
+def test_routes_use_provider_endpoint_model_and_key(monkeypatch, router):
+    calls = _install_servers(monkeypatch, {PRIMARY.endpoint: lambda body: DummyResponse(model=body["model"])})
+
+    assert _generate().model == "model-a"
+    assert calls == [(PRIMARY.endpoint, "Bearer primary-secret", "model-a")]
+
+
+def test_unrouted_stage_uses_caller_endpoint(monkeypatch, router):
+    calls = _install_servers(monkeypatch, {"http://groq.test/chat": lambda body: DummyResponse()})
+
+    _generate(stage="cleaning")
+
+    assert calls == [("http://groq.test/chat", "Bearer groq", "groq-model")]
+
+
+def test_fails_over_on_server_errors_and_connection_errors(monkeypatch, router):
+    def broken(body):
+        raise requests.ConnectionError("refused")
+
+    calls = _install_servers(
+        monkeypatch,
+        {PRIMARY.endpoint: broken, BACKUP.endpoint: lambda body: DummyResponse(model=body["model"])},
+    )
+    assert _generate().model == "model-b"
+
+    _install_servers(
+        monkeypatch,
+        {PRIMARY.endpoint: lambda body: DummyResponse(503), BACKUP.endpoint: lambda body: DummyResponse()},
+    )
+    assert _generate().status_code == 200
+    assert [url for url, _, _ in calls] == [PRIMARY.endpoint, BACKUP.endpoint]
+
+
+def test_unhealthy_provider_is_tried_last(monkeypatch, router):
+    calls = _install_servers(
+        monkeypatch,
+        {PRIMARY.endpoint: lambda body: DummyResponse(429), BACKUP.endpoint: lambda body: DummyResponse()},
+    )
+    _generate()
+    _generate()
+    calls.clear()
+
+    _generate()
+
+    assert [url for url, _, _ in calls] == [BACKUP.endpoint]
+    stats = router.stats()
+    assert stats["primary:model-a"]["error_rate"] == 1.0
+    assert stats["backup:model-b"]["samples"] == 3
+
+
+def test_last_provider_error_is_returned(monkeypatch, router):
+    _install_servers(
+        monkeypatch,
+        {PRIMARY.endpoint: lambda body: DummyResponse(500), BACKUP.endpoint: lambda body: DummyResponse(502)},
+    )
+
+    assert _generate().status_code == 502
+
+
+def test_load_routes_skips_invalid_entries():
+    routes = load_routes(
+        json.dumps(
+            {
+                "research": [
+                    {"name": "groq", "endpoint": "http://a", "model": "m", "api_key_env": "GROQ_API_KEY"},
+                    {"name": "missing-endpoint"},
+                ],
+                "unknown": [{"name": "x", "endpoint": "http://b", "model": "m"}],
+            }
+        )
+    )
+
+    assert routes == {"research": [LLMProvider("groq", "http://a", "m", "GROQ_API_KEY")]}
+    assert load_routes("not json") == {}
+
+
+def test_limiter_wait_does_not_count_against_provider_latency(monkeypatch, router):
+    monkeypatch.setattr(llm_client.rate_limiter, "acquire", lambda *args, **kwargs: time.sleep(0.2) or 0.2)
+    _install_servers(monkeypatch, {PRIMARY.endpoint: lambda body: DummyResponse()})
+
+    _generate()
+
+    assert router.stats()["primary:model-a"]["p50_latency_seconds"] < 0.1
+
+
+def test_timeout_shortened_by_the_row_deadline_is_not_a_provider_failure(monkeypatch, router):
+    def slow(body):
+        raise requests.ReadTimeout("read timed out")
+
+    _install_servers(
+        monkeypatch,
+        {PRIMARY.endpoint: slow, BACKUP.endpoint: lambda body: DummyResponse(model=body["model"])},
+    )
+    with llm_client.row_deadline.scope(time.monotonic() + 10):
+        assert _generate().model == "model-b"
+
+    assert router.stats()["primary:model-a"]["samples"] == 0
+    assert circuit_breaker.get_breaker("primary").stats()["consecutive_failures"] == 0
+
+    # With the full timeout available, the same timeout does count against the provider.
+    _generate()
+    assert router.stats()["primary:model-a"]["error_rate"] == 1.0
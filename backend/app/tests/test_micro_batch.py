@@ -0,0 +1,59 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app.micro_batch import MicroBatcher  # noqa: E402
+
+
+def _submit_all(batcher, items):
+    results = {}
+
+    def worker(item):
+        try:
+            results[item] = batcher.submit(item)
+        except Exception as exc:  # noqa: BLE001
+            results[item] = exc
+
+    threads = [threading.Thread(target=worker, args=(item,)) for item in items]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_submits_share_batches():
+    batch_sizes = []
+
+    def double(items):
+        batch_sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_batch=4, max_wait_seconds=1.0)
+    results = _submit_all(batcher, list(range(8)))
+
+    assert results == {item: item * 2 for item in range(8)}
+    assert sorted(batch_sizes) == [4, 4]
+
+
+def test_partial_batch_runs_after_wait():
+    batcher = MicroBatcher(lambda items: [item + 1 for item in items], max_batch=10, max_wait_seconds=0.05)
+
+    assert _submit_all(batcher, [1, 2, 3]) == {1: 2, 2: 3, 3: 4}
+    assert batcher.items == 3
+
+
+def test_batch_errors_reach_every_caller():
+    def explode(items):
+        raise RuntimeError("provider down")
+
+    batcher = MicroBatcher(explode, max_batch=2, max_wait_seconds=0.05)
+    results = _submit_all(batcher, ["a", "b"])
+
+    assert all(isinstance(result, RuntimeError) for result in results.values())
+    with pytest.raises(RuntimeError):
+        batcher.submit("c")
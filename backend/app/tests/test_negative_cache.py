@@ -0,0 +1,109 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("SUPABASE_URL", "https://project.supabase.co")
+os.environ.setdefault(
+    "SUPABASE_SERVICE_ROLE_KEY",
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.test",
+)
+
+from backend.app import jobs  # noqa: E402
+from backend.app.job_stats import JobStats  # noqa: E402
+from backend.app.negative_cache import BloomFilter, NegativeCache  # noqa: E402
+
+
+class FakeBinaryRedis:
+    """Minimal byte-returning Redis supporting the bitmap and exact-entry calls."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        value = self.values.get(key)
+        if isinstance(value, bytearray):
+            return bytes(value)
+        return value
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def setbit(self, key, offset, value):
+        self.ops.append(("setbit", key, offset))
+
+    def expire(self, key, seconds):
+        pass
+
+    def set(self, key, value, ex=None):
+        self.ops.append(("set", key, value))
+
+    def execute(self):
+        for op, key, arg in self.ops:
+            if op == "setbit":
+                bits = self.redis.values.setdefault(key, bytearray())
+                if len(bits) <= arg // 8:
+                    bits.extend(b"\x00" * (arg // 8 + 1 - len(bits)))
+                bits[arg // 8] |= 0x80 >> (arg % 8)
+            else:
+                self.redis.values[key] = arg.encode("utf-8")
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(size_bits=4096, num_hashes=5)
+    members = [f"domain:site{i}.example" for i in range(100)]
+    for member in members:
+        bloom.add(member)
+
+    assert all(member in bloom for member in members)
+    assert "domain:unseen.example" not in bloom
+
+
+def test_negative_cache_is_shared_through_redis():
+    redis = FakeBinaryRedis()
+    writer = NegativeCache("test", redis_client=redis, bloom_bits=4096)
+    reader = NegativeCache("test", redis_client=redis, bloom_bits=4096)
+
+    assert reader.lookup("domain", "parked.example") is None
+    writer.mark("domain", "Parked.Example", "Research unavailable: nothing")
+
+    # The reader refreshes its local bloom copy from Redis after refresh_seconds.
+    reader.refresh_seconds = 0
+    assert reader.lookup("domain", "parked.example") == "Research unavailable: nothing"
+    assert reader.lookup("domain", "other.example") is None
+
+
+def test_negative_cache_works_without_redis():
+    cache = NegativeCache("test", use_redis=False, bloom_bits=4096)
+    cache.mark("email", "dee@parked.example", "Research unavailable: nothing")
+
+    assert cache.lookup("email", "DEE@parked.example") == "Research unavailable: nothing"
+    assert cache.stats()["hits"] == 1
+
+
+def test_research_with_store_counts_provider_calls_saved(monkeypatch):
+    monkeypatch.setattr(jobs, "get_prospect_store", lambda: None)
+    monkeypatch.setattr(
+        jobs, "negative_research_result", lambda email: "Research unavailable: nothing"
+    )
+    monkeypatch.setattr(
+        jobs,
+        "perform_research",
+        lambda email: pytest.fail("perform_research should be skipped for negative prospects"),
+    )
+
+    stats = JobStats()
+    assert jobs._research_with_store("dee@parked.example", stats) == "Research unavailable: nothing"
+    assert stats.get("negative_cache_hits") == 1
+    assert stats.get("provider_calls_saved") == jobs.PROVIDER_CALLS_PER_PROSPECT
+
@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("SUPABASE_URL", "https://project.supabase.co")
+os.environ.setdefault(
+    "SUPABASE_SERVICE_ROLE_KEY",
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.test",
+)
+
+from backend.app import jobs, prospect_store  # noqa: E402
+from backend.app.job_stats import JobStats, merge_counts, summarize_counts  # noqa: E402
+from backend.app.prospect_store import SafeProspectStore, SQLiteProspectStore  # noqa: E402
+
+
+RESEARCH = json.dumps({"prospect_info": {"name": "Ada"}})
+
+
+def test_sqlite_store_normalizes_email_and_respects_freshness():
+    store = SQLiteProspectStore()
+    store.put("  Ada@Example.com ", RESEARCH)
+
+    assert store.get("ada@example.com") == RESEARCH
+
+    store.max_age_seconds = -1
+    assert store.get("ada@example.com") is None
+
+
+def test_safe_store_skips_unsuccessful_research_and_swallows_errors():
+    class BrokenStore(prospect_store.ProspectStore):
+        def get(self, email):
+            raise RuntimeError("down")
+
+        def put(self, email, research):
+            raise RuntimeError("down")
+
+    safe = SafeProspectStore(SQLiteProspectStore())
+    safe.put("a@example.com", "Research unavailable: no search results from Serper.")
+    safe.put("b@example.com", "not json")
+    assert safe.get("a@example.com") is None
+    assert safe.get("b@example.com") is None
+
+    broken = SafeProspectStore(BrokenStore())
+    assert broken.get("a@example.com") is None
+    broken.put("a@example.com", RESEARCH)
+
+
+def test_research_with_store_reuses_stored_research(monkeypatch):
+    store = SafeProspectStore(SQLiteProspectStore())
+    calls = []
+
+    def fake_perform_research(email):
+        calls.append(email)
+        return RESEARCH
+
+    monkeypatch.setattr(jobs, "get_prospect_store", lambda: store)
+    monkeypatch.setattr(jobs, "perform_research", fake_perform_research)
+
+    stats = JobStats()
+    assert jobs._research_with_store("ada@example.com", stats) == RESEARCH
+    assert jobs._research_with_store("ADA@example.com", stats) == RESEARCH
+
+    assert calls == ["ada@example.com"]
+    summary = summarize_counts(merge_counts(stats.as_dict()))
+    assert summary["prospect_store_lookups"] == 2
+    assert summary["prospect_store_hits"] == 1
+    assert summary["prospect_store_hit_rate"] == 0.5
+
+
+def test_incomplete_store_fails_at_construction():
+    class GetOnlyStore(prospect_store.ProspectStore):
+        def get(self, email):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyStore()
@@ -0,0 +1,119 @@
+import json
+import sys
+import weakref
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app import gpt_helpers, llm_client, research  # noqa: E402
+from backend.app.cache import TwoTierCache  # noqa: E402
+from backend.app.negative_cache import NegativeCache  # noqa: E402
+from backend.app.provider_simulator import SimulatorConfig, create_app  # noqa: E402
+from backend.app.singleflight import SingleFlight  # noqa: E402
+
+
+def _client(**overrides):
+    config = SimulatorConfig(serper_latency_ms=0, groq_latency_ms=0, groq_tokens_per_second=1e9, seed=7)
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return TestClient(create_app(config))
+
+
+def test_search_returns_deterministic_organic_results():
+    client = _client(serper_results=3)
+
+    first = client.post("/search", json={"q": "jane acme.io"}).json()
+    second = client.post("/search", json={"q": "jane acme.io"}).json()
+
+    assert first == second
+    assert len(first["organic"]) == 3
+    assert first["organic"][0]["link"].startswith("https://acme.io/")
+
+
+def test_chat_completion_matches_prompt_and_accounts_tokens():
+    client = _client()
+    batch_prompt = research._build_batch_prompt(
+        [("amy@acme.io", [{"organic": [{"title": "A"}]}]), ("ben@acme.io", [{"organic": [{"title": "B"}]}])]
+    )
+
+    response = client.post(
+        "/openai/v1/chat/completions",
+        json={"model": research.MODEL_NAME, "messages": [{"role": "user", "content": batch_prompt}]},
+    ).json()
+
+    content = response["choices"][0]["message"]["content"]
+    parsed = research._parse_batch_payload(content, ["amy@acme.io", "ben@acme.io"])
+    assert set(parsed) == {"amy@acme.io", "ben@acme.io"}
+    usage = response["usage"]
+    assert usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"]
+    assert client.get("/stats").json()["groq"]["prompt_tokens"] == usage["prompt_tokens"]
+
+
+def test_error_injection_and_rate_limits():
+    assert _client(rate_5xx=1.0).post("/search", json={"q": "x.io"}).status_code >= 500
+    assert _client(rate_429=1.0).post("/search", json={"q": "x.io"}).status_code == 429
+
+    limited = _client(serper_rpm=1)
+    assert limited.post("/search", json={"q": "x.io"}).status_code == 200
+    refused = limited.post("/search", json={"q": "x.io"})
+    assert refused.status_code == 429
+    assert float(refused.headers["retry-after"]) > 0
+
+
+def test_malformed_rate_truncates_json_content():
+    client = _client(malformed_json_rate=1.0)
+    prompt = research._build_prompt("amy@acme.io", [{"organic": [{"title": "A"}]}])
+
+    response = client.post(
+        "/openai/v1/chat/completions", json={"messages": [{"role": "user", "content": prompt}]}
+    ).json()
+
+    assert research._is_valid_research_payload(response["choices"][0]["message"]["content"]) == (False, None)
+
+
+def test_research_serper_fanout_runs_against_simulator(monkeypatch):
+    app = create_app(SimulatorConfig(serper_latency_ms=0, seed=1))
+    monkeypatch.setattr(research, "_SERPER_CACHE", TwoTierCache("sim-test", use_redis=False))
+    monkeypatch.setattr(research, "_SERPER_FLIGHT", SingleFlight("sim-test", use_redis=False))
+    monkeypatch.setattr(research, "_NEGATIVE_CACHE", NegativeCache("sim-test", use_redis=False))
+    monkeypatch.setattr(research, "SERPER_ENDPOINT", "http://simulator/search")
+    monkeypatch.setattr(
+        research,
+        "_build_async_client",
+        lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+    )
+    monkeypatch.setattr(research, "_async_clients", weakref.WeakKeyDictionary())
+
+    search_data = research._ENGINE.run(
+        research._fetch_search_data_async(["jane acme.io", "acme.io"], {"X-API-KEY": "sim"})
+    )
+
+    assert len(search_data) == 2
+    assert research._has_organic_results(search_data)
+    assert app.state.simulator.snapshot()["serper"]["ok"] == 2
+
+
+def test_batched_generation_prompt_gets_one_body_per_prospect(monkeypatch):
+    client = _client()
+    monkeypatch.setenv("GROQ_API_KEY", "sim")
+    monkeypatch.setattr(llm_client.rate_limiter, "acquire", lambda *args, **kwargs: 0.0)
+    monkeypatch.setattr(
+        llm_client.requests,
+        "post",
+        lambda url, headers=None, json=None, timeout=None: client.post("/openai/v1/chat/completions", json=json),
+    )
+    monkeypatch.setattr(
+        gpt_helpers, "generate_full_email_body", lambda *args: pytest.fail("batch fell back to single-row generation")
+    )
+    research_components = json.dumps({"prospect_info": {"name": "Amy", "company": "Acme"}})
+
+    bodies = gpt_helpers.generate_email_bodies_batch(
+        [("row-1", research_components), ("row-2", research_components)], json.dumps({"core_offer": "Audits"})
+    )
+
+    assert set(bodies) == {"row-1", "row-2"}
+    assert all("partner program" in body for body in bodies.values())
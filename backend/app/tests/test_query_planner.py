@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app import query_planner  # noqa: E402
+from backend.app.query_planner import plan_queries  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "email, category, queries, skipped",
+    [
+        ("jane.doe@acme.io", "corporate", ["jane.doe acme.io", "acme.io"], False),
+        ("info@acme.io", "role", ["acme.io"], False),
+        ("Sales+EU@acme.io", "role", ["acme.io"], False),
+        ("jane.doe@gmail.com", "free_mail", ["jane.doe gmail.com"], False),
+        ("noreply@outlook.com", "role", [], True),
+        ("not-an-email", "malformed", [], True),
+        ("jane@localhost", "malformed", [], True),
+        ("", "malformed", [], True),
+    ],
+)
+def test_plan_queries_classifies_emails(email, category, queries, skipped):
+    plan = plan_queries(email)
+
+    assert plan.category == category
+    assert plan.queries == queries
+    assert plan.skip_research is skipped
+
+
+def test_provider_calls_saved_counts_skipped_queries_and_extraction():
+    assert plan_queries("jane@acme.io").provider_calls_saved == 0
+    assert plan_queries("info@acme.io").provider_calls_saved == 1
+    assert plan_queries("jane@gmail.com").provider_calls_saved == 1
+    assert plan_queries("info@gmail.com").provider_calls_saved == query_planner.FULL_QUERY_COUNT + 1
@@ -0,0 +1,154 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app import rate_limiter, row_deadline
+from backend.app.rate_limiter import RateLimit, RateLimiter
+
+
+class ScriptRecordingRedis:
+    def __init__(self, waits):
+        self.waits = list(waits)
+        self.calls = []
+
+    def register_script(self, _script):
+        def run(keys, args):
+            self.calls.append((keys, args))
+            return str(self.waits.pop(0))
+
+        return run
+
+
+def test_acquire_consumes_request_and_token_buckets_locally():
+    limiter = RateLimiter(
+        {"groq": RateLimit(requests_per_minute=60), "groq:model-a": RateLimit(tokens_per_minute=600)},
+        use_redis=False,
+        burst_seconds=1,
+    )
+
+    assert limiter.acquire("groq", "model-a", tokens=10) < 0.05
+    # Request bucket holds one request (1/s * 1s burst) and is now empty.
+    assert limiter._try_acquire(limiter._buckets("groq", "model-a", 10)) > 0
+
+
+def test_acquire_sleeps_until_bucket_refills(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", lambda seconds: sleeps.append(seconds))
+    redis_stub = ScriptRecordingRedis([0.5, 0.25, 0])
+    limiter = RateLimiter({"serper": RateLimit(requests_per_minute=120)}, redis_client=redis_stub)
+
+    limiter.acquire("serper")
+
+    assert len(sleeps) == 2
+    assert 0.5 <= sleeps[0] < 0.56
+    keys, args = redis_stub.calls[0]
+    assert keys == ["ratelimit:serper:requests"]
+    assert args == [2.0, 10.0, 1.0]
+
+
+def test_acquire_passes_all_buckets_to_redis_script():
+    redis_stub = ScriptRecordingRedis([0])
+    limiter = RateLimiter(
+        {
+            "groq": RateLimit(requests_per_minute=600),
+            "groq:llama": RateLimit(requests_per_minute=300, tokens_per_minute=60000),
+        },
+        redis_client=redis_stub,
+    )
+
+    limiter.acquire("groq", "llama", tokens=1200)
+
+    keys, args = redis_stub.calls[0]
+    assert keys == [
+        "ratelimit:groq:requests",
+        "ratelimit:groq:llama:requests",
+        "ratelimit:groq:llama:tokens",
+    ]
+    assert args[-1] == 1200.0
+
+
+def test_redis_failure_falls_back_to_local_buckets():
+    class BrokenRedis:
+        def register_script(self, _script):
+            raise ConnectionError("redis down")
+
+    limiter = RateLimiter({"serper": RateLimit(requests_per_minute=60)}, redis_client=BrokenRedis())
+
+    assert limiter.acquire("serper") < 0.05
+    assert limiter._redis_disabled_until > 0
+
+
+def test_unconfigured_or_disabled_limits_do_not_block():
+    limiter = RateLimiter({}, use_redis=False)
+    assert limiter.acquire("unknown", "model") == 0
+
+    disabled = RateLimiter({"serper": RateLimit(requests_per_minute=1)}, enabled=False)
+    for _ in range(5):
+        assert disabled.acquire("serper") == 0
+
+
+def test_rate_limits_json_overrides_defaults(monkeypatch):
+    monkeypatch.setenv("RATE_LIMITS_JSON", '{"groq:custom": {"rpm": 30, "tpm": 9000}}')
+
+    limits = rate_limiter._load_limits()
+
+    assert limits["groq:custom"] == RateLimit(requests_per_minute=30, tokens_per_minute=9000)
+    assert limits["serper"] == rate_limiter.DEFAULT_LIMITS["serper"]
+
+
+def test_wait_past_the_row_deadline_raises_instead_of_sleeping(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, "sleep", lambda seconds: pytest.fail("unexpected sleep"))
+    limiter = RateLimiter({"serper": RateLimit(requests_per_minute=120)}, redis_client=ScriptRecordingRedis([30]))
+
+    with row_deadline.scope(time.monotonic() + 10):
+        with pytest.raises(row_deadline.DeadlineExceeded):
+            limiter.acquire("serper")
+        with pytest.raises(row_deadline.DeadlineExceeded):
+            asyncio.run(
+                RateLimiter(
+                    {"serper": RateLimit(requests_per_minute=120)}, redis_client=ScriptRecordingRedis([30])
+                ).acquire_async("serper")
+            )
+
+
+def test_sleep_is_capped_by_the_row_deadline(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", lambda seconds: sleeps.append(seconds))
+    limiter = RateLimiter({"serper": RateLimit(requests_per_minute=120)}, redis_client=ScriptRecordingRedis([7.99, 0]))
+
+    with row_deadline.scope(time.monotonic() + 10):
+        limiter.acquire("serper")
+
+    assert sleeps and sleeps[0] <= 10 - row_deadline.MIN_CALL_SECONDS
+
+
+def test_async_acquire_does_not_block_the_event_loop_on_redis(monkeypatch):
+    class SlowRedis(ScriptRecordingRedis):
+        def register_script(self, _script):
+            run = super().register_script(_script)
+
+            def slow_run(keys, args):
+                time.sleep(0.2)
+                return run(keys, args)
+
+            return slow_run
+
+    limiter = RateLimiter({"serper": RateLimit(requests_per_minute=120)}, redis_client=SlowRedis([0]))
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.02)
+
+    async def run():
+        await asyncio.gather(ticker(), limiter.acquire_async("serper"))
+
+    asyncio.run(run())
+
+    assert ticks[-1] - ticks[0] < 0.15
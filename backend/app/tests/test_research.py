@@ -1,12 +1,18 @@
+import asyncio
 import json
 import sys
+import weakref
 from pathlib import Path
 
+import httpx
 import pytest
 
 sys.path.append(str(Path(__file__).resolve().parents[3]))
 
-from backend.app import research
+from backend.app import circuit_breaker, llm_client, research
+from backend.app.cache import TwoTierCache
+from backend.app.negative_cache import NegativeCache
+from backend.app.singleflight import SingleFlight
 
 
 class DummyResponse:
@@ -28,17 +34,44 @@ def ensure_keys(monkeypatch):
     monkeypatch.setenv("GROQ_API_KEY", "test-groq")
 
 
+@pytest.fixture(autouse=True)
+def isolated_serper_cache(monkeypatch):
+    cache = TwoTierCache("serper-test", use_redis=False)
+    monkeypatch.setattr(research, "_SERPER_CACHE", cache)
+    monkeypatch.setattr(research, "_SERPER_FLIGHT", SingleFlight("serper-test", use_redis=False))
+    monkeypatch.setattr(research, "_NEGATIVE_CACHE", NegativeCache("research-test", use_redis=False))
+    monkeypatch.setattr(circuit_breaker, "_BREAKERS", {})
+    return cache
+
+
+def _install_serper_handler(monkeypatch, handler):
+    """Route the async Serper client through ``handler(query) -> payload``."""
+
+    def transport_handler(request):
+        assert str(request.url) == research.SERPER_ENDPOINT
+        query = json.loads(request.content)["q"]
+        return httpx.Response(200, json=handler(query))
+
+    monkeypatch.setattr(
+        research,
+        "_build_async_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(transport_handler)),
+    )
+    monkeypatch.setattr(research, "_async_clients", weakref.WeakKeyDictionary())
+
+
 def _stub_research_calls(monkeypatch, groq_payload):
-    serper_payloads = iter(
-        [
-            {"organic": [{"title": "Result A", "snippet": "Snippet A."}]},
-            {"organic": [{"title": "Result B", "snippet": "Snippet B."}]},
-        ]
+    serper_payloads = {
+        "example.com": {"organic": [{"title": "Result B", "snippet": "Snippet B."}]},
+    }
+    _install_serper_handler(
+        monkeypatch,
+        lambda query: serper_payloads.get(
+            query, {"organic": [{"title": "Result A", "snippet": "Snippet A."}]}
+        ),
     )
 
     def fake_post(url, *args, **kwargs):
-        if url == research.SERPER_ENDPOINT:
-            return DummyResponse(next(serper_payloads))
         if url == research.GROQ_ENDPOINT:
             return DummyResponse({"choices": [{"message": {"content": groq_payload}}]})
         raise AssertionError(f"Unexpected URL: {url}")
@@ -351,3 +384,348 @@ def test_perform_research_handles_null_title(monkeypatch):
     assert parsed["prospect_info"]["company"] == "Dutch Digital Systems Limited"
     assert len(parsed["prospect_info"]["recent_activity"]) == 1
     assert len(parsed["prospect_info"]["relevance_signals"]) == 2
+
+
+def test_perform_research_reuses_cached_domain_results(monkeypatch):
+    groq_payload = json.dumps(
+        {
+            "prospect_info": {
+                "name": "Ivy Example",
+                "title": "COO",
+                "company": "Example Corp",
+                "recent_activity": [],
+                "relevance_signals": [],
+            }
+        }
+    )
+    serper_queries = []
+
+    def serper_handler(query):
+        serper_queries.append(query)
+        return {"organic": [{"title": "Result", "snippet": "Snippet."}]}
+
+    _install_serper_handler(monkeypatch, serper_handler)
+
+    def fake_post(url, *args, **kwargs):
+        if url == research.GROQ_ENDPOINT:
+            return DummyResponse({"choices": [{"message": {"content": groq_payload}}]})
+        raise AssertionError(f"Unexpected URL: {url}")
+
+    monkeypatch.setattr(research.requests, "post", fake_post)
+
+    research.perform_research("ivy@example.com")
+    research.perform_research("jack@Example.com")
+
+    assert sorted(serper_queries) == ["example.com", "ivy example.com", "jack Example.com"]
+    stats = research.serper_cache_stats()
+    assert stats["local_hits"] == 1
+    assert stats["misses"] == 3
+
+
+def test_perform_research_async_runs_serper_queries_concurrently(monkeypatch):
+    groq_payload = json.dumps(
+        {
+            "prospect_info": {
+                "name": "Kim Example",
+                "title": "CTO",
+                "company": "Example Corp",
+                "recent_activity": [],
+                "relevance_signals": [],
+            }
+        }
+    )
+    in_flight = {"current": 0, "peak": 0}
+
+    async def transport_handler(request):
+        in_flight["current"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["current"])
+        await asyncio.sleep(0.05)
+        in_flight["current"] -= 1
+        return httpx.Response(200, json={"organic": [{"title": "T", "snippet": "S"}]})
+
+    monkeypatch.setattr(
+        research,
+        "_build_async_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(transport_handler)),
+    )
+    monkeypatch.setattr(research, "_async_clients", weakref.WeakKeyDictionary())
+    monkeypatch.setattr(
+        research.requests,
+        "post",
+        lambda url, *a, **k: DummyResponse({"choices": [{"message": {"content": groq_payload}}]}),
+    )
+
+    result = asyncio.run(research.perform_research_async("kim@example.com"))
+
+    assert json.loads(result)["prospect_info"]["name"] == "Kim Example"
+    assert in_flight["peak"] == 2
+
+
+def _prospect(name):
+    return {
+        "prospect_info": {
+            "name": name,
+            "title": "",
+            "company": "Example Corp",
+            "recent_activity": [],
+            "relevance_signals": [],
+        }
+    }
+
+
+def test_perform_research_batch_retries_only_malformed_entries(monkeypatch):
+    _install_serper_handler(
+        monkeypatch, lambda query: {"organic": [{"title": query, "snippet": "S"}]}
+    )
+    batch_reply = json.dumps(
+        [
+            {"email": "amy@example.com", **_prospect("Amy Example")},
+            {"email": "ben@example.com", "prospect_info": {"name": None}},
+            {"email": "CAL@example.com", **_prospect("Cal Example")},
+        ]
+    )
+    groq_prompts = []
+
+    def fake_post(url, *args, **kwargs):
+        assert url == research.GROQ_ENDPOINT
+        prompt = kwargs["json"]["messages"][-1]["content"]
+        groq_prompts.append(prompt)
+        if prompt.startswith("Extract structured information for EACH prospect"):
+            return DummyResponse({"choices": [{"message": {"content": batch_reply}}]})
+        return DummyResponse(
+            {"choices": [{"message": {"content": json.dumps(_prospect("Ben Example"))}}]}
+        )
+
+    monkeypatch.setattr(research.requests, "post", fake_post)
+
+    results = research.perform_research_batch(
+        ["amy@example.com", "ben@example.com", "cal@example.com", "not-an-email"],
+        batch_size=3,
+    )
+
+    assert len(groq_prompts) == 2
+    assert "PROSPECT 3" in groq_prompts[0]
+    assert json.loads(results["amy@example.com"])["prospect_info"]["name"] == "Amy Example"
+    assert json.loads(results["ben@example.com"])["prospect_info"]["name"] == "Ben Example"
+    assert json.loads(results["cal@example.com"])["prospect_info"]["name"] == "Cal Example"
+    assert results["not-an-email"] == "Research unavailable: invalid or missing email address."
+
+
+def test_perform_research_batch_skips_emails_without_results(monkeypatch):
+    _install_serper_handler(monkeypatch, lambda query: {"organic": []})
+    monkeypatch.setattr(
+        research.requests,
+        "post",
+        lambda *a, **k: pytest.fail("Groq should not be called without search results"),
+    )
+
+    results = research.perform_research_batch(["dee@parked.example"], batch_size=5)
+
+    assert results == {"dee@parked.example": research.NO_SEARCH_RESULTS_MESSAGE}
+
+
+def test_perform_research_short_circuits_negative_domains(monkeypatch):
+    queries = []
+
+    def handler(query):
+        queries.append(query)
+        return {"organic": []}
+
+    _install_serper_handler(monkeypatch, handler)
+    monkeypatch.setattr(
+        research.requests,
+        "post",
+        lambda *a, **k: pytest.fail("Groq should not be called without search results"),
+    )
+
+    assert research.perform_research("dee@parked.example") == research.NO_SEARCH_RESULTS_MESSAGE
+    assert len(queries) == 2
+
+    # Another prospect on the same parked domain skips Serper entirely.
+    assert research.negative_research_result("eve@parked.example") == research.NO_SEARCH_RESULTS_MESSAGE
+    assert research.perform_research("eve@parked.example") == research.NO_SEARCH_RESULTS_MESSAGE
+    assert len(queries) == 2
+
+
+def test_perform_research_runs_only_planned_queries(monkeypatch):
+    queries = []
+
+    def handler(query):
+        queries.append(query)
+        return {"organic": [{"title": "Acme", "snippet": "Acme builds rockets."}]}
+
+    _install_serper_handler(monkeypatch, handler)
+    monkeypatch.setattr(
+        research.requests,
+        "post",
+        lambda *a, **k: DummyResponse(
+            {"choices": [{"message": {"content": json.dumps({"prospect_info": {"name": "Jane", "company": "Acme"}})}}]}
+        ),
+    )
+
+    research.perform_research("info@acme.io")
+    research.perform_research("jane.doe@gmail.com")
+
+    assert queries == ["acme.io", "jane.doe gmail.com"]
+    assert research.perform_research("noreply@gmail.com").startswith("Research unavailable")
+    assert len(queries) == 2
+
+
+def test_failed_serper_requests_are_not_cached_as_negative(monkeypatch):
+    def transport_handler(request):
+        return httpx.Response(500, json={})
+
+    monkeypatch.setattr(
+        research,
+        "_build_async_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(transport_handler)),
+    )
+    monkeypatch.setattr(research, "_async_clients", weakref.WeakKeyDictionary())
+
+    assert research.perform_research("dee@flaky.example") == research.NO_SEARCH_RESULTS_MESSAGE
+    assert research.negative_research_result("dee@flaky.example") is None
+
+
+def test_compact_search_data_keeps_used_fields_and_dedupes():
+    search_data = [
+        {
+            "searchParameters": {"q": "eve example.com"},
+            "knowledgeGraph": {"title": "Example Corp", "attributes": {"Founded": "2001"}},
+            "organic": [
+                {
+                    "title": "Eve Example - VP Sales",
+                    "link": "https://example.com/eve",
+                    "snippet": "Eve leads  sales\nat Example Corp.",
+                    "sitelinks": [{"title": "Team", "link": "https://example.com/team"}],
+                },
+                {"title": "Example Corp", "snippet": "Example Corp builds widgets."},
+            ],
+            "peopleAlsoAsk": [{"question": "What is Example Corp?"}],
+        },
+        {
+            "organic": [
+                {"title": "Example Corp home", "snippet": "Example Corp builds widgets.", "date": "Mar 1, 2025"},
+                {"title": "Example Corp news", "snippet": "Example Corp raised a Series B.", "date": "Jan 2, 2025"},
+            ],
+            "relatedSearches": [{"query": "example corp careers"}],
+        },
+    ]
+
+    compacted = research._compact_search_data(search_data, token_budget=1000)
+
+    assert compacted == [
+        {"title": "Eve Example - VP Sales", "snippet": "Eve leads sales at Example Corp."},
+        {"title": "Example Corp home", "snippet": "Example Corp builds widgets.", "date": "Mar 1, 2025"},
+        {"title": "Example Corp news", "snippet": "Example Corp raised a Series B.", "date": "Jan 2, 2025"},
+    ]
+
+
+def test_compact_search_data_respects_token_budget():
+    search_data = [
+        {"organic": [{"title": f"Result {i}", "snippet": "x" * 200} for i in range(10)]},
+    ]
+
+    compacted = research._compact_search_data(search_data, token_budget=150)
+
+    assert 0 < len(compacted) < 10
+    assert sum(research.estimate_tokens(research._compact_json(e)) for e in compacted) <= 150
+
+
+def test_malformed_groq_json_is_repaired_without_retry(monkeypatch):
+    monkeypatch.setattr(research, "_EXTRACTION_STATS", research.JobStats())
+    monkeypatch.setattr(research.time, "sleep", lambda seconds: pytest.fail("unexpected retry backoff"))
+    groq_payload = (
+        "Here is the JSON:\n```json\n"
+        '{"prospect_info": {"name": "Lee Example", "title": None, "company": "Example Corp",'
+        ' "recent_activity": ["Launched a product",], "relevance_signals": [],},}\n```'
+    )
+    requests_seen = []
+
+    def fake_post(url, *args, **kwargs):
+        requests_seen.append(kwargs["json"])
+        return DummyResponse({"choices": [{"message": {"content": groq_payload}}]})
+
+    _stub_research_calls(monkeypatch, groq_payload)
+    monkeypatch.setattr(research.requests, "post", fake_post)
+
+    result = json.loads(research.perform_research("lee@example.com"))
+
+    assert result["prospect_info"]["name"] == "Lee Example"
+    assert result["prospect_info"]["recent_activity"] == ["Launched a product"]
+    assert len(requests_seen) == 1
+    assert requests_seen[0]["response_format"] == {"type": "json_object"}
+    assert research.extraction_stats() == {"extraction_requests": 1, "extraction_repaired": 1}
+
+
+def test_json_mode_failed_generation_is_repaired(monkeypatch):
+    monkeypatch.setattr(research, "_EXTRACTION_STATS", research.JobStats())
+    monkeypatch.setattr(research, "GROQ_JSON_MODE", True)
+    failed_generation = '{"prospect_info": {"name": "Max Example", "company": "Example Corp",}'
+
+    def fake_post(url, *args, **kwargs):
+        return DummyResponse(
+            {"error": {"code": "json_validate_failed", "failed_generation": failed_generation}},
+            status_code=400,
+        )
+
+    _stub_research_calls(monkeypatch, "")
+    monkeypatch.setattr(research.requests, "post", fake_post)
+
+    result = json.loads(research.perform_research("max@example.com"))
+
+    assert result["prospect_info"]["name"] == "Max Example"
+    assert research.GROQ_JSON_MODE is True
+    assert research.extraction_stats()["extraction_repaired"] == 1
+
+
+def test_groq_retries_are_skipped_when_row_deadline_is_close(monkeypatch):
+    monkeypatch.setattr(research.time, "sleep", lambda seconds: pytest.fail("unexpected retry backoff"))
+    monkeypatch.setattr(research, "_EXTRACTION_STATS", research.JobStats())
+    timeouts = []
+
+    def fake_post(url, *args, **kwargs):
+        timeouts.append(kwargs["timeout"])
+        return DummyResponse({"choices": [{"message": {"content": "not json"}}]})
+
+    _stub_research_calls(monkeypatch, "")
+    monkeypatch.setattr(research.requests, "post", fake_post)
+
+    with research.row_deadline.scope(research.time.monotonic() + 2.5):
+        result = research.perform_research("nia@example.com")
+
+    assert result == research.DEADLINE_RESEARCH_MESSAGE
+    assert len(timeouts) == 1
+    assert timeouts[0] <= 2.5
+
+
+def test_json_mode_is_disabled_only_for_the_provider_rejecting_it(monkeypatch):
+    monkeypatch.setattr(research, "_EXTRACTION_STATS", research.JobStats())
+    monkeypatch.setattr(llm_client, "_JSON_MODE_UNSUPPORTED", set())
+    groq_payload = json.dumps({"prospect_info": {"name": "Ana Example", "company": "Example Corp"}})
+    errors = [
+        {"message": "prompt is too long", "type": "invalid_request_error"},
+        {"message": "response_format is not supported by this model", "param": "response_format"},
+    ]
+    requests_seen = []
+
+    def fake_post(url, *args, **kwargs):
+        requests_seen.append(kwargs["json"])
+        if errors and "response_format" in kwargs["json"]:
+            return DummyResponse({"error": errors.pop(0)}, status_code=400)
+        return DummyResponse({"choices": [{"message": {"content": groq_payload}}]})
+
+    _stub_research_calls(monkeypatch, groq_payload)
+    monkeypatch.setattr(research.requests, "post", fake_post)
+
+    # A 400 about the prompt itself leaves JSON mode on.
+    with pytest.raises(RuntimeError):
+        research._request_groq_content("prompt", "test-groq", json_mode=True)
+    assert llm_client._JSON_MODE_UNSUPPORTED == set()
+
+    research._request_groq_content("prompt", "test-groq", json_mode=True)
+    assert llm_client._JSON_MODE_UNSUPPORTED == {f"groq:{research.MODEL_NAME}"}
+
+    requests_seen.clear()
+    research._request_groq_content("prompt", "test-groq", json_mode=True)
+    assert len(requests_seen) == 1
+    assert "response_format" not in requests_seen[0]
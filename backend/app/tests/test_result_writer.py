@@ -0,0 +1,71 @@
+import csv
+import sys
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app.result_writer import (  # noqa: E402
+    csv_columns,
+    iter_csv_rows,
+    resolve_result_columns,
+    write_result_xlsx,
+)
+
+
+def _write_chunk(path: Path, header, rows):
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def _read_sheet(path):
+    workbook = load_workbook(path)
+    return [list(row) for row in workbook.active.iter_rows(values_only=True)]
+
+
+def test_resolve_result_columns_orders_final_headers_first():
+    assert resolve_result_columns(["email", "", "name", "email"], ["extra", "name"]) == [
+        "email",
+        "name",
+        "extra",
+    ]
+    assert resolve_result_columns(None, ["a", "b"]) == ["a", "b"]
+
+
+def test_chunks_are_merged_in_order_with_final_header_order(tmp_path):
+    first = _write_chunk(tmp_path / "chunk_1.csv", ["name", "email", "email_body"], [["Ann", "a@x.io", "Hi Ann"]])
+    second = _write_chunk(
+        tmp_path / "chunk_2.csv",
+        ["name", "email", "email_body", "note"],
+        [["Bob", "b@x.io", "", "late"], ["Cy", "c@x.io", "Hi Cy", ""]],
+    )
+    paths = [first, second]
+    columns = resolve_result_columns(["email", "name", "email_body"], csv_columns(paths))
+    out_path = str(tmp_path / "result.xlsx")
+
+    assert write_result_xlsx(out_path, columns, iter_csv_rows(paths)) == 3
+    assert _read_sheet(out_path) == [
+        ["email", "name", "email_body", "note"],
+        ["a@x.io", "Ann", "Hi Ann", None],
+        ["b@x.io", "Bob", None, "late"],
+        ["c@x.io", "Cy", "Hi Cy", None],
+    ]
+
+
+def test_values_are_kept_as_text_and_control_characters_dropped(tmp_path):
+    out_path = str(tmp_path / "result.xlsx")
+
+    write_result_xlsx(out_path, ["phone", "body"], [{"phone": "007", "body": "line\x0bbreak"}])
+
+    assert _read_sheet(out_path)[1] == ["007", "linebreak"]
+
+
+def test_empty_result_has_only_the_header_row(tmp_path):
+    out_path = str(tmp_path / "result.xlsx")
+
+    assert write_result_xlsx(out_path, ["email", "email_body"], []) == 0
+    assert _read_sheet(out_path) == [["email", "email_body"]]
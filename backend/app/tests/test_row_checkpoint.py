@@ -0,0 +1,88 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app.row_checkpoint import RowJournal  # noqa: E402
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.expiries = {}
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def expire(self, key, seconds):
+        self.expiries[key] = seconds
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+
+class BrokenRedis:
+    def __getattr__(self, _name):
+        def fail(*_args, **_kwargs):
+            raise ConnectionError("redis down")
+
+        return fail
+
+
+def test_recorded_rows_are_loaded_by_the_next_attempt():
+    redis_stub = FakeRedis()
+    first_attempt = RowJournal("job-1", 2, redis_client=redis_stub, ttl_seconds=60)
+    assert first_attempt.load() == {}
+
+    first_attempt.record(0, {"email": "a@x.io", "email_body": "Hi"})
+    first_attempt.record(3, {"email": "d@x.io", "email_body": "Hey"})
+
+    retry = RowJournal("job-1", 2, redis_client=redis_stub)
+    assert retry.load() == {
+        0: {"email": "a@x.io", "email_body": "Hi"},
+        3: {"email": "d@x.io", "email_body": "Hey"},
+    }
+    assert redis_stub.expiries == {"checkpoint:job-1:2": 60}
+    assert RowJournal("job-1", 3, redis_client=redis_stub).load() == {}
+
+
+def test_clear_drops_the_journal():
+    redis_stub = FakeRedis()
+    journal = RowJournal("job-1", 1, redis_client=redis_stub)
+    journal.record(0, {"email": "a@x.io"})
+
+    journal.clear()
+
+    assert RowJournal("job-1", 1, redis_client=redis_stub).load() == {}
+
+
+def test_unreachable_redis_disables_the_journal_instead_of_failing():
+    journal = RowJournal("job-1", 1, redis_client=BrokenRedis())
+
+    assert journal.load() == {}
+    assert journal.enabled is False
+    journal.record(0, {"email": "a@x.io"})
+    journal.clear()
+
+
+def test_disabled_journal_never_touches_redis():
+    journal = RowJournal("job-1", 1, redis_client=BrokenRedis(), enabled=False)
+
+    journal.record(0, {"email": "a@x.io"})
+    assert journal.load() == {}
+
+
+def test_reported_progress_is_kept_apart_from_rows():
+    redis_stub = FakeRedis()
+    first_attempt = RowJournal("job-1", 1, redis_client=redis_stub)
+    for index in range(7):
+        first_attempt.record(index, {"email": f"{index}@x.io"})
+    first_attempt.record_reported(5)
+
+    retry = RowJournal("job-1", 1, redis_client=redis_stub)
+    assert sorted(retry.load()) == list(range(7))
+    assert retry.reported == 5
+    assert RowJournal("job-1", 2, redis_client=redis_stub).reported == 0
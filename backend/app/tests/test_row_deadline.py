@@ -0,0 +1,42 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app import row_deadline  # noqa: E402
+
+
+def test_timeout_is_capped_by_remaining_budget():
+    assert row_deadline.timeout(30) == 30
+
+    with row_deadline.scope(time.monotonic() + 10):
+        assert 9 < row_deadline.timeout(30) <= 10
+        assert row_deadline.timeout(5) == 5
+        assert row_deadline.allows(4)
+        assert not row_deadline.allows(9.5)
+
+    with row_deadline.scope(time.monotonic() + 0.5):
+        with pytest.raises(row_deadline.DeadlineExceeded):
+            row_deadline.timeout(30)
+
+
+def test_extend_and_bind_carry_the_deadline():
+    with row_deadline.scope(time.monotonic() + 1):
+        row_deadline.extend(10)
+        assert row_deadline.remaining() > 10
+
+        async def read_remaining():
+            return row_deadline.remaining()
+
+        loop = asyncio.new_event_loop()
+        try:
+            assert loop.run_until_complete(row_deadline.bind(read_remaining())) > 10
+        finally:
+            loop.close()
+
+    assert row_deadline.current() is None
+    assert row_deadline.new_deadline(0) is None
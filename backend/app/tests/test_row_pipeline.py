@@ -0,0 +1,125 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("SUPABASE_URL", "https://project.supabase.co")
+os.environ.setdefault(
+    "SUPABASE_SERVICE_ROLE_KEY",
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.test",
+)
+
+from backend.app import jobs  # noqa: E402
+from backend.app.job_stats import JobStats  # noqa: E402
+from backend.app.row_pipeline import Stage, StagedPipeline  # noqa: E402
+
+
+def test_pipeline_runs_every_item_through_all_stages():
+    pipeline = StagedPipeline(
+        [
+            Stage("double", lambda x: x * 2, workers=3, queue_size=2),
+            Stage("increment", lambda x: x + 1, workers=2, queue_size=2),
+        ],
+        on_error=lambda item, stage, exc: None,
+    )
+
+    assert sorted(pipeline.run(range(50))) == [x * 2 + 1 for x in range(50)]
+    metrics = pipeline.metrics()
+    assert metrics["double"]["processed"] == 50
+    assert metrics["increment"]["processed"] == 50
+    assert metrics["double"]["max_queue_depth"] <= 2
+
+
+def test_pipeline_errors_skip_remaining_stages():
+    def explode(x):
+        if x == 3:
+            raise ValueError("bad row")
+        return x
+
+    later = []
+    pipeline = StagedPipeline(
+        [Stage("first", explode, 2, 4), Stage("second", lambda x: later.append(x) or x, 2, 4)],
+        on_error=lambda item, stage, exc: ("error", item, stage, str(exc)),
+    )
+
+    results = list(pipeline.run(range(5)))
+
+    assert ("error", 3, "first", "bad row") in results
+    assert 3 not in later
+    assert pipeline.metrics()["first"]["errors"] == 1
+
+
+def test_slow_stage_does_not_hold_fast_stage_slots():
+    """A slow downstream stage backs up its own queue while research keeps flowing."""
+    researched = threading.Event()
+
+    def slow(x):
+        researched.wait(timeout=2)
+        return x
+
+    pipeline = StagedPipeline(
+        [Stage("fast", lambda x: x, workers=1, queue_size=10), Stage("slow", slow, workers=1, queue_size=10)],
+        on_error=lambda item, stage, exc: None,
+    )
+    results = pipeline.run(range(5))
+    deadline = time.monotonic() + 2
+    while pipeline.metrics()["fast"]["processed"] < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pipeline.metrics()["fast"]["processed"] == 5
+    researched.set()
+    assert sorted(results) == list(range(5))
+
+
+@pytest.mark.parametrize("mode", ["staged", "threaded"])
+def test_iter_processed_rows_matches_single_row_output(monkeypatch, mode):
+    monkeypatch.setattr(jobs, "generate_full_email_body", lambda research, service, plan: f"Body for {research}")
+    monkeypatch.setattr(
+        jobs, "clean_email_body_for_mode", lambda body, mode, name: (body + "\n\nSecond", False)
+    )
+    rows = [{"email": f"user{i}@example.com", "company": f"Co {i}"} for i in range(8)]
+    ctx = jobs._RowContext(
+        ["company"],
+        "email",
+        {"row_pipeline": mode},
+        "job-1",
+        1,
+        {row["email"]: f"research-{row['email']}" for row in rows},
+        JobStats(),
+        None,
+    )
+    stage_metrics = {}
+
+    results = sorted(jobs._iter_processed_rows(rows, ctx, stage_metrics))
+
+    assert [index for index, _, _ in results] == list(range(8))
+    _, first_row, error = results[0]
+    assert error is None
+    assert first_row["email_body"] == "Body for research-user0@example.com\n\nSecond"
+    assert first_row["sif_personalized_line"] == "Body for research-user0@example.com"
+    assert first_row["company"] == "Co 0"
+    assert ctx.stats.get("cleaning_rows") == 8
+    if mode == "staged":
+        assert set(stage_metrics) == {"research", "generation", "cleaning"}
+
+
+def test_queue_wait_between_stages_does_not_use_the_row_deadline():
+    remaining = []
+
+    @jobs._with_row_deadline
+    def stage(ctx, state):
+        remaining.append(jobs.row_deadline.remaining())
+        return state
+
+    ctx = jobs._RowContext(["email"], "email", {"row_deadline_seconds": 1.0}, "job", 1, {}, JobStats(), None)
+    state = stage(ctx, jobs._RowState(0, {}, "a@example.com"))
+    # Queued behind other rows for the next stage.
+    time.sleep(0.3)
+    stage(ctx, state)
+
+    assert remaining[1] > 0.9
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from backend.app import row_deadline
+from backend.app.singleflight import SingleFlight
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def exists(self, key):
+        return int(key in self.store)
+
+    def register_script(self, _script):
+        def release(keys, args):
+            if self.store.get(keys[0]) == args[0]:
+                del self.store[keys[0]]
+                return 1
+            return 0
+
+        return release
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight("test", use_redis=False)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"organic": ["shared"]}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("example.com", fetch) for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(result == {"organic": ["shared"]} for result in results)
+    assert flight.stats() == {"executed": 1, "coalesced_local": 4, "coalesced_remote": 0}
+
+
+def test_leader_publishes_result_and_releases_lock():
+    redis_stub = FakeRedis()
+    flight = SingleFlight("test", redis_client=redis_stub)
+
+    async def fetch():
+        return {"organic": [1]}
+
+    result = asyncio.run(flight.do("example.com", fetch))
+
+    lock_key, result_key = flight._keys("example.com")
+    assert result == {"organic": [1]}
+    assert lock_key not in redis_stub.store
+    assert json.loads(redis_stub.store[result_key]) == {"organic": [1]}
+
+
+def test_follower_waits_for_result_from_other_worker():
+    redis_stub = FakeRedis()
+    flight = SingleFlight("test", redis_client=redis_stub, poll_interval_seconds=0.01)
+    lock_key, result_key = flight._keys("example.com")
+    redis_stub.store[lock_key] = "other-worker"
+
+    async def other_worker_finishes():
+        await asyncio.sleep(0.03)
+        redis_stub.store[result_key] = json.dumps({"organic": ["remote"]})
+        del redis_stub.store[lock_key]
+
+    async def fetch():
+        raise AssertionError("follower should not call the provider")
+
+    async def run():
+        finisher = asyncio.create_task(other_worker_finishes())
+        result = await flight.do("example.com", fetch)
+        await finisher
+        return result
+
+    assert asyncio.run(run()) == {"organic": ["remote"]}
+    assert flight.stats()["coalesced_remote"] == 1
+
+
+def test_follower_runs_call_when_leader_fails():
+    redis_stub = FakeRedis()
+    flight = SingleFlight("test", redis_client=redis_stub, poll_interval_seconds=0.01)
+    lock_key, _ = flight._keys("example.com")
+    redis_stub.store[lock_key] = "other-worker"
+
+    async def leader_gives_up():
+        await asyncio.sleep(0.02)
+        del redis_stub.store[lock_key]
+
+    async def fetch():
+        return {"organic": ["own"]}
+
+    async def run():
+        task = asyncio.create_task(leader_gives_up())
+        result = await flight.do("example.com", fetch)
+        await task
+        return result
+
+    assert asyncio.run(run()) == {"organic": ["own"]}
+    assert flight.stats()["executed"] == 1
+
+
+def test_follower_stops_waiting_at_the_row_deadline():
+    redis_stub = FakeRedis()
+    flight = SingleFlight("test", redis_client=redis_stub, poll_interval_seconds=0.01)
+    lock_key, _ = flight._keys("example.com")
+    # The leader never finishes within the follower's 25s wait.
+    redis_stub.store[lock_key] = "other-worker"
+
+    async def fetch():
+        return {"organic": ["own"]}
+
+    async def run():
+        with row_deadline.scope(time.monotonic() + row_deadline.MIN_CALL_SECONDS + 0.2):
+            return await flight.do("example.com", fetch)
+
+    started = time.monotonic()
+    assert asyncio.run(run()) == {"organic": ["own"]}
+    assert time.monotonic() - started < 1.0
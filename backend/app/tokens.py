@@ -0,0 +1,18 @@
+"""Cheap local token estimates for sizing LLM prompts without a tokenizer dependency."""
+
+from __future__ import annotations
+
+import math
+
+# Llama/GPT-style BPE vocabularies average roughly four characters of English
+# text per token; JSON punctuation tokenizes slightly worse, which the
+# rounding up absorbs well enough for budgeting purposes.
+CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Return an approximate token count for ``text``."""
+
+    if not text:
+        return 0
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN))
@@ -0,0 +1,15 @@
+-- Migration: Prospect research store
+-- Date: 2026-10-17
+-- Stores completed research per normalized email so re-uploaded prospects
+-- skip Serper/Groq (used when PROSPECT_STORE_BACKEND=supabase).
+
+CREATE TABLE IF NOT EXISTS prospect_research (
+    email TEXT PRIMARY KEY,
+    research TEXT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_prospect_research_updated_at
+ON prospect_research(updated_at);
+
+ALTER TABLE prospect_research ENABLE ROW LEVEL SECURITY;